@@ -0,0 +1,142 @@
+import math
+import time
+from collections import OrderedDict
+
+from starlette.responses import JSONResponse
+
+from . import config
+from .database import request_db_stats
+from .metrics import ADMISSION_REJECTIONS
+
+
+class TokenBuckets:
+    # One bucket per agency, refilled lazily on access. Buckets are kept in
+    # LRU order and the least recently used is dropped past max_entries; an
+    # agency idle for burst / rate seconds has a full bucket anyway.
+
+    def __init__(self, rate, burst, max_entries):
+        self.rate = rate
+        self.burst = burst
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+
+    def take(self, key, now):
+        # Returns 0 when a token was taken, otherwise the seconds until one
+        # is available.
+        tokens, last = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_entries:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class DecayingAverage:
+    # Exponentially weighted average of the per-checkout pool wait that also
+    # decays towards zero with time, so that once requests are being shed
+    # (and no new samples arrive) admission resumes after a few half-lives.
+
+    def __init__(self, alpha, half_life):
+        self.alpha = alpha
+        self.half_life = half_life
+        self._value = 0.0
+        self._updated = time.monotonic()
+
+    def value(self, now):
+        return self._value * 0.5 ** ((now - self._updated) / self.half_life)
+
+    def add(self, sample, now):
+        self._value = self.value(now) * (1 - self.alpha) + sample * self.alpha
+        self._updated = now
+
+
+class AdmissionControl:
+    # Pure ASGI middleware bounding the work one worker process accepts:
+    #
+    # - per agency (X-Agency-Id): a concurrency limit and a token bucket,
+    #   answered with 429;
+    # - globally: an in-flight cap, and shedding while the average pool
+    #   checkout wait is above ADMISSION_SHED_POOL_WAIT_MS, answered with 503.
+    #
+    # All state lives on the event loop thread and every check is a few
+    # dictionary operations. A limit of 0 disables it.
+
+    def __init__(self, app):
+        self.app = app
+        self.max_in_flight = config.ADMISSION_MAX_IN_FLIGHT
+        self.agency_max_in_flight = config.ADMISSION_AGENCY_MAX_IN_FLIGHT
+        self.shed_pool_wait = config.ADMISSION_SHED_POOL_WAIT_MS / 1000
+        self.exempt_paths = set(config.ADMISSION_EXEMPT_PATHS)
+        self.buckets = None
+        if config.ADMISSION_AGENCY_RATE > 0:
+            burst = config.ADMISSION_AGENCY_BURST or max(1.0, config.ADMISSION_AGENCY_RATE)
+            self.buckets = TokenBuckets(config.ADMISSION_AGENCY_RATE, burst, config.ADMISSION_MAX_AGENCIES)
+        self.pool_wait = DecayingAverage(0.1, config.ADMISSION_POOL_WAIT_HALF_LIFE_SECONDS)
+        self.in_flight = 0
+        self.agency_in_flight = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        agency_id = _agency_id(scope)
+        now = time.monotonic()
+        rejection = self._check(agency_id, now)
+        if rejection is not None:
+            reason, status_code, retry_after = rejection
+            ADMISSION_REJECTIONS.labels(reason).inc()
+            response = JSONResponse(
+                {"detail": "Too many requests" if status_code == 429 else "Service overloaded, retry later"},
+                status_code=status_code,
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        if agency_id is not None:
+            self.agency_in_flight[agency_id] = self.agency_in_flight.get(agency_id, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            if agency_id is not None:
+                remaining = self.agency_in_flight[agency_id] - 1
+                if remaining:
+                    self.agency_in_flight[agency_id] = remaining
+                else:
+                    del self.agency_in_flight[agency_id]
+            # Filled by app.main's db_stats_middleware, which wraps this one.
+            stats = request_db_stats.get()
+            if stats is not None and stats.checkouts:
+                self.pool_wait.add(stats.checkout_wait / stats.checkouts, time.monotonic())
+
+    def _check(self, agency_id, now):
+        # (reason, status code, Retry-After seconds) or None to admit.
+        retry_after = config.ADMISSION_RETRY_AFTER_SECONDS
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return "global_in_flight", 503, retry_after
+        if self.shed_pool_wait and self.pool_wait.value(now) > self.shed_pool_wait:
+            return "pool_wait", 503, retry_after
+        if agency_id is None:
+            return None
+        if self.agency_max_in_flight and self.agency_in_flight.get(agency_id, 0) >= self.agency_max_in_flight:
+            return "agency_in_flight", 429, retry_after
+        if self.buckets is not None:
+            wait = self.buckets.take(agency_id, now)
+            if wait:
+                return "agency_rate", 429, wait
+        return None
+
+
+def _agency_id(scope):
+    for name, value in scope["headers"]:
+        if name == b"x-agency-id":
+            return value.decode("latin-1").lower()
+    return None
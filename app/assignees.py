@@ -0,0 +1,61 @@
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from . import models
+
+# Writers keep the JSON user lists as they are and call these in the same
+# transaction, after the write. Each call is one statement: a CTE expands the
+# JSON arrays of the given rows, assignee rows no longer listed are deleted
+# and missing ones inserted. The two touch disjoint rows, so they can share
+# the statement.
+
+
+def _sync(db, table, key, expanded, ids):
+    desired = select(expanded).where(expanded.c.user_id.is_not(None)).cte("desired")
+    removed = (
+        delete(table)
+        .where(table.c[key].in_(ids), tuple_(table.c[key], table.c.user_id).not_in(select(desired.c[key], desired.c.user_id)))
+        .cte("removed")
+    )
+    db.execute(
+        insert(table)
+        .from_select(list(expanded.c.keys()), select(desired))
+        .on_conflict_do_nothing()
+        .add_cte(removed)
+    )
+
+
+def sync_service_assignees(db, service_ids):
+    # `service_ids` is a list of ids or an uncorrelated select of them.
+    users = models.Service.assign_auto_tasks_to_users
+    expanded = (
+        select(
+            models.Service.id.label("service_id"),
+            models.Service.agency_id,
+            func.json_array_elements_text(users).label("user_id"),
+        )
+        .where(models.Service.id.in_(service_ids), func.json_typeof(users) == "array")
+        .subquery()
+    )
+    _sync(db, models.ServiceAssignee.__table__, "service_id", expanded, service_ids)
+
+
+def sync_subtask_assignees(db, subtask_ids):
+    users = models.ServiceSubtask.users
+    expanded = (
+        select(
+            models.ServiceSubtask.id.label("subtask_id"),
+            models.ServiceSubtask.service_id,
+            models.Service.agency_id,
+            func.json_array_elements_text(users).label("user_id"),
+        )
+        .join(models.Service, models.Service.id == models.ServiceSubtask.service_id)
+        .where(models.ServiceSubtask.id.in_(subtask_ids), func.json_typeof(users) == "array")
+        .subquery()
+    )
+    _sync(db, models.ServiceSubtaskAssignee.__table__, "subtask_id", expanded, subtask_ids)
+
+
+def subtasks_of_services(service_ids):
+    # Uncorrelated: it is embedded in queries that read service_subtasks too.
+    return select(models.ServiceSubtask.id).where(models.ServiceSubtask.service_id.in_(service_ids)).correlate(None)
@@ -0,0 +1,98 @@
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from . import config, models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class AuditWriter:
+    # Collects audit events in a bounded in-memory queue and writes them from
+    # a background thread with multi-row INSERTs, flushing whenever a batch
+    # fills up or flush_interval passes. record() never blocks: it is called
+    # from async handlers and, in async database mode, from handler bodies
+    # running on the event loop, so when the queue is full the event is
+    # dropped and counted instead.
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        max_queue=config.AUDIT_QUEUE_SIZE,
+        batch_size=config.AUDIT_BATCH_SIZE,
+        flush_interval=config.AUDIT_FLUSH_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, action, user, agency_id=None, **details):
+        event = {
+            "id": uuid.uuid4(),
+            "agency_id": agency_id,
+            "user_id": user["id"],
+            "action": action,
+            "details": json.dumps(details, default=str),
+            "timestamp": datetime.now(timezone.utc),
+        }
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Audit queue full, dropped %s event", action)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        # The writer drains and flushes everything queued before exiting.
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _next_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        try:
+            with self.session_factory() as db:
+                db.execute(insert(models.AuditLog), batch)
+                db.commit()
+            self.written += len(batch)
+        except Exception:
+            self.dropped += len(batch)
+            logger.exception("Failed to write %d audit events", len(batch))
+
+
+audit_writer = AuditWriter()
+record = audit_writer.record
@@ -0,0 +1,302 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+from . import config
+
+MISSING = object()
+
+# Stores ARGV[2] under KEYS[1] only if the key's version (KEYS[2]) is still
+# ARGV[1], the one read before loading ("" for none).
+SET_IF_VERSION = """
+if (redis.call('GET', KEYS[2]) or '') == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3])
+end
+"""
+# Versions must outlive any load that read them.
+MIN_VERSION_TTL_SECONDS = 600
+
+
+def _version_key(key):
+    return f"version:{key}"
+
+
+class LocalCache:
+    # Thread-safe LRU with a per-entry TTL. Values must be treated as
+    # immutable by callers since the same object is handed to every reader.
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every delete; a load that started before a delete must
+        # not store its (possibly stale) result.
+        self._generation = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None, generation=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+        generation = self._generation
+        value = loader()
+        self.set(key, value, generation=generation)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "backend": "local",
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class RedisCache:
+    # Shared backend so invalidations reach every worker. Values are stored as
+    # JSON. Pass `client` to use a stand-in such as fakeredis.FakeRedis().
+    #
+    # Like LocalCache's generation, every delete bumps a version per key, and
+    # get_or_load stores its result only if the version is unchanged since
+    # the value was found missing, so a load overlapping an invalidation
+    # cannot put stale data back.
+
+    def __init__(self, url, ttl, client=None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._set_if_version = client.register_script(SET_IF_VERSION)
+
+    def _call(self, method, *args, **kwargs):
+        # Handlers converted by routers.aio run in a greenlet on the event
+        # loop thread, where a blocking round trip would stall every request
+        # of the worker; there the call runs on a thread and the greenlet
+        # awaits it.
+        if in_greenlet():
+            return await_only(asyncio.to_thread(method, *args, **kwargs))
+        return method(*args, **kwargs)
+
+    def get(self, key):
+        raw = self._call(self.client.get, key)
+        if raw is None:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None, generation=None):
+        self._call(self.client.set, key, json.dumps(value), px=int((self.ttl if ttl is None else ttl) * 1000))
+
+    def delete(self, *keys):
+        if keys:
+            self._call(self._delete, keys)
+
+    def _delete(self, keys):
+        version_ttl = int(max(self.ttl, MIN_VERSION_TTL_SECONDS) * 1000)
+        pipe = self.client.pipeline()
+        for key in keys:
+            pipe.incr(_version_key(key))
+            pipe.pexpire(_version_key(key), version_ttl)
+        pipe.delete(*keys)
+        pipe.execute()
+
+    def get_or_load(self, key, loader):
+        raw, version = self._call(self.client.mget, key, _version_key(key))
+        if raw is not None:
+            self.hits += 1
+            return json.loads(raw)
+        self.misses += 1
+        value = loader()
+        self._call(
+            self._set_if_version,
+            keys=[key, _version_key(key)],
+            args=[version or b"", json.dumps(value), int(self.ttl * 1000)],
+        )
+        return value
+
+    def clear(self):
+        self._call(self.client.flushdb)
+
+    def stats(self):
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.client.info("stats").get("evicted_keys", 0),
+        }
+
+
+class NullCache:
+    def get(self, key):
+        return MISSING
+
+    def set(self, key, value, ttl=None, generation=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def get_or_load(self, key, loader):
+        return loader()
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {"backend": "none"}
+
+
+def build_cache(client=None):
+    # `client` lets several Redis-backed caches share one connection pool.
+    if config.CACHE_BACKEND == "local" and config.WEB_CONCURRENCY > 1:
+        # Each worker would keep its own entries, revision tokens and replica
+        # pins, and a write on one worker would not invalidate the others.
+        raise RuntimeError("CACHE_BACKEND=local is per process; use redis (or none) with WEB_CONCURRENCY > 1")
+    if config.CACHE_BACKEND == "redis":
+        return RedisCache(config.REDIS_URL, config.CACHE_TTL_SECONDS, client=client)
+    if config.CACHE_BACKEND == "none":
+        return NullCache()
+    return LocalCache(config.CACHE_MAX_ENTRIES, config.CACHE_TTL_SECONDS)
+
+
+service_cache = build_cache()
+# Revision tokens are kept apart from the catalog so that their lookups do not
+# count towards the catalog's hit/miss stats and catalog entries cannot evict
+# them.
+revision_cache = build_cache(client=getattr(service_cache, "client", None))
+# Replica pins (app.replicas) get a store of their own too, so nothing else
+# can evict them. With Redis they are shared by all workers; otherwise, and
+# also with the cache disabled, they are a per-process LRU.
+if isinstance(service_cache, RedisCache):
+    pin_cache = RedisCache(config.REDIS_URL, config.REPLICA_PIN_SECONDS, client=service_cache.client)
+else:
+    pin_cache = LocalCache(config.CACHE_MAX_ENTRIES, config.REPLICA_PIN_SECONDS)
+
+
+def services_key(agency_id):
+    return f"services:{agency_id}"
+
+
+def service_key(agency_id, service_id):
+    return f"service:{agency_id}:{service_id}"
+
+
+# Revision tokens version the listings for conditional GETs. A token is
+# minted on first use and dropped by every mutation, so the next read mints
+# a new one. Tokens expire after CACHE_TTL_SECONDS like the cached payloads.
+def agency_revision_key(agency_id):
+    return f"rev:agency:{agency_id}"
+
+
+def service_revision_key(service_id):
+    return f"rev:service:{service_id}"
+
+
+def get_revision(key):
+    # Through get_or_load so that a token minted before a mutation's bump is
+    # not stored after it.
+    return revision_cache.get_or_load(key, lambda: uuid.uuid4().hex)
+
+
+def pin_key(agency_id):
+    return f"pin:{agency_id}"
+
+
+def pin_to_primary(agency_id):
+    # Reads from the agency go to the primary until replicas have had
+    # REPLICA_PIN_SECONDS to catch up with its write.
+    if config.DATABASE_REPLICA_URLS:
+        pin_cache.set(pin_key(agency_id), True, ttl=config.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(agency_id):
+    return agency_id is not None and pin_cache.get(pin_key(agency_id)) is True
+
+
+# The invalidations below are called after the mutating transaction has
+# committed. They pin the agency before dropping anything, so that a read
+# refilling the cache in between cannot come from a lagging replica.
+def bump_revision(agency_id, *keys):
+    pin_to_primary(agency_id)
+    revision_cache.delete(*keys)
+
+
+def invalidate_service(agency_id, service_id=None):
+    invalidate_services(agency_id, [] if service_id is None else [service_id])
+
+
+def invalidate_services(agency_id, service_ids):
+    pin_to_primary(agency_id)
+    keys = [services_key(agency_id), *(service_key(agency_id, service_id) for service_id in service_ids)]
+    revisions = [agency_revision_key(agency_id), *(service_revision_key(service_id) for service_id in service_ids)]
+    service_cache.delete(*keys)
+    revision_cache.delete(*revisions)
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def conditional_response(request: Request, response: Response, revision_key, variant=""):
+    # Returns a 304 response when the client already has the current version,
+    # otherwise sets the ETag on the outgoing response and returns None.
+    etag = f'"{get_revision(revision_key)}{variant}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
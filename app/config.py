@@ -12,3 +12,76 @@ AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
 DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Connection pool per worker process. When DB_CONNECTION_BUDGET (the
+# connections the database grants this whole deployment) is set, it is split
+# across the WEB_CONCURRENCY workers and overrides the two pool settings.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET")) if os.getenv("DB_CONNECTION_BUDGET") else None
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+# Optional read replicas (comma-separated URLs) for the read-only endpoints.
+# After a write, an agency's reads stay on the primary for
+# REPLICA_PIN_SECONDS so it reads its own writes despite replication lag.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_HEALTH_CHECK_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", "5"))
+REPLICA_PIN_SECONDS = float(os.getenv("REPLICA_PIN_SECONDS", "5"))
+
+# Serve the database-bound endpoints as native async handlers over asyncpg
+# instead of sync handlers on the threadpool.
+DB_ASYNC_ENABLED = os.getenv("DB_ASYNC_ENABLED", "false").lower() in ("1", "true", "yes")
+# Defaults to DATABASE_URL with the asyncpg driver.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Service catalog cache: "local" (per-process LRU), "redis" (shared) or "none".
+# "local" is refused when WEB_CONCURRENCY > 1.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local")
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# NDJSON service template export/import (app.service_templates): services per
+# server-side cursor fetch, services per INSERT, and the longest accepted line.
+TEMPLATE_EXPORT_BATCH_SIZE = int(os.getenv("TEMPLATE_EXPORT_BATCH_SIZE", "500"))
+TEMPLATE_IMPORT_BATCH_SIZE = int(os.getenv("TEMPLATE_IMPORT_BATCH_SIZE", "500"))
+TEMPLATE_IMPORT_MAX_LINE_BYTES = int(os.getenv("TEMPLATE_IMPORT_MAX_LINE_BYTES", str(1024 ** 2)))
+
+# Set to a local stand-in (moto server, MinIO) for development and tests.
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+AWS_REGION = os.getenv("AWS_REGION")
+S3_PRESIGN_EXPIRES_SECONDS = int(os.getenv("S3_PRESIGN_EXPIRES_SECONDS", "900"))
+S3_MAX_UPLOAD_BYTES = int(os.getenv("S3_MAX_UPLOAD_BYTES", str(5 * 1024 ** 3)))
+# Uploads above the threshold get presigned multipart part URLs instead of a single POST.
+S3_MULTIPART_THRESHOLD_BYTES = int(os.getenv("S3_MULTIPART_THRESHOLD_BYTES", str(100 * 1024 ** 2)))
+S3_MULTIPART_PART_SIZE = int(os.getenv("S3_MULTIPART_PART_SIZE", str(64 * 1024 ** 2)))
+
+# Background deletion of S3 objects queued in storage_deletions.
+STORAGE_DELETION_WORKER_ENABLED = os.getenv("STORAGE_DELETION_WORKER_ENABLED", "true").lower() in ("1", "true", "yes")
+STORAGE_DELETION_POLL_SECONDS = float(os.getenv("STORAGE_DELETION_POLL_SECONDS", "5"))
+
+# Buffered audit log writer.
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1"))
+
+# Per-endpoint SQL statement budgets (app.query_budget): "log" warns with the
+# stack of every statement over budget, "strict" also fails the request
+# (tests, CI), "off" disables the checks.
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "log").lower()
+QUERY_BUDGET_STACK_DEPTH = int(os.getenv("QUERY_BUDGET_STACK_DEPTH", "30"))
+
+# Admission control (app.admission), per worker process; 0 disables a limit.
+# Per agency (X-Agency-Id): concurrent requests and a token bucket of RATE
+# requests per second with BURST capacity (defaults to RATE), answered with
+# 429. Globally: concurrent requests, and shedding while the decaying average
+# pool checkout wait exceeds SHED_POOL_WAIT_MS, answered with 503.
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "0"))
+ADMISSION_AGENCY_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_AGENCY_MAX_IN_FLIGHT", "0"))
+ADMISSION_AGENCY_RATE = float(os.getenv("ADMISSION_AGENCY_RATE", "0"))
+ADMISSION_AGENCY_BURST = float(os.getenv("ADMISSION_AGENCY_BURST", "0"))
+ADMISSION_MAX_AGENCIES = int(os.getenv("ADMISSION_MAX_AGENCIES", "10000"))
+ADMISSION_SHED_POOL_WAIT_MS = float(os.getenv("ADMISSION_SHED_POOL_WAIT_MS", "0"))
+ADMISSION_POOL_WAIT_HALF_LIFE_SECONDS = float(os.getenv("ADMISSION_POOL_WAIT_HALF_LIFE_SECONDS", "2"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+ADMISSION_EXEMPT_PATHS = [p for p in os.getenv("ADMISSION_EXEMPT_PATHS", "/metrics").split(",") if p]
@@ -1,9 +1,140 @@
-from sqlalchemy import create_engine
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from . import config
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from . import config, query_budget
+
+
+class RequestDBStats:
+    __slots__ = ("checkouts", "checkout_wait", "queries", "query_time", "scope")
+
+    def __init__(self, scope=None):
+        self.checkouts = 0
+        self.checkout_wait = 0.0
+        self.queries = 0
+        self.query_time = 0.0
+        # ASGI scope of the request; routing fills in its endpoint, which
+        # carries the query budget.
+        self.scope = scope
+
+
+# Set per request by the middleware in app.main. Threadpool workers run in a
+# copy of the request context, so they record into the same stats object.
+request_db_stats: ContextVar = ContextVar("request_db_stats", default=None)
+
+
+class _TimedCheckoutMixin:
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            stats = request_db_stats.get()
+            if stats is not None:
+                stats.checkouts += 1
+                stats.checkout_wait += time.perf_counter() - start
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_time += time.perf_counter() - conn.info.pop("query_start", time.perf_counter())
+        query_budget.record_statement(stats, statement)
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
 
-engine = create_engine(config.DATABASE_URL, pool_pre_ping=True)
+
+# In async mode the sync engine only serves the audit writer and storage
+# deletion threads.
+BACKGROUND_CONNECTIONS = 2
+
+
+def pool_sizes(connections=None):
+    # (pool_size, max_overflow) for one worker. Three quarters of the share
+    # stay open; the rest is overflow that is closed again when idle.
+    if connections is None:
+        if config.DB_CONNECTION_BUDGET is None:
+            return config.DB_POOL_SIZE, config.DB_MAX_OVERFLOW
+        connections = config.DB_CONNECTION_BUDGET // max(config.WEB_CONCURRENCY, 1)
+    connections = max(connections, 1)
+    pool_size = max(connections * 3 // 4, 1)
+    return pool_size, connections - pool_size
+
+
+def request_pool_sizes():
+    pool_size, max_overflow = pool_sizes()
+    if not config.DB_ASYNC_ENABLED or config.DB_CONNECTION_BUDGET is None:
+        return pool_size, max_overflow
+    return pool_sizes(pool_size + max_overflow - BACKGROUND_CONNECTIONS)
+
+
+if config.DB_ASYNC_ENABLED:
+    sync_pool_size, sync_max_overflow = BACKGROUND_CONNECTIONS, 0
+else:
+    sync_pool_size, sync_max_overflow = request_pool_sizes()
+
+engine = create_engine(
+    config.DATABASE_URL,
+    pool_pre_ping=True,
+    poolclass=TimedQueuePool,
+    pool_size=sync_pool_size,
+    max_overflow=sync_max_overflow,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+
+if config.DB_ASYNC_ENABLED:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_database_url = config.ASYNC_DATABASE_URL or make_url(config.DATABASE_URL).set(
+        drivername="postgresql+asyncpg"
+    )
+    async_pool_size, async_max_overflow = request_pool_sizes()
+    async_engine = create_async_engine(
+        async_database_url,
+        pool_pre_ping=True,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        pool_size=async_pool_size,
+        max_overflow=async_max_overflow,
+    )
+    # Objects are serialized after the greenlet that loaded them has returned,
+    # so they must not be expired by the commit.
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+# Sessions only check out a connection when the first statement runs, so
+# requests that never touch the database never hold one.
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 from app.models import Base
@@ -1,7 +1,11 @@
-from fastapi import Depends, HTTPException, status, Header
+from fastapi import Depends, HTTPException, status, Header, Request
 from fastapi.security import HTTPBearer
 import requests
 import uuid
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from jose import jwt, JWTError
 from typing import List
 
@@ -15,28 +19,90 @@ load_dotenv()
 LOGIN_SERVICE_URL = os.getenv("API_URL")
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
 
 http_bearer = HTTPBearer()
 
-def get_current_user(token: str = Depends(http_bearer)):
+
+class VerifiedTokenCache:
+    # Bounded LRU of verified claims keyed by the token's SHA-256 digest.
+    # Entries never outlive the token's own `exp`.
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return entry[1]
+
+    def set(self, digest, user, exp=None):
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        with self._lock:
+            self._entries[digest] = (expires_at, user)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = VerifiedTokenCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL_SECONDS)
+
+
+def verify_token(token: str):
+    digest = hashlib.sha256(token.encode()).digest()
+    user = token_cache.get(digest)
+    if user is not None:
+        return user
     try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        role_scope: str = payload.get("role_scope")
-        if email is None or role_scope is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-        return {"email": email, "role": role_scope, "id": email}
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    email: str = payload.get("sub")
+    role_scope: str = payload.get("role_scope")
+    if email is None or role_scope is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    user = {"email": email, "role": role_scope, "id": email}
+    exp = payload.get("exp")
+    token_cache.set(digest, user, exp if isinstance(exp, (int, float)) else None)
+    return user
+
+
+# The auth dependencies are async: they do no blocking I/O, so running them on
+# the event loop saves a threadpool hop each. FastAPI already resolves
+# get_current_user once per request even though require_role and
+# get_current_agency both depend on it; the result is also kept on
+# request.state for middleware.
+async def get_current_user(request: Request, token: str = Depends(http_bearer)):
+    user = dict(verify_token(token.credentials))
+    request.state.current_user = user
+    return user
 
 def require_role(allowed_roles: List[str]):
-    def role_checker(current_user: dict = Depends(get_current_user)):
-        user_role = current_user.get("role", "").upper()
-        if user_role not in [role.upper() for role in allowed_roles]:
+    # Compiled once when the route is declared.
+    allowed = frozenset(role.upper() for role in allowed_roles)
+
+    async def role_checker(current_user: dict = Depends(get_current_user)):
+        if current_user.get("role", "").upper() not in allowed:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Operation not permitted")
     return role_checker
 
-def get_current_agency(
+async def get_current_agency(
     x_agency_id: uuid.UUID = Header(...),
     current_user: dict = Depends(get_current_user),
 ):
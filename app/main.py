@@ -1,10 +1,16 @@
-from fastapi import FastAPI, Request, Depends
+import time
+
+from fastapi import FastAPI, Request, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 
-from . import routers
+from . import config, metrics, query_budget, routers
+from .admission import AdmissionControl
+from .audit import audit_writer
+from .replicas import replica_set
 from .schemas import ServiceRead, ChecklistItem
-from .database import SessionLocal
+from .database import RequestDBStats, request_db_stats
+from .storage_worker import StorageDeletionWorker
 
 app = FastAPI()
 
@@ -20,21 +26,84 @@ origins = [
     "https://domain-api.datainvestigo.com",
 ]
 
+# Added before CORS so rejections still carry CORS headers; db_stats_middleware
+# wraps both and records them.
+app.add_middleware(AdmissionControl)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Listings return their next page cursor and validator in headers.
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+storage_deletion_worker = StorageDeletionWorker()
+
+
+@app.on_event("startup")
+def start_storage_deletion_worker():
+    if config.STORAGE_DELETION_WORKER_ENABLED:
+        storage_deletion_worker.start()
+
+
+@app.on_event("shutdown")
+def stop_storage_deletion_worker():
+    storage_deletion_worker.stop()
+
+
+@app.on_event("startup")
+def start_audit_writer():
+    audit_writer.start()
+
+
+@app.on_event("shutdown")
+def flush_audit_writer():
+    audit_writer.stop()
+
+
+@app.on_event("startup")
+def start_replica_health_checks():
+    replica_set.start()
+
+
+@app.on_event("shutdown")
+def stop_replica_health_checks():
+    replica_set.stop()
+
+
 @app.middleware("http")
-async def db_session_middleware(request: Request, call_next):
-    request.state.db = SessionLocal()
-    response = await call_next(request)
-    request.state.db.close()
+async def db_stats_middleware(request: Request, call_next):
+    request.state.db_stats = stats = RequestDBStats(request.scope)
+    token = request_db_stats.set(stats)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        request_db_stats.reset(token)
+    metrics.observe_request(request, response.status_code, time.perf_counter() - start, stats)
+    query_budget.check_request(stats)
+    if stats.checkouts:
+        response.headers["Server-Timing"] = (
+            f"db-checkout;dur={stats.checkout_wait * 1000:.2f}, "
+            f'db-query;dur={stats.query_time * 1000:.2f};desc="{stats.queries}"'
+        )
     return response
 
-app.include_router(routers.services.router, prefix="/services", tags=["services"])
-app.include_router(routers.options.router, prefix="/options", tags=["options"])
-app.include_router(routers.clients.router, prefix="/clients", tags=["clients"])
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+def _router(module):
+    if config.DB_ASYNC_ENABLED:
+        return routers.aio.async_router(module.router)
+    return module.router
+
+app.include_router(_router(routers.services), prefix="/services", tags=["services"])
+app.include_router(_router(routers.options), prefix="/options", tags=["options"])
+app.include_router(_router(routers.clients), prefix="/clients", tags=["clients"])
+app.include_router(_router(routers.audit), prefix="/audit-logs", tags=["audit"])
+app.include_router(_router(routers.assignments), prefix="/assignments", tags=["assignments"])
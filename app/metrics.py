@@ -0,0 +1,99 @@
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from .audit import audit_writer
+from .cache import service_cache
+from .database import async_engine, engine
+from .replicas import replica_set
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+HTTP_REQUESTS = Counter("http_requests_total", "Requests by route and status.", ["method", "route", "status"])
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Request latency by route.", ["method", "route"], buckets=LATENCY_BUCKETS)
+DB_QUERIES = Histogram("db_queries_per_request", "Statements executed per request.", ["route"], buckets=QUERY_BUCKETS)
+DB_QUERY_TIME = Histogram("db_query_seconds_per_request", "Statement execution time per request.", ["route"], buckets=LATENCY_BUCKETS)
+DB_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds_per_request", "Time spent waiting for pool connections per request.", ["route"], buckets=LATENCY_BUCKETS
+)
+ADMISSION_REJECTIONS = Counter("admission_rejections_total", "Requests rejected by admission control.", ["reason"])
+S3_LATENCY = Histogram("s3_request_duration_seconds", "S3 call latency by operation.", ["operation"], buckets=LATENCY_BUCKETS)
+
+
+def route_label(request):
+    # The route template keeps label cardinality bounded; unmatched paths
+    # (404s, scanners) share one label.
+    route = request.scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+
+def observe_request(request, status_code, elapsed, stats):
+    # Called once per request from the middleware on the event loop; the
+    # per-request counters in `stats` are filled without locks by the
+    # database event hooks.
+    route = route_label(request)
+    HTTP_REQUESTS.labels(request.method, route, str(status_code)).inc()
+    HTTP_LATENCY.labels(request.method, route).observe(elapsed)
+    if stats is not None and stats.checkouts:
+        DB_QUERIES.labels(route).observe(stats.queries)
+        DB_QUERY_TIME.labels(route).observe(stats.query_time)
+        DB_CHECKOUT_WAIT.labels(route).observe(stats.checkout_wait)
+
+
+class PoolCollector:
+    # Pool, cache and audit writer state is read at scrape time rather than tracked on
+    # every checkout.
+
+    def collect(self):
+        engines = [("sync", engine)]
+        if async_engine is not None:
+            engines.append(("async", async_engine.sync_engine))
+        engines += [(f"replica-{index}", replica) for index, replica in enumerate(replica_set.engines)]
+        engines += [(f"replica-{index}-async", replica.sync_engine) for index, replica in enumerate(replica_set.async_engines)]
+        size = GaugeMetricFamily("db_pool_size", "Configured pool size.", labels=["engine"])
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections currently checked out.", labels=["engine"])
+        checked_in = GaugeMetricFamily("db_pool_checked_in", "Idle connections in the pool.", labels=["engine"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Connections open beyond the pool size.", labels=["engine"])
+        for name, pool_engine in engines:
+            pool = pool_engine.pool
+            size.add_metric([name], pool.size())
+            checked_out.add_metric([name], pool.checkedout())
+            checked_in.add_metric([name], pool.checkedin())
+            overflow.add_metric([name], max(pool.overflow(), 0))
+        yield from (size, checked_out, checked_in, overflow)
+
+        stats = service_cache.stats()
+        for key in ("hits", "misses", "evictions"):
+            if key in stats:
+                counter = CounterMetricFamily(f"cache_{key}", f"Service cache {key}.", labels=["backend"])
+                counter.add_metric([stats["backend"]], stats[key])
+                yield counter
+        if "entries" in stats:
+            entries = GaugeMetricFamily("cache_entries", "Entries in the local service cache.", labels=["backend"])
+            entries.add_metric([stats["backend"]], stats["entries"])
+            yield entries
+
+        written = CounterMetricFamily("audit_events_written", "Audit events written to the database.")
+        written.add_metric([], audit_writer.written)
+        dropped = CounterMetricFamily("audit_events_dropped", "Audit events dropped (queue full or failed write).")
+        dropped.add_metric([], audit_writer.dropped)
+        yield from (written, dropped)
+
+
+REGISTRY.register(PoolCollector())
+
+
+def render():
+    # With several worker processes, set PROMETHEUS_MULTIPROC_DIR so each
+    # worker writes its samples to shared files and a scrape of any worker
+    # aggregates all of them. Pool and cache gauges stay per process.
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(PoolCollector())
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -13,6 +13,12 @@ from sqlalchemy import (
     Enum,
     Date,
     Numeric,
+    Index,
+    BigInteger,
+    DDL,
+    event,
+    func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
@@ -51,7 +57,27 @@ class Service(Base):
     supporting_files = relationship("ServiceSupportingFile", back_populates="service", cascade="all, delete-orphan")
     clients = relationship("ClientService", back_populates="service", cascade="all, delete-orphan")
 
-    __table_args__ = (UniqueConstraint("agency_id", "name", name="uq_agency_id_name"),)
+    __table_args__ = (
+        UniqueConstraint("agency_id", "name", name="uq_agency_id_name"),
+        # Keyset pagination of list_services.
+        Index("ix_services_agency_id_created_at_id", "agency_id", "created_at", "id"),
+        # Due-service lookup of the recurring task scheduler.
+        Index(
+            "ix_services_recurring_frequency",
+            "auto_task_creation_frequency",
+            "target_date_creation_date",
+            postgresql_where=is_recurring.is_(True) & is_enabled.is_(True),
+        ),
+        # Substring and fuzzy name search within an agency (pg_trgm for the
+        # name, btree_gin for agency_id).
+        Index(
+            "ix_services_agency_id_name_trgm",
+            "agency_id",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
 
 class ServiceChecklist(Base):
@@ -65,6 +91,13 @@ class ServiceChecklist(Base):
 
     service = relationship("Service", back_populates="checklists")
 
+    __table_args__ = (
+        # Per-service listings read in sort order; also serves the ON DELETE CASCADE.
+        Index("ix_service_checklists_service_id_sort_order", "service_id", "sort_order"),
+        # Service search over checklist item text.
+        Index("ix_service_checklists_item_text_trgm", "item_text", postgresql_using="gin", postgresql_ops={"item_text": "gin_trgm_ops"}),
+    )
+
 
 class ServiceSubtask(Base):
     __tablename__ = "service_subtasks"
@@ -81,6 +114,36 @@ class ServiceSubtask(Base):
 
     service = relationship("Service", back_populates="subtasks")
 
+    __table_args__ = (Index("ix_service_subtasks_service_id_sort_order", "service_id", "sort_order"),)
+
+
+class ServiceAssignee(Base):
+    # Indexed copy of Service.assign_auto_tasks_to_users, which stays the
+    # API's source of truth; app.assignees rebuilds it on every write.
+    __tablename__ = "service_assignees"
+
+    service_id = Column(UUID(as_uuid=True), ForeignKey("services.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(String, primary_key=True)
+    agency_id = Column(UUID(as_uuid=True), nullable=False)
+
+    # Per-user listings within an agency, in service order.
+    __table_args__ = (Index("ix_service_assignees_agency_id_user_id", "agency_id", "user_id", "service_id"),)
+
+
+class ServiceSubtaskAssignee(Base):
+    # Indexed copy of ServiceSubtask.users, kept like ServiceAssignee.
+    __tablename__ = "service_subtask_assignees"
+
+    subtask_id = Column(UUID(as_uuid=True), ForeignKey("service_subtasks.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(String, primary_key=True)
+    # Denormalized so a user's subtasks are one index range.
+    service_id = Column(UUID(as_uuid=True), nullable=False)
+    agency_id = Column(UUID(as_uuid=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_service_subtask_assignees_agency_id_user_id", "agency_id", "user_id", "service_id", "subtask_id"),
+    )
+
 
 class ClientService(Base):
     __tablename__ = "client_services"
@@ -91,6 +154,13 @@ class ClientService(Base):
 
     service = relationship("Service", back_populates="clients")
 
+    # The unique constraint's index serves client_id lookups; service_id
+    # lookups (counts, unassign, cascades) need their own.
+    __table_args__ = (
+        UniqueConstraint("client_id", "service_id", name="uq_client_services_client_service"),
+        Index("ix_client_services_service_id_client_id", "service_id", "client_id"),
+    )
+
 
 class ServiceSupportingFile(Base):
     __tablename__ = "service_supporting_files"
@@ -104,3 +174,88 @@ class ServiceSupportingFile(Base):
     uploaded_at = Column(DateTime(timezone=True), default=datetime.utcnow)
 
     service = relationship("Service", back_populates="supporting_files")
+
+    __table_args__ = (
+        Index("ix_service_supporting_files_service_id", "service_id"),
+        # One row per stored object: deleting a row queues its object's deletion.
+        UniqueConstraint("file_path", name="uq_service_supporting_files_file_path"),
+    )
+
+
+class StorageDeletion(Base):
+    # Durable queue of S3 objects to delete, drained by app.storage_worker.
+    __tablename__ = "storage_deletions"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    file_path = Column(String, nullable=False)
+    # Server-side defaults so rows can be queued with INSERT ... SELECT.
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index("ix_storage_deletions_next_attempt_at", "next_attempt_at"),)
+
+
+class ServiceTask(Base):
+    # One task per client, recurring service and period, generated by
+    # app.scheduler.
+    __tablename__ = "service_tasks"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    service_id = Column(UUID(as_uuid=True), ForeignKey("services.id", ondelete="CASCADE"), nullable=False)
+    client_id = Column(UUID(as_uuid=True), nullable=False)
+    period = Column(String, nullable=False)
+    period_start = Column(Date, nullable=False)
+    title = Column(String, nullable=False)
+    assigned_users = Column(JSON, nullable=True)
+    assign_to_users_of_client = Column(Boolean, nullable=False, server_default=text("false"))
+    status = Column(String, nullable=False, server_default=text("'open'"))
+    generation_run_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    subtasks = relationship("ServiceTaskSubtask", back_populates="task", cascade="all, delete-orphan")
+
+    __table_args__ = (UniqueConstraint("service_id", "client_id", "period", name="uq_service_tasks_service_client_period"),)
+
+
+class ServiceTaskSubtask(Base):
+    __tablename__ = "service_task_subtasks"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    task_id = Column(UUID(as_uuid=True), ForeignKey("service_tasks.id", ondelete="CASCADE"), nullable=False)
+    subtask_id = Column(UUID(as_uuid=True), ForeignKey("service_subtasks.id", ondelete="SET NULL"), nullable=True)
+    title = Column(String, nullable=False)
+    description = Column(String, nullable=True)
+    users = Column(JSON, nullable=True)
+    enable_workflow = Column(Boolean, default=False)
+    sort_order = Column(Integer, default=0)
+    status = Column(String, nullable=False, server_default=text("'open'"))
+
+    task = relationship("ServiceTask", back_populates="subtasks")
+
+    __table_args__ = (
+        UniqueConstraint("task_id", "subtask_id", name="uq_service_task_subtasks_task_subtask"),
+        # ON DELETE SET NULL when a template subtask is removed.
+        Index("ix_service_task_subtasks_subtask_id", "subtask_id"),
+    )
+
+
+class AuditLog(Base):
+    __tablename__ = "audit_logs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    agency_id = Column(UUID(as_uuid=True), nullable=True)
+    # Token subject of the acting user (currently their email).
+    user_id = Column(String, nullable=False)
+    action = Column(String, nullable=False)
+    details = Column(String, nullable=False)
+    timestamp = Column(DateTime(timezone=True), default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_audit_logs_agency_id_timestamp_id", "agency_id", "timestamp", "id"),)
+
+
+# The search indexes need these extensions when the schema is created with
+# create_all instead of the migrations.
+for extension in ("pg_trgm", "btree_gin"):
+    event.listen(Base.metadata, "before_create", DDL(f"CREATE EXTENSION IF NOT EXISTS {extension}").execute_if(dialect="postgresql"))
@@ -1,14 +0,0 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
-import uuid
-from datetime import datetime
-from ..database import Base
-
-class AuditLog(Base):
-    __tablename__ = "audit_logs"
-
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), nullable=False)
-    action = Column(String, nullable=False)
-    details = Column(String, nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
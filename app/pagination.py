@@ -0,0 +1,50 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+from fastapi import HTTPException, status
+
+
+# Opaque keyset cursors over (timestamp, id).
+def encode_cursor(timestamp, row_id):
+    raw = json.dumps([timestamp.isoformat(), str(row_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+# Opaque keyset cursors over (rank, name, id) for ranked search results.
+def encode_rank_cursor(rank, name, row_id):
+    raw = json.dumps([rank, name, str(row_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_rank_cursor(cursor):
+    try:
+        rank, name, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(rank), str(name), uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+# Opaque keyset cursors over a fixed number of ids.
+def encode_id_cursor(*ids):
+    raw = json.dumps([str(value) for value in ids])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_id_cursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != size:
+            raise ValueError
+        return tuple(uuid.UUID(value) for value in values)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
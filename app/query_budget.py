@@ -0,0 +1,57 @@
+import logging
+import traceback
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries):
+    # Declares how many SQL statements one request to the endpoint may run.
+    # functools.wraps/update_wrapper copy the attribute onto wrappers (see
+    # routers.aio), so the budget follows the endpoint.
+    def decorator(endpoint):
+        endpoint.__query_budget__ = max_queries
+        return endpoint
+    return decorator
+
+
+def budget_for(scope):
+    return getattr(scope.get("endpoint"), "__query_budget__", None)
+
+
+def record_statement(stats, statement):
+    # Called by the cursor-execute hook after every statement. Only the
+    # statements beyond the budget pay for a stack trace, and those are the
+    # ones that point at the N+1.
+    if config.QUERY_BUDGET_MODE == "off" or stats.scope is None:
+        return
+    budget = budget_for(stats.scope)
+    if budget is None or stats.queries <= budget:
+        return
+    logger.warning(
+        "Query %d exceeds budget of %d for %s: %s\n%s",
+        stats.queries,
+        budget,
+        stats.scope.get("path"),
+        statement,
+        "".join(traceback.format_stack(limit=config.QUERY_BUDGET_STACK_DEPTH)),
+    )
+
+
+def check_request(stats):
+    # Called by the middleware after the response. In strict mode (tests,
+    # CI) a request over its budget raises instead of only logging.
+    if config.QUERY_BUDGET_MODE == "off" or stats.scope is None:
+        return
+    budget = budget_for(stats.scope)
+    if budget is None or stats.queries <= budget:
+        return
+    message = f"{stats.scope.get('method')} {stats.scope.get('path')} ran {stats.queries} queries, budget is {budget}"
+    if config.QUERY_BUDGET_MODE == "strict":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
@@ -0,0 +1,126 @@
+import itertools
+import logging
+import threading
+
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from . import config
+# Pins live with the cache, whose invalidations set them.
+from .cache import is_pinned, pin_to_primary
+from .database import (
+    AsyncSessionLocal,
+    SessionLocal,
+    TimedAsyncAdaptedQueuePool,
+    TimedQueuePool,
+    request_pool_sizes,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    # Round-robin over the healthy replicas. A background thread probes each
+    # one with SELECT 1; a replica that fails is skipped until it answers
+    # again, and with none healthy reads fall back to the primary.
+
+    def __init__(self, urls, check_interval=config.REPLICA_HEALTH_CHECK_SECONDS):
+        pool_size, max_overflow = request_pool_sizes()
+        # In async mode the sync engines only run the health checks.
+        sync_pool_size, sync_max_overflow = (1, 0) if config.DB_ASYNC_ENABLED else (pool_size, max_overflow)
+        self.engines = [
+            create_engine(url, pool_pre_ping=True, poolclass=TimedQueuePool, pool_size=sync_pool_size, max_overflow=sync_max_overflow)
+            for url in urls
+        ]
+        self.async_engines = []
+        if config.DB_ASYNC_ENABLED:
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            self.async_engines = [
+                create_async_engine(
+                    make_url(url).set(drivername="postgresql+asyncpg"),
+                    pool_pre_ping=True,
+                    poolclass=TimedAsyncAdaptedQueuePool,
+                    pool_size=pool_size,
+                    max_overflow=max_overflow,
+                )
+                for url in urls
+            ]
+        self.check_interval = check_interval
+        self.healthy = list(range(len(self.engines)))
+        self._counter = itertools.count()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def choose(self):
+        # Index of the next healthy replica, or None to use the primary.
+        healthy = self.healthy
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def check(self):
+        healthy = []
+        for index, engine in enumerate(self.engines):
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                healthy.append(index)
+            except Exception as exc:
+                logger.warning("Replica %s failed its health check: %s", engine.url.render_as_string(hide_password=True), exc)
+        # Replaced in one assignment so readers never see a partial list.
+        self.healthy = healthy
+
+    def start(self):
+        if not self.engines:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-health-check", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            self.check()
+            if self._stop.wait(self.check_interval):
+                return
+
+
+replica_set = ReplicaSet(config.DATABASE_REPLICA_URLS)
+
+
+def agency_header(request):
+    agency_id = request.headers.get("x-agency-id")
+    return agency_id.lower() if agency_id else None
+
+
+def read_session(agency_id):
+    # A session on a replica unless the agency wrote recently or no replica
+    # is healthy.
+    index = None if is_pinned(agency_id) else replica_set.choose()
+    return SessionLocal() if index is None else Session(bind=replica_set.engines[index], autoflush=False)
+
+
+def async_read_session(agency_id):
+    index = None if is_pinned(agency_id) else replica_set.choose()
+    return AsyncSessionLocal() if index is None else AsyncSessionLocal(bind=replica_set.async_engines[index])
+
+
+# Dependencies for read-only endpoints.
+def get_read_db(request: Request):
+    db = read_session(agency_header(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    async with async_read_session(agency_header(request)) as db:
+        yield db
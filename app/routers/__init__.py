@@ -1,3 +1,6 @@
 from . import services
 from . import options
 from . import clients
+from . import aio
+from . import audit
+from . import assignments
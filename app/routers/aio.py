@@ -0,0 +1,91 @@
+import functools
+import inspect
+
+from fastapi import APIRouter, Depends, Response
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+
+from ..database import get_async_db, get_db
+from ..replicas import get_async_read_db, get_read_db
+
+# Async counterpart of each session dependency.
+ASYNC_SESSIONS = {get_db: get_async_db, get_read_db: get_async_read_db}
+
+# Endpoints doing blocking non-database I/O (S3) stay on the threadpool.
+THREADPOOL_ENDPOINTS = {"upload_file", "create_upload_url", "finalize_upload"}
+
+
+def _is_async_candidate(route):
+    if not isinstance(route, APIRoute) or route.name in THREADPOOL_ENDPOINTS:
+        return False
+    if inspect.iscoroutinefunction(route.endpoint):
+        return False
+    return "db" in inspect.signature(route.endpoint).parameters
+
+
+def asyncify(route: APIRoute):
+    # The sync handler body runs unchanged inside AsyncSession.run_sync, i.e. in
+    # a greenlet on the event loop: every query awaits asyncpg instead of
+    # blocking a threadpool thread. Blocking non-database calls made there
+    # must not block the loop (see RedisCache._call, AuditWriter.record).
+    # The result is validated against the response model and dumped to JSON
+    # types in the same greenlet so lazy loads still work; the async route is
+    # registered without a response_model so it is not validated twice.
+    endpoint = route.endpoint
+    signature = inspect.signature(endpoint)
+    db_param = signature.parameters["db"]
+    session_dependency = ASYNC_SESSIONS[getattr(db_param.default, "dependency", get_db)]
+    adapter = TypeAdapter(route.response_model) if route.response_model is not None else None
+
+    async def async_endpoint(**kwargs):
+        db = kwargs.pop("db")
+
+        def call(session):
+            result = endpoint(db=session, **kwargs)
+            if adapter is None or isinstance(result, Response):
+                return result
+            return adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json")
+
+        return await db.run_sync(call)
+
+    functools.update_wrapper(async_endpoint, endpoint)
+    async_endpoint.__signature__ = signature.replace(
+        parameters=[
+            param.replace(default=Depends(session_dependency)) if param.name == "db" else param
+            for param in signature.parameters.values()
+        ]
+    )
+    return async_endpoint
+
+
+def async_router(router: APIRouter) -> APIRouter:
+    # Same routes in the same order, with the database-bound handlers swapped
+    # for their async counterparts.
+    result = APIRouter()
+    for route in router.routes:
+        if not _is_async_candidate(route):
+            result.routes.append(route)
+            continue
+        responses = route.responses
+        if route.response_model is not None:
+            # The OpenAPI schema still documents the response model.
+            responses = {**responses, route.status_code or 200: {"model": route.response_model}}
+        result.add_api_route(
+            route.path,
+            asyncify(route),
+            response_model=None,
+            status_code=route.status_code,
+            tags=route.tags,
+            dependencies=route.dependencies,
+            summary=route.summary,
+            description=route.description,
+            response_description=route.response_description,
+            responses=responses,
+            deprecated=route.deprecated,
+            methods=route.methods,
+            operation_id=route.operation_id,
+            include_in_schema=route.include_in_schema,
+            response_class=route.response_class,
+            name=route.name,
+        )
+    return result
@@ -0,0 +1,78 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..replicas import get_read_db
+from ..query_budget import query_budget
+from ..dependencies import get_current_agency, require_role
+from ..pagination import decode_id_cursor, encode_id_cursor
+
+router = APIRouter()
+
+SUBTASK_FIELDS = list(schemas.Subtask.model_fields)
+
+# Both listings are a range scan of the assignee table's (agency_id, user_id,
+# ...) index, keyset-paginated in index order, joined to the page's rows by
+# primary key.
+
+@router.get("/{user_id}/subtasks", response_model=List[schemas.AssignedSubtask], dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT", "CA_TEAM"]))])
+@query_budget(1)
+def list_assigned_subtasks(
+    user_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    db: Session = Depends(get_read_db),
+    current_agency: dict = Depends(get_current_agency),
+):
+    assignee = models.ServiceSubtaskAssignee
+    query = (
+        select(
+            *(getattr(models.ServiceSubtask, name) for name in SUBTASK_FIELDS),
+            models.Service.name.label("service_name"),
+        )
+        .select_from(assignee)
+        .join(models.ServiceSubtask, models.ServiceSubtask.id == assignee.subtask_id)
+        .join(models.Service, models.Service.id == assignee.service_id)
+        .where(assignee.agency_id == current_agency["id"], assignee.user_id == user_id)
+    )
+    if cursor is not None:
+        query = query.where(tuple_(assignee.service_id, assignee.subtask_id) > decode_id_cursor(cursor, 2))
+    query = query.order_by(assignee.service_id, assignee.subtask_id).limit(limit + 1)
+
+    rows = db.execute(query).mappings().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_id_cursor(rows[-1]["service_id"], rows[-1]["id"])
+    return rows
+
+
+@router.get("/{user_id}/services", response_model=List[schemas.AssignedService], dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT", "CA_TEAM"]))])
+@query_budget(1)
+def list_assigned_services(
+    user_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    db: Session = Depends(get_read_db),
+    current_agency: dict = Depends(get_current_agency),
+):
+    assignee = models.ServiceAssignee
+    query = (
+        select(models.Service.id, models.Service.name, models.Service.is_enabled, models.Service.is_recurring)
+        .select_from(assignee)
+        .join(models.Service, models.Service.id == assignee.service_id)
+        .where(assignee.agency_id == current_agency["id"], assignee.user_id == user_id)
+    )
+    if cursor is not None:
+        (last_service_id,) = decode_id_cursor(cursor, 1)
+        query = query.where(assignee.service_id > last_service_id)
+    query = query.order_by(assignee.service_id).limit(limit + 1)
+
+    rows = db.execute(query).mappings().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_id_cursor(rows[-1]["id"])
+    return rows
@@ -0,0 +1,40 @@
+from typing import List, Optional
+import uuid
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..replicas import get_read_db
+from ..query_budget import query_budget
+from ..dependencies import get_current_agency, require_role
+from ..pagination import decode_cursor, encode_cursor
+
+router = APIRouter()
+
+@router.get("/", response_model=List[schemas.AuditLog], dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN"]))])
+@query_budget(1)
+def list_audit_logs(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    action: Optional[str] = None,
+    user_id: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_agency: dict = Depends(get_current_agency),
+):
+    # Newest first, keyset-paginated on (timestamp, id).
+    query = select(models.AuditLog).where(models.AuditLog.agency_id == current_agency["id"])
+    if action is not None:
+        query = query.where(models.AuditLog.action == action)
+    if user_id is not None:
+        query = query.where(models.AuditLog.user_id == user_id)
+    if cursor is not None:
+        query = query.where(tuple_(models.AuditLog.timestamp, models.AuditLog.id) < decode_cursor(cursor))
+    query = query.order_by(models.AuditLog.timestamp.desc(), models.AuditLog.id.desc()).limit(limit + 1)
+
+    logs = db.scalars(query).all()
+    if len(logs) > limit:
+        logs = logs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(logs[-1].timestamp, logs[-1].id)
+    return logs
@@ -1,26 +1,163 @@
-from typing import List
+from typing import Dict, List, Optional
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import any_, bindparam, delete, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
-from ..database import SessionLocal
+from ..database import get_db
+from ..replicas import get_read_db, pin_to_primary
+from ..query_budget import query_budget
 from ..dependencies import get_current_user, get_current_agency, require_role
 
 router = APIRouter()
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+ASSIGNMENT_ROLES = ["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]
+
+
+def _uuid_array(name, values):
+    return bindparam(name, list(dict.fromkeys(values)), type_=ARRAY(UUID(as_uuid=True)))
+
+
+def _agency_services(agency_id, service_ids):
+    return select(models.Service.id).where(
+        models.Service.id == any_(_uuid_array("service_ids", service_ids)),
+        models.Service.agency_id == agency_id,
+    )
+
+
+def _assign(db, agency_id, client_ids, service_ids):
+    # Inserts every (client, service) pair in one INSERT ... SELECT over the
+    # unnested client ids, skipping pairs that already exist and services
+    # outside the agency.
+    if not client_ids or not service_ids:
+        return 0
+    services = _agency_services(agency_id, service_ids).subquery()
+    result = db.execute(
+        insert(models.ClientService)
+        .from_select(
+            ["id", "client_id", "service_id"],
+            select(func.gen_random_uuid(), func.unnest(_uuid_array("client_ids", client_ids)), services.c.id),
+        )
+        .on_conflict_do_nothing(constraint="uq_client_services_client_service")
+    )
+    # Before the commit, so no read can reach a lagging replica after it.
+    pin_to_primary(agency_id)
+    db.commit()
+    return result.rowcount
+
+
+def _unassign(db, agency_id, client_ids, service_ids):
+    if not client_ids or not service_ids:
+        return 0
+    result = db.execute(
+        delete(models.ClientService).where(
+            models.ClientService.client_id == any_(_uuid_array("client_ids", client_ids)),
+            models.ClientService.service_id.in_(_agency_services(agency_id, service_ids)),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    pin_to_primary(agency_id)
+    db.commit()
+    return result.rowcount
+
+
+def _check_service(db, service_id, agency_id):
+    exists = db.scalar(select(models.Service.id).where(models.Service.id == service_id, models.Service.agency_id == agency_id))
+    if exists is None:
+        raise HTTPException(status_code=404, detail="Service not found")
+
+
+@router.post("/assignments", response_model=schemas.AssignmentResult, dependencies=[Depends(require_role(ASSIGNMENT_ROLES))])
+@query_budget(1)
+def assign_clients_to_services(
+    assignments: schemas.ClientServiceAssignments,
+    db: Session = Depends(get_db),
+    current_agency: dict = Depends(get_current_agency),
+):
+    return {"affected": _assign(db, current_agency["id"], assignments.client_ids, assignments.service_ids)}
+
+
+@router.post("/assignments/remove", response_model=schemas.AssignmentResult, dependencies=[Depends(require_role(ASSIGNMENT_ROLES))])
+@query_budget(1)
+def unassign_clients_from_services(
+    assignments: schemas.ClientServiceAssignments,
+    db: Session = Depends(get_db),
+    current_agency: dict = Depends(get_current_agency),
+):
+    return {"affected": _unassign(db, current_agency["id"], assignments.client_ids, assignments.service_ids)}
+
+
+@router.post("/services/{service_id}/assign", response_model=schemas.AssignmentResult, dependencies=[Depends(require_role(ASSIGNMENT_ROLES))])
+@query_budget(2)
+def assign_clients_to_service(
+    service_id: uuid.UUID,
+    clients_in: schemas.ClientIds,
+    db: Session = Depends(get_db),
+    current_agency: dict = Depends(get_current_agency),
+):
+    _check_service(db, service_id, current_agency["id"])
+    return {"affected": _assign(db, current_agency["id"], clients_in.client_ids, [service_id])}
+
+
+@router.post("/services/{service_id}/unassign", response_model=schemas.AssignmentResult, dependencies=[Depends(require_role(ASSIGNMENT_ROLES))])
+@query_budget(2)
+def unassign_clients_from_service(
+    service_id: uuid.UUID,
+    clients_in: schemas.ClientIds,
+    db: Session = Depends(get_db),
+    current_agency: dict = Depends(get_current_agency),
+):
+    _check_service(db, service_id, current_agency["id"])
+    return {"affected": _unassign(db, current_agency["id"], clients_in.client_ids, [service_id])}
+
+
+@router.post("/{client_id}/services/assign", response_model=schemas.AssignmentResult, dependencies=[Depends(require_role(ASSIGNMENT_ROLES))])
+@query_budget(1)
+def assign_services_to_client(
+    client_id: uuid.UUID,
+    services_in: schemas.ServiceIds,
+    db: Session = Depends(get_db),
+    current_agency: dict = Depends(get_current_agency),
+):
+    return {"affected": _assign(db, current_agency["id"], [client_id], services_in.service_ids)}
+
+
+@router.post("/{client_id}/services/unassign", response_model=schemas.AssignmentResult, dependencies=[Depends(require_role(ASSIGNMENT_ROLES))])
+@query_budget(1)
+def unassign_services_from_client(
+    client_id: uuid.UUID,
+    services_in: schemas.ServiceIds,
+    db: Session = Depends(get_db),
+    current_agency: dict = Depends(get_current_agency),
+):
+    return {"affected": _unassign(db, current_agency["id"], [client_id], services_in.service_ids)}
+
+
+@router.get("/counts", response_model=Dict[uuid.UUID, int], dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(1)
+def get_client_counts(
+    service_id: Optional[List[uuid.UUID]] = Query(None, description="Services to count; all of the agency's services when omitted"),
+    db: Session = Depends(get_read_db),
+    current_agency: dict = Depends(get_current_agency),
+):
+    # One GROUP BY for the whole service list page instead of a COUNT(*) per row.
+    query = (
+        select(models.Service.id, func.count(models.ClientService.id))
+        .outerjoin(models.ClientService, models.ClientService.service_id == models.Service.id)
+        .where(models.Service.agency_id == current_agency["id"])
+        .group_by(models.Service.id)
+    )
+    if service_id:
+        query = query.where(models.Service.id.in_(service_id))
+    return dict(db.execute(query).all())
 
 @router.get("/{service_id}/count", response_model=int, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(1)
 def get_client_count_for_service(
     service_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     count = db.query(models.ClientService).filter(models.ClientService.service_id == service_id).count()
     return count
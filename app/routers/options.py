@@ -1,25 +1,141 @@
 from typing import List
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Response
+from sqlalchemy import cast, delete, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.expression import ColumnElement
 from sqlalchemy.orm import Session
-import boto3
 
-from .. import models, schemas
-from ..database import SessionLocal
+from .. import assignees, audit, models, schemas
+from ..cache import bump_revision, conditional_response, invalidate_service, service_revision_key
+from ..database import get_db
+from ..replicas import get_read_db
+from ..query_budget import query_budget
 from ..dependencies import get_current_user, get_current_agency, require_role
-from .. import config
+from ..storage_worker import enqueue_deletions
+from .. import config, storage
 
 router = APIRouter()
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+def _get_agency_service(db, service_id, agency_id):
+    db_service = (
+        db.query(models.Service)
+        .filter(models.Service.id == service_id, models.Service.agency_id == agency_id)
+        .first()
+    )
+    if db_service is None:
+        raise HTTPException(status_code=404, detail="Service not found")
+    return db_service
+
+
+def _agency_service_ids(agency_id):
+    return select(models.Service.id).where(models.Service.agency_id == agency_id)
+
+
+# Single-statement writes: the agency scoping rides along in the statement and
+# RETURNING hands back the row, so a write is one round trip and an empty
+# result is the 404.
+def _insert_child(db, model, service_id, agency_id, values, on_conflict=None):
+    # INSERT ... SELECT: the SELECT yields a row only when the service
+    # belongs to the agency. The casts keep parameters such as NULLs and
+    # UUID strings from resolving to text in the SELECT list; SQL expressions
+    # are used as they are. With on_conflict (a unique constraint name) a
+    # conflicting insert is skipped and None returned instead of the 404.
+    table = model.__table__
+    values = {"id": uuid.uuid4(), **values}
+    columns = [
+        value if isinstance(value, ColumnElement) else cast(literal(value, table.c[key].type), table.c[key].type)
+        for key, value in values.items()
+    ]
+    statement = insert(table).from_select(
+        ["service_id", *values],
+        select(models.Service.id, *columns).where(models.Service.id == service_id, models.Service.agency_id == agency_id),
+    )
+    if on_conflict is not None:
+        statement = statement.on_conflict_do_nothing(constraint=on_conflict)
+    row = db.execute(statement.returning(*table.c)).mappings().one_or_none()
+    if row is None and on_conflict is None:
+        raise HTTPException(status_code=404, detail="Service not found")
+    return row
+
+
+def _next_sort_order(model, service_id):
+    # Appends after the service's last item, computed inside the INSERT.
+    return select(func.coalesce(func.max(model.sort_order), -1) + 1).where(model.service_id == service_id).scalar_subquery()
+
+
+def _child_scope(table, item_id, agency_id):
+    return table.c.id == item_id, table.c.service_id.in_(_agency_service_ids(agency_id))
+
+
+def _update_child(db, model, item_id, agency_id, values, detail):
+    table = model.__table__
+    scope = _child_scope(table, item_id, agency_id)
+    if values:
+        statement = update(table).where(*scope).values(**values).returning(*table.c)
+    else:
+        statement = select(*table.c).where(*scope)
+    row = db.execute(statement).mappings().one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail=detail)
+    return row
+
+
+def _delete_child(db, model, item_id, agency_id, detail):
+    table = model.__table__
+    service_id = db.scalar(delete(table).where(*_child_scope(table, item_id, agency_id)).returning(table.c.service_id))
+    if service_id is None:
+        raise HTTPException(status_code=404, detail=detail)
+    return service_id
+
+
+def _apply_batch(db, model, service_id, creates, updates, deletes, order):
+    # Applies a batch of creates/updates/deletes/reorders to the children of
+    # one service with one statement per kind and returns the final rows
+    # ordered by sort_order. Runs inside the caller's transaction.
+    existing = dict(db.execute(select(model.id, model.sort_order).where(model.service_id == service_id)).all())
+    unknown = (set(deletes) | {row["id"] for row in updates}) - existing.keys()
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown ids for this service: {', '.join(sorted(map(str, unknown)))}")
+    if any(row.get("id") in existing for row in creates):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Created id already exists")
+
+    if deletes:
+        db.execute(delete(model).where(model.service_id == service_id, model.id.in_(deletes)))
+    updates = [row for row in updates if len(row) > 1]
+    if updates:
+        db.execute(update(model), updates)
+
+    next_sort_order = max((value or 0 for value in existing.values()), default=-1) + 1
+    for row in creates:
+        if row.get("id") is None:
+            row["id"] = uuid.uuid4()
+        if row.get("sort_order") is None:
+            row["sort_order"] = next_sort_order
+            next_sort_order += 1
+        row["service_id"] = service_id
+    if creates:
+        # Ids are checked against this service above; one taken by another
+        # service's item only shows up as a primary key violation.
+        try:
+            db.execute(insert(model), creates)
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Created id already exists")
+
+    if order is not None:
+        remaining = (existing.keys() - set(deletes)) | {row["id"] for row in creates}
+        if len(order) != len(remaining) or set(order) != remaining:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="order must list every remaining id exactly once")
+        db.execute(update(model), [{"id": item_id, "sort_order": index} for index, item_id in enumerate(order)])
+
+    return db.scalars(select(model).where(model.service_id == service_id).order_by(model.sort_order, model.id)).all()
 
 @router.patch("/settings/{service_id}", response_model=schemas.ServiceRead, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(2)
 def update_service_settings(
     service_id: uuid.UUID,
     name: str = Form(None),
@@ -37,26 +153,19 @@ def update_service_settings(
     create_document_collection_request_automatically: bool = Form(None),
     document_request_default_message: str = Form(None),
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
     current_agency: dict = Depends(get_current_agency),
 ):
     agency_id = current_agency["id"]
-    db_service = (
-        db.query(models.Service)
-        .filter(models.Service.id == service_id, models.Service.agency_id == agency_id)
-        .first()
-    )
-    if db_service is None:
-        raise HTTPException(status_code=404, detail="Service not found")
-
     update_data = {
         "name": name,
         "is_enabled": is_enabled,
         "is_checklist_completion_required": is_checklist_completion_required,
         "is_recurring": is_recurring,
-        "auto_task_creation_frequency": auto_task_creation_frequency,
+        "auto_task_creation_frequency": schemas.FREQUENCY_DB_VALUES.get(auto_task_creation_frequency, auto_task_creation_frequency),
         "target_date_creation_date": target_date_creation_date,
         "assign_auto_tasks_to_users_of_respective_clients": assign_auto_tasks_to_users_of_respective_clients,
-        "assign_auto_tasks_to_users": [uuid.UUID(user_id) for user_id in assign_auto_tasks_to_users.split(",")] if assign_auto_tasks_to_users else [],
+        "assign_auto_tasks_to_users": [str(uuid.UUID(user_id)) for user_id in assign_auto_tasks_to_users.split(",")] if assign_auto_tasks_to_users else [],
         "billing_sac_code": billing_sac_code,
         "billing_gst_percent": billing_gst_percent,
         "billing_default_rate": billing_default_rate,
@@ -65,77 +174,137 @@ def update_service_settings(
         "document_request_default_message": document_request_default_message,
     }
 
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_service, key, value)
+    values = {key: value for key, value in update_data.items() if value is not None}
 
+    # UPDATE ... RETURNING as a CTE joined to the checklist: the updated
+    # service and its items come back in one round trip.
+    services = models.Service.__table__
+    checklists = models.ServiceChecklist.__table__
+    updated = (
+        update(services)
+        .where(services.c.id == service_id, services.c.agency_id == agency_id)
+        .values(**values)
+        .returning(*services.c)
+        .cte("updated")
+    )
+    rows = db.execute(
+        select(
+            updated,
+            *(column.label(f"checklist_{column.key}") for column in checklists.c),
+            select(services.c.assign_auto_tasks_to_users)
+            .where(services.c.id == updated.c.id)
+            .scalar_subquery()
+            .label("previous_assign_auto_tasks_to_users"),
+        )
+        .outerjoin(checklists, checklists.c.service_id == updated.c.id)
+        .order_by(checklists.c.sort_order, checklists.c.id)
+    ).mappings().all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Service not found")
+    result = {column.key: rows[0][column.key] for column in services.c}
+    result["checklists"] = [
+        {column.key: row[f"checklist_{column.key}"] for column in checklists.c} for row in rows if row["checklist_id"] is not None
+    ]
+    # Every statement in the WITH sees the same snapshot, so the services
+    # table read by the main SELECT still holds the users before the update.
+    if result["assign_auto_tasks_to_users"] != rows[0]["previous_assign_auto_tasks_to_users"]:
+        assignees.sync_service_assignees(db, [service_id])
     db.commit()
-    db.refresh(db_service)
-    return db_service
+    invalidate_service(agency_id, service_id)
+    audit.record("service.update_settings", current_user, agency_id, service_id=service_id, fields=sorted(values))
+    return result
 
 @router.post("/checklists/{service_id}", response_model=schemas.ChecklistItem, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(1)
 def create_checklist_item(
     service_id: uuid.UUID,
     checklist_item_in: schemas.ChecklistItemCreate,
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
     current_agency: dict = Depends(get_current_agency),
 ):
     agency_id = current_agency["id"]
-    db_service = (
-        db.query(models.Service)
-        .filter(models.Service.id == service_id, models.Service.agency_id == agency_id)
-        .first()
-    )
-    if db_service is None:
-        raise HTTPException(status_code=404, detail="Service not found")
+    db_checklist_item = _insert_child(db, models.ServiceChecklist, service_id, agency_id, {**checklist_item_in.dict(), "sort_order": _next_sort_order(models.ServiceChecklist, service_id)})
+    db.commit()
+    invalidate_service(agency_id, service_id)
+    audit.record("checklist.create", current_user, agency_id, service_id=service_id, checklist_item_id=db_checklist_item["id"])
+    return db_checklist_item
 
-    db_checklist_item = models.ServiceChecklist(
-        **checklist_item_in.dict(), service_id=service_id
+@router.post("/checklists/{service_id}/batch", response_model=List[schemas.ChecklistItem], dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(7)
+def batch_checklist_items(
+    service_id: uuid.UUID,
+    batch: schemas.ChecklistBatch,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    current_agency: dict = Depends(get_current_agency),
+):
+    agency_id = current_agency["id"]
+    _get_agency_service(db, service_id, agency_id)
+    items = _apply_batch(
+        db,
+        models.ServiceChecklist,
+        service_id,
+        creates=[item.dict() for item in batch.create],
+        updates=[item.dict(exclude_unset=True) for item in batch.update],
+        deletes=batch.delete,
+        order=batch.order,
     )
-    db.add(db_checklist_item)
+    result = [schemas.ChecklistItem.model_validate(item) for item in items]
     db.commit()
-    db.refresh(db_checklist_item)
-    return db_checklist_item
+    invalidate_service(agency_id, service_id)
+    audit.record("checklist.batch", current_user, agency_id, service_id=service_id, created=len(batch.create), updated=len(batch.update), deleted=len(batch.delete), reordered=batch.order is not None)
+    return result
 
 @router.get("/checklists/{service_id}", response_model=List[schemas.ChecklistItem], dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(1)
 def get_checklist_items(
     service_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
 ):
+    not_modified = conditional_response(request, response, service_revision_key(service_id))
+    if not_modified is not None:
+        return not_modified
     checklist_items = db.query(models.ServiceChecklist).filter(models.ServiceChecklist.service_id == service_id).all()
     return checklist_items
 
 @router.delete("/checklists/{checklist_item_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(1)
 def delete_checklist_item(
     checklist_item_id: uuid.UUID,
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    current_agency: dict = Depends(get_current_agency),
 ):
-    db_checklist_item = db.query(models.ServiceChecklist).filter(models.ServiceChecklist.id == checklist_item_id).first()
-    if db_checklist_item is None:
-        raise HTTPException(status_code=404, detail="Checklist item not found")
-    db.delete(db_checklist_item)
+    agency_id = current_agency["id"]
+    service_id = _delete_child(db, models.ServiceChecklist, checklist_item_id, agency_id, "Checklist item not found")
     db.commit()
+    invalidate_service(agency_id, service_id)
+    audit.record("checklist.delete", current_user, agency_id, service_id=service_id, checklist_item_id=checklist_item_id)
 
 
 @router.patch("/checklists/{checklist_item_id}", response_model=schemas.ChecklistItem, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(1)
 def update_checklist_item(
     checklist_item_id: uuid.UUID,
     checklist_item_in: schemas.ChecklistItemUpdate,
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    current_agency: dict = Depends(get_current_agency),
 ):
-    db_checklist_item = db.query(models.ServiceChecklist).filter(models.ServiceChecklist.id == checklist_item_id).first()
-    if db_checklist_item is None:
-        raise HTTPException(status_code=404, detail="Checklist item not found")
-
+    agency_id = current_agency["id"]
     update_data = checklist_item_in.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_checklist_item, key, value)
-
+    db_checklist_item = _update_child(db, models.ServiceChecklist, checklist_item_id, agency_id, update_data, "Checklist item not found")
+    service_id = db_checklist_item["service_id"]
     db.commit()
-    db.refresh(db_checklist_item)
+    invalidate_service(agency_id, service_id)
+    audit.record("checklist.update", current_user, agency_id, service_id=service_id, checklist_item_id=checklist_item_id, fields=sorted(update_data))
     return db_checklist_item
 
 @router.post("/subtasks/{service_id}", response_model=schemas.Subtask, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(2)
 def create_subtask(
     service_id: uuid.UUID,
     title: str = Form(...),
@@ -145,70 +314,117 @@ def create_subtask(
     users: str = Form(""),
     enable_workflow: bool = Form(False),
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
     current_agency: dict = Depends(get_current_agency),
 ):
     agency_id = current_agency["id"]
-    db_service = (
-        db.query(models.Service)
-        .filter(models.Service.id == service_id, models.Service.agency_id == agency_id)
-        .first()
+    db_subtask = _insert_child(
+        db,
+        models.ServiceSubtask,
+        service_id,
+        agency_id,
+        {
+            "title": title,
+            "description": description,
+            "due_date": due_date,
+            "target_date": target_date,
+            "users": [str(uuid.UUID(user_id)) for user_id in users.split(",")] if users else [],
+            "enable_workflow": enable_workflow,
+            "sort_order": _next_sort_order(models.ServiceSubtask, service_id),
+        },
     )
-    if db_service is None:
-        raise HTTPException(status_code=404, detail="Service not found")
+    if db_subtask["users"]:
+        assignees.sync_subtask_assignees(db, [db_subtask["id"]])
+    db.commit()
+    bump_revision(agency_id, service_revision_key(service_id))
+    audit.record("subtask.create", current_user, agency_id, service_id=service_id, subtask_id=db_subtask["id"])
+    return db_subtask
+
+def _subtask_row(data):
+    if data.get("users") is not None:
+        data["users"] = [str(user_id) for user_id in data["users"]]
+    return data
 
-    db_subtask = models.ServiceSubtask(
-        title=title,
-        description=description,
-        due_date=due_date,
-        target_date=target_date,
-        users=[str(uuid.UUID(user_id)) for user_id in users.split(",")] if users else [],
-        enable_workflow=enable_workflow,
-        service_id=service_id,
+
+@router.post("/subtasks/{service_id}/batch", response_model=List[schemas.Subtask], dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(8)
+def batch_subtasks(
+    service_id: uuid.UUID,
+    batch: schemas.SubtaskBatch,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    current_agency: dict = Depends(get_current_agency),
+):
+    agency_id = current_agency["id"]
+    _get_agency_service(db, service_id, agency_id)
+    subtasks = _apply_batch(
+        db,
+        models.ServiceSubtask,
+        service_id,
+        creates=[_subtask_row(subtask.dict()) for subtask in batch.create],
+        updates=[_subtask_row(subtask.dict(exclude_unset=True)) for subtask in batch.update],
+        deletes=batch.delete,
+        order=batch.order,
     )
-    db.add(db_subtask)
+    result = [schemas.Subtask.model_validate(subtask) for subtask in subtasks]
+    if batch.create or batch.update:
+        assignees.sync_subtask_assignees(db, assignees.subtasks_of_services([service_id]))
     db.commit()
-    db.refresh(db_subtask)
-    return db_subtask
+    bump_revision(agency_id, service_revision_key(service_id))
+    audit.record("subtask.batch", current_user, agency_id, service_id=service_id, created=len(batch.create), updated=len(batch.update), deleted=len(batch.delete), reordered=batch.order is not None)
+    return result
 
 @router.get("/subtasks/{service_id}", response_model=List[schemas.Subtask], dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(1)
 def get_subtasks(
     service_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
 ):
+    not_modified = conditional_response(request, response, service_revision_key(service_id))
+    if not_modified is not None:
+        return not_modified
     subtasks = db.query(models.ServiceSubtask).filter(models.ServiceSubtask.service_id == service_id).all()
     return subtasks
 
 @router.delete("/subtasks/{subtask_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(1)
 def delete_subtask(
     subtask_id: uuid.UUID,
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    current_agency: dict = Depends(get_current_agency),
 ):
-    db_subtask = db.query(models.ServiceSubtask).filter(models.ServiceSubtask.id == subtask_id).first()
-    if db_subtask is None:
-        raise HTTPException(status_code=404, detail="Subtask not found")
-    db.delete(db_subtask)
+    agency_id = current_agency["id"]
+    service_id = _delete_child(db, models.ServiceSubtask, subtask_id, agency_id, "Subtask not found")
     db.commit()
+    bump_revision(agency_id, service_revision_key(service_id))
+    audit.record("subtask.delete", current_user, agency_id, service_id=service_id, subtask_id=subtask_id)
 
 
 @router.patch("/subtasks/{subtask_id}", response_model=schemas.Subtask, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(2)
 def update_subtask(
     subtask_id: uuid.UUID,
     subtask_in: schemas.SubtaskUpdate,
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    current_agency: dict = Depends(get_current_agency),
 ):
-    db_subtask = db.query(models.ServiceSubtask).filter(models.ServiceSubtask.id == subtask_id).first()
-    if db_subtask is None:
-        raise HTTPException(status_code=404, detail="Subtask not found")
-
-    update_data = subtask_in.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_subtask, key, value)
-
+    agency_id = current_agency["id"]
+    update_data = _subtask_row(subtask_in.dict(exclude_unset=True))
+    db_subtask = _update_child(db, models.ServiceSubtask, subtask_id, agency_id, update_data, "Subtask not found")
+    service_id = db_subtask["service_id"]
+    if "users" in update_data:
+        assignees.sync_subtask_assignees(db, [subtask_id])
     db.commit()
-    db.refresh(db_subtask)
+    bump_revision(agency_id, service_revision_key(service_id))
+    audit.record("subtask.update", current_user, agency_id, service_id=service_id, subtask_id=subtask_id, fields=sorted(update_data))
     return db_subtask
 
 @router.post("/supporting-files/{service_id}", response_model=schemas.FileRead, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT", "CA_TEAM"]))])
+@query_budget(2)
 def upload_file(
     service_id: uuid.UUID,
     file: UploadFile = File(...),
@@ -227,54 +443,162 @@ def upload_file(
     if db_service is None:
         raise HTTPException(status_code=404, detail="Service not found")
 
-    s3 = boto3.client(
-        "s3",
-        aws_access_key_id=config.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY,
+    file_key = storage.new_object_key(service_id, file.filename)
+    storage.upload_fileobj(file.file, file_key)
+
+    db_file = _insert_child(
+        db,
+        models.ServiceSupportingFile,
+        service_id,
+        agency_id,
+        {
+            "file_name": file.filename,
+            "file_path": storage.file_path_for_key(file_key),
+            "mime_type": file.content_type,
+            "uploaded_by": user_id,
+            "uploaded_at": datetime.utcnow(),
+        },
+    )
+    db.commit()
+    bump_revision(agency_id, service_revision_key(service_id))
+    audit.record("file.upload", current_user, agency_id, service_id=service_id, file_id=db_file["id"], file_name=db_file["file_name"])
+    return db_file
+
+@router.post("/supporting-files/{service_id}/upload-url", response_model=schemas.FileUploadTicket, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT", "CA_TEAM"]))])
+@query_budget(1)
+def create_upload_url(
+    service_id: uuid.UUID,
+    upload_in: schemas.FileUploadRequest,
+    db: Session = Depends(get_db),
+    current_agency: dict = Depends(get_current_agency),
+):
+    if upload_in.size > config.S3_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large")
+    _get_agency_service(db, service_id, current_agency["id"])
+
+    # The client uploads straight to S3; the object only becomes a supporting
+    # file once finalize_upload has verified it.
+    file_key = storage.new_object_key(service_id, upload_in.file_name)
+    if upload_in.size <= config.S3_MULTIPART_THRESHOLD_BYTES:
+        post = storage.presigned_post(file_key, upload_in.mime_type)
+        return schemas.FileUploadTicket(
+            key=file_key,
+            method="POST",
+            expires_in=config.S3_PRESIGN_EXPIRES_SECONDS,
+            url=post["url"],
+            fields=post["fields"],
+        )
+    upload_id, part_urls = storage.create_multipart_upload(file_key, upload_in.size, upload_in.mime_type)
+    return schemas.FileUploadTicket(
+        key=file_key,
+        method="MULTIPART",
+        expires_in=config.S3_PRESIGN_EXPIRES_SECONDS,
+        upload_id=upload_id,
+        part_size=config.S3_MULTIPART_PART_SIZE,
+        part_urls=part_urls,
     )
-    bucket_name = config.S3_BUCKET_NAME
-    file_key = f"{service_id}/{uuid.uuid4()}_{file.filename}"
 
-    s3.upload_fileobj(file.file, bucket_name, file_key)
+@router.post("/supporting-files/{service_id}/finalize", response_model=schemas.FileRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT", "CA_TEAM"]))])
+@query_budget(3)
+def finalize_upload(
+    service_id: uuid.UUID,
+    finalize_in: schemas.FileFinalize,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    current_agency: dict = Depends(get_current_agency),
+):
+    if not finalize_in.key.startswith(storage.service_prefix(service_id)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Key does not belong to this service")
+    _get_agency_service(db, service_id, current_agency["id"])
+
+    if finalize_in.upload_id:
+        storage.complete_multipart_upload(
+            finalize_in.key,
+            finalize_in.upload_id,
+            [(part.part_number, part.etag) for part in sorted(finalize_in.parts, key=lambda part: part.part_number)],
+        )
+    head = storage.head_object(finalize_in.key)
+    if head is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded object not found")
 
-    db_file = models.ServiceSupportingFile(
-        service_id=service_id,
-        file_name=file.filename,
-        file_path=f"s3://{bucket_name}/{file_key}",
-        mime_type=file.content_type,
-        uploaded_by=user_id,
+    file_path = storage.file_path_for_key(finalize_in.key)
+    db_file = _insert_child(
+        db,
+        models.ServiceSupportingFile,
+        service_id,
+        current_agency["id"],
+        {
+            "file_name": finalize_in.file_name,
+            "file_path": file_path,
+            "mime_type": finalize_in.mime_type or head.get("ContentType"),
+            "uploaded_by": current_user["id"],
+            "uploaded_at": datetime.utcnow(),
+        },
+        on_conflict="uq_service_supporting_files_file_path",
     )
-    db.add(db_file)
+    if db_file is None:
+        # Already finalized (a retried request): answer with the existing row.
+        files = models.ServiceSupportingFile.__table__
+        return db.execute(select(*files.c).where(files.c.file_path == file_path, files.c.service_id == service_id)).mappings().one()
     db.commit()
-    db.refresh(db_file)
+    bump_revision(current_agency["id"], service_revision_key(service_id))
+    audit.record("file.upload", current_user, current_agency["id"], service_id=service_id, file_id=db_file["id"], file_name=db_file["file_name"])
     return db_file
 
+@router.get("/supporting-files/{file_id}/download-url", response_model=schemas.FileDownload, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT", "CA_TEAM"]))])
+@query_budget(1)
+def get_download_url(
+    file_id: uuid.UUID,
+    db: Session = Depends(get_read_db),
+    current_agency: dict = Depends(get_current_agency),
+):
+    db_file = (
+        db.query(models.ServiceSupportingFile)
+        .join(models.Service)
+        .filter(models.ServiceSupportingFile.id == file_id, models.Service.agency_id == current_agency["id"])
+        .first()
+    )
+    if db_file is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    url = storage.presigned_get(storage.key_for_file_path(db_file.file_path), db_file.file_name)
+    return schemas.FileDownload(url=url, expires_in=config.S3_PRESIGN_EXPIRES_SECONDS)
+
 @router.get("/supporting-files/{service_id}", response_model=List[schemas.FileRead], dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT", "CA_TEAM"]))])
+@query_budget(1)
 def get_supporting_files(
     service_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
 ):
+    not_modified = conditional_response(request, response, service_revision_key(service_id))
+    if not_modified is not None:
+        return not_modified
     supporting_files = db.query(models.ServiceSupportingFile).filter(models.ServiceSupportingFile.service_id == service_id).all()
     return supporting_files
 
 @router.delete("/supporting-files/{file_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(1)
 def delete_supporting_file(
     file_id: uuid.UUID,
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    current_agency: dict = Depends(get_current_agency),
 ):
-    db_file = db.query(models.ServiceSupportingFile).filter(models.ServiceSupportingFile.id == file_id).first()
-    if db_file is None:
-        raise HTTPException(status_code=404, detail="File not found")
-    
-    s3 = boto3.client(
-        "s3",
-        aws_access_key_id=config.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY,
+    agency_id = current_agency["id"]
+    # The row delete and the queueing of its object for the storage worker
+    # in one statement.
+    files = models.ServiceSupportingFile.__table__
+    deleted = (
+        delete(files)
+        .where(*_child_scope(files, file_id, agency_id))
+        .returning(files.c.service_id, files.c.file_path)
+        .cte("deleted")
     )
-    bucket_name = config.S3_BUCKET_NAME
-    file_key = "/".join(db_file.file_path.split("/")[3:])
-
-    s3.delete_object(Bucket=bucket_name, Key=file_key)
-
-    db.delete(db_file)
+    queued = enqueue_deletions(select(deleted.c.file_path)).cte("queued")
+    service_id = db.scalar(select(deleted.c.service_id).add_cte(queued))
+    if service_id is None:
+        raise HTTPException(status_code=404, detail="File not found")
     db.commit()
+    bump_revision(agency_id, service_revision_key(service_id))
+    audit.record("file.delete", current_user, agency_id, service_id=service_id, file_id=file_id)
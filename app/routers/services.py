@@ -1,20 +1,27 @@
-from typing import List
+from typing import List, Literal, Optional
+import hashlib
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Integer, case, cast, delete, func, or_, select, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
 import shutil
 from pathlib import Path
 
-from .. import models, schemas
+from .. import audit, models, schemas, serialization, service_templates
+from ..cache import agency_revision_key, conditional_response, get_revision, invalidate_service, service_cache, service_key, services_key
+from ..database import get_db
+from ..replicas import get_read_db
+from ..query_budget import query_budget
 from ..dependencies import get_current_user, get_current_agency, require_role
+from ..pagination import decode_cursor, decode_rank_cursor, encode_cursor, encode_rank_cursor
+from ..storage_worker import enqueue_deletions
 
 router = APIRouter()
 
-# Dependency
-def get_db(request: Request):
-    return request.state.db
-
 @router.post("/", response_model=schemas.ServiceRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(1)
 def create_service(
     service_in: schemas.ServiceCreate,
     db: Session = Depends(get_db),
@@ -24,72 +31,284 @@ def create_service(
     agency_id = current_agency["id"]
     user_id = current_user["id"]
 
-    # Check if service with the same name already exists for the agency
-    existing_service = db.query(models.Service).filter(
-        models.Service.agency_id == agency_id,
-        models.Service.name == service_in.name
-    ).first()
-    if existing_service:
+    # A single INSERT; uq_agency_id_name rejects duplicate names. The empty
+    # checklist collection and the Python-side defaults are already on the
+    # object after the flush, so the response needs no refresh.
+    db_service = models.Service(**service_in.dict(), agency_id=agency_id, created_by=user_id, checklists=[])
+    db.add(db_service)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Service with this name already exists for the agency"
         )
-
-    service_data = service_in.dict()
-    db_service = models.Service(
-        **service_data,
-        agency_id=agency_id,
-        created_by=user_id,
-    )
-    db.add(db_service)
+    result = schemas.ServiceRead.model_validate(db_service)
     db.commit()
-    db.refresh(db_service)
-    return db_service
+    invalidate_service(agency_id)
+    audit.record("service.create", current_user, agency_id, service_id=result.id, name=service_in.name)
+    return result
+
+
+SERVICE_READ_FIELDS = [name for name in schemas.ServiceRead.model_fields if name != "checklists"]
+SERVICE_COLUMNS = {column.key for column in models.Service.__table__.columns}
+CHECKLIST_FIELDS = list(schemas.ChecklistItem.model_fields)
+
+
+def _parse_fields(fields):
+    if fields is None:
+        return SERVICE_READ_FIELDS
+    selected = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = set(selected) - set(SERVICE_READ_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return selected
+
+
+def _load_checklists(db, service_ids):
+    rows = db.execute(
+        select(*(getattr(models.ServiceChecklist, name) for name in CHECKLIST_FIELDS))
+        .where(models.ServiceChecklist.service_id.in_(service_ids))
+        .order_by(models.ServiceChecklist.service_id, models.ServiceChecklist.sort_order)
+    ).mappings()
+    checklists = {service_id: [] for service_id in service_ids}
+    for row in rows:
+        checklists[row["service_id"]].append(dict(row))
+    return checklists
 
 
 @router.get("/", response_model=List[schemas.ServiceRead], dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT", "CA_TEAM", "CLIENT_ADMIN", "CLIENT_USER"]))])
+@query_budget(2)
 def list_services(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    is_enabled: Optional[bool] = None,
+    is_recurring: Optional[bool] = None,
+    frequency: Optional[schemas.FrequencyFilter] = None,
+    include_checklists: bool = True,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of ServiceRead fields"),
+    db: Session = Depends(get_read_db),
     current_agency: dict = Depends(get_current_agency),
 ):
     agency_id = current_agency["id"]
-    services = db.query(models.Service).options(joinedload(models.Service.checklists)).filter(models.Service.agency_id == agency_id).all()
-    return services
+    # Every query parameter changes the payload, so it is part of both the
+    # ETag and the cache key.
+    variant = hashlib.blake2b(str(request.query_params).encode(), digest_size=8).hexdigest() if request.query_params else ""
+    not_modified = conditional_response(request, response, agency_revision_key(agency_id), variant)
+    if not_modified is not None:
+        return not_modified
+
+    selected = _parse_fields(fields)
+
+    def load():
+        columns = {"id", "created_at", *(name for name in selected if name in SERVICE_COLUMNS)}
+        if "auto_task_creation_frequency" in columns:
+            columns.add("is_recurring")
+        query = select(*(getattr(models.Service, name) for name in sorted(columns))).where(models.Service.agency_id == agency_id)
+        if is_enabled is not None:
+            query = query.where(models.Service.is_enabled == is_enabled)
+        if is_recurring is not None:
+            query = query.where(models.Service.is_recurring == is_recurring)
+        if frequency is not None:
+            query = query.where(models.Service.auto_task_creation_frequency == schemas.FREQUENCY_DB_VALUES.get(frequency, frequency))
+        if cursor is not None:
+            query = query.where(tuple_(models.Service.created_at, models.Service.id) > decode_cursor(cursor))
+        query = query.order_by(models.Service.created_at, models.Service.id)
+        if limit is not None:
+            query = query.limit(limit + 1)
+
+        rows = db.execute(query).all()
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+        checklists = _load_checklists(db, [row.id for row in rows]) if include_checklists and rows else {}
+        items = []
+        for row in rows:
+            item = {name: getattr(row, name, None) for name in selected}
+            if "auto_task_creation_frequency" in item:
+                # As ServiceRead's validator does for get_service.
+                stored = item["auto_task_creation_frequency"] if row.is_recurring else None
+                item["auto_task_creation_frequency"] = schemas.FREQUENCY_API_VALUES.get(stored, stored)
+            if include_checklists:
+                item["checklists"] = checklists[row.id]
+            items.append(item)
+        return {"body": serialization.dumps(items).decode(), "next_cursor": next_cursor}
+
+    key = services_key(agency_id)
+    if variant:
+        key = f"{key}:{get_revision(agency_revision_key(agency_id))}:{variant}"
+    page = service_cache.get_or_load(key, load)
+    if page["next_cursor"] is not None:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    # The rows are already shaped like ServiceRead (or the requested subset),
+    # so the pre-encoded body skips response-model validation; the OpenAPI
+    # schema still comes from response_model.
+    return serialization.json_response(page["body"], response)
+
+
+def _like_pattern(value, prefix=False):
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%" if prefix else f"%{escaped}%"
+
+
+def _search_rank(q, fuzzy):
+    # Integer so that it round-trips exactly through the cursor: the match
+    # kind in the thousands, word similarity (0-1) below it.
+    kind = case(
+        (func.lower(models.Service.name) == q.lower(), 3),
+        (models.Service.name.ilike(_like_pattern(q, prefix=True), escape="\\"), 2),
+        (models.Service.name.ilike(_like_pattern(q), escape="\\"), 1),
+        else_=0,
+    )
+    if not fuzzy:
+        return kind * 1000
+    return kind * 1000 + cast(func.word_similarity(q, models.Service.name) * 999, Integer)
+
+
+@router.get("/search", response_model=List[schemas.ServiceSearchResult], dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT", "CA_TEAM", "CLIENT_ADMIN", "CLIENT_USER"]))])
+@query_budget(1)
+def search_services(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fuzzy: bool = True,
+    include_checklists: bool = Query(False, description="Also match checklist item text"),
+    db: Session = Depends(get_read_db),
+    current_agency: dict = Depends(get_current_agency),
+):
+    agency_id = current_agency["id"]
+    # On PostgreSQL ILIKE and the word-similarity operator (%>) are served by
+    # the pg_trgm GIN indexes; elsewhere (SQLite in local testing) only the
+    # substring match applies.
+    fuzzy = fuzzy and db.get_bind().dialect.name == "postgresql"
+    match = models.Service.name.ilike(_like_pattern(q), escape="\\")
+    if fuzzy:
+        match = or_(match, models.Service.name.op("%>")(q))
+    if include_checklists:
+        item_match = models.ServiceChecklist.item_text.ilike(_like_pattern(q), escape="\\")
+        if fuzzy:
+            item_match = or_(item_match, models.ServiceChecklist.item_text.op("%>")(q))
+        match = or_(match, models.Service.id.in_(select(models.ServiceChecklist.service_id).where(item_match)))
+
+    rank = _search_rank(q, fuzzy).label("rank")
+    query = select(models.Service.id, models.Service.name, models.Service.is_enabled, models.Service.is_recurring, rank).where(
+        models.Service.agency_id == agency_id, match
+    )
+    if cursor is not None:
+        last_rank, last_name, last_id = decode_rank_cursor(cursor)
+        query = query.where(tuple_(-rank, models.Service.name, models.Service.id) > (-last_rank, last_name, last_id))
+    rows = db.execute(query.order_by(rank.desc(), models.Service.name, models.Service.id).limit(limit + 1)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_rank_cursor(rows[-1].rank, rows[-1].name, rows[-1].id)
+    return [
+        {"id": row.id, "name": row.name, "is_enabled": row.is_enabled, "is_recurring": row.is_recurring, "score": row.rank / 1000}
+        for row in rows
+    ]
+
+
+# Export and import run as many statements as the catalog needs, so they have
+# no query budget.
+@router.get("/export", response_class=StreamingResponse, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+def export_services(current_agency: dict = Depends(get_current_agency)):
+    agency_id = current_agency["id"]
+    return StreamingResponse(
+        service_templates.export_lines(agency_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="services-{agency_id}.ndjson"'},
+    )
+
+
+@router.post("/import", response_model=schemas.ImportResult, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+async def import_services(
+    request: Request,
+    on_conflict: Literal["skip", "update"] = "skip",
+    current_user: dict = Depends(get_current_user),
+    current_agency: dict = Depends(get_current_agency),
+):
+    # The body is NDJSON as written by /services/export, read as it streams in.
+    agency_id = current_agency["id"]
+    # Each batch invalidates the cache as it commits. audit.record never
+    # blocks, so it can run on the event loop.
+    result = await service_templates.import_lines(request.stream(), agency_id, current_user["id"], on_conflict)
+    audit.record(
+        "service.import", current_user, agency_id,
+        created=result.created, updated=result.updated, skipped=result.skipped, failed=result.failed,
+    )
+    return result
 
 
 @router.get("/{service_id}", response_model=schemas.ServiceRead, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT", "CLIENT_ADMIN", "CLIENT_USER"]))])
+@query_budget(1)
 def get_service(
     service_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_agency: dict = Depends(get_current_agency),
 ):
     agency_id = current_agency["id"]
-    db_service = (
-        db.query(models.Service)
-        .options(joinedload(models.Service.checklists))
-        .filter(models.Service.id == service_id, models.Service.agency_id == agency_id)
-        .first()
-    )
-    if db_service is None:
-        raise HTTPException(status_code=404, detail="Service not found")
-    return db_service
 
+    def load():
+        db_service = (
+            db.query(models.Service)
+            .options(joinedload(models.Service.checklists))
+            .filter(models.Service.id == service_id, models.Service.agency_id == agency_id)
+            .first()
+        )
+        if db_service is None:
+            raise HTTPException(status_code=404, detail="Service not found")
+        return schemas.ServiceRead.model_validate(db_service).model_dump(mode="json")
 
+    # Validated once when cached; hits are encoded without re-validation.
+    return serialization.json_response(serialization.dumps(service_cache.get_or_load(service_key(agency_id, service_id), load)))
+
+
+@router.post("/{service_id}/clone", response_model=schemas.ServiceCloneResult, dependencies=[Depends(require_role(["SUPER_ADMIN"]))])
+@query_budget(6)
+def clone_service(
+    service_id: uuid.UUID,
+    clone_in: schemas.ServiceClone,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    current_agency: dict = Depends(get_current_agency),
+):
+    agency_id = current_agency["id"]
+    result = service_templates.clone_service(db, agency_id, service_id, clone_in.agency_ids, current_user["id"])
+    for target_agency_id in result.created:
+        invalidate_service(target_agency_id)
+    audit.record("service.clone", current_user, agency_id, service_id=service_id, agency_ids=list(result.created), skipped=result.skipped)
+    return result
 
 
 @router.delete("/{service_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_role(["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT"]))])
+@query_budget(1)
 def delete_service(
     service_id: uuid.UUID,
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
     current_agency: dict = Depends(get_current_agency),
 ):
     agency_id = current_agency["id"]
-    db_service = (
-        db.query(models.Service)
-        .filter(models.Service.id == service_id, models.Service.agency_id == agency_id)
-        .first()
+    # One statement: the agency-scoped DELETE ... RETURNING tells a missing
+    # service apart, and the CTE queues the supporting files (read from the
+    # snapshot before the delete) for the storage worker. Child rows go
+    # through ON DELETE CASCADE.
+    services = models.Service.__table__
+    files = models.ServiceSupportingFile.__table__
+    deleted = (
+        delete(services)
+        .where(services.c.id == service_id, services.c.agency_id == agency_id)
+        .returning(services.c.id)
+        .cte("deleted")
     )
-    if db_service is None:
+    queued = enqueue_deletions(select(files.c.file_path).join(deleted, files.c.service_id == deleted.c.id)).cte("queued")
+    if db.scalar(select(deleted.c.id).add_cte(queued)) is None:
         raise HTTPException(status_code=404, detail="Service not found")
-    db.delete(db_service)
     db.commit()
+    invalidate_service(agency_id, service_id)
+    audit.record("service.delete", current_user, agency_id, service_id=service_id)
@@ -0,0 +1,132 @@
+import uuid
+from datetime import date
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+
+from . import models
+
+
+def period_for(frequency, day):
+    # Returns (period key, first day of the period) for a calendar period.
+    if frequency == "monthly":
+        return f"{day.year}-{day.month:02d}", date(day.year, day.month, 1)
+    if frequency == "quarterly":
+        quarter = (day.month - 1) // 3
+        return f"{day.year}-Q{quarter + 1}", date(day.year, quarter * 3 + 1, 1)
+    if frequency == "half_yearly":
+        half = (day.month - 1) // 6
+        return f"{day.year}-H{half + 1}", date(day.year, half * 6 + 1, 1)
+    if frequency == "yearly":
+        return str(day.year), date(day.year, 1, 1)
+    raise ValueError(f"Unknown frequency: {frequency}")
+
+
+FREQUENCIES = ("monthly", "quarterly", "half_yearly", "yearly")
+PERIOD_MONTHS = {"monthly": 1, "quarterly": 3, "half_yearly": 6, "yearly": 12}
+
+
+def period_days(frequency, period_start):
+    months = period_start.month - 1 + PERIOD_MONTHS[frequency]
+    return (date(period_start.year + months // 12, months % 12 + 1, 1) - period_start).days
+
+
+def _due_services(frequency, day_of_period, last_day=False):
+    # target_date_creation_date is the day of the period on which tasks are
+    # created; services without one are due from the first day, and on the
+    # period's last day every service is due, so that day 31 still creates
+    # a task in a 30-day month. Matches the partial index
+    # ix_services_recurring_frequency.
+    conditions = (
+        models.Service.is_recurring.is_(True),
+        models.Service.is_enabled.is_(True),
+        models.Service.auto_task_creation_frequency == frequency,
+    )
+    if last_day:
+        return conditions
+    return (*conditions, func.coalesce(models.Service.target_date_creation_date, 1) <= day_of_period)
+
+
+def generate_tasks(db, today=None, dry_run=False):
+    # Creates the current period's task for every due (service, client) pair
+    # and copies the service's subtasks onto the new tasks, with two
+    # INSERT ... SELECT statements per frequency. The unique
+    # (service_id, client_id, period) constraint makes re-runs no-ops.
+    today = today or date.today()
+    run_id = uuid.uuid4()
+    summary = {"run_id": str(run_id), "date": today.isoformat(), "periods": {}}
+
+    for frequency in FREQUENCIES:
+        period, period_start = period_for(frequency, today)
+        day_of_period = (today - period_start).days + 1
+        due_conditions = _due_services(frequency, day_of_period, last_day=day_of_period == period_days(frequency, period_start))
+        pairs = (
+            select(models.Service, models.ClientService.client_id)
+            .join(models.ClientService, models.ClientService.service_id == models.Service.id)
+            .where(*due_conditions)
+        )
+
+        if dry_run:
+            due = db.scalar(select(func.count()).select_from(pairs.subquery()))
+            summary["periods"][period] = {"frequency": frequency, "due_pairs": due}
+            continue
+
+        tasks = db.execute(
+            insert(models.ServiceTask)
+            .from_select(
+                [
+                    "id",
+                    "service_id",
+                    "client_id",
+                    "period",
+                    "period_start",
+                    "title",
+                    "assigned_users",
+                    "assign_to_users_of_client",
+                    "generation_run_id",
+                ],
+                select(
+                    func.gen_random_uuid(),
+                    models.Service.id,
+                    models.ClientService.client_id,
+                    literal(period),
+                    literal(period_start),
+                    models.Service.name,
+                    models.Service.assign_auto_tasks_to_users,
+                    func.coalesce(models.Service.assign_auto_tasks_to_users_of_respective_clients, False),
+                    literal(run_id),
+                )
+                .join(models.ClientService, models.ClientService.service_id == models.Service.id)
+                .where(*due_conditions),
+            )
+            .on_conflict_do_nothing(constraint="uq_service_tasks_service_client_period")
+        )
+
+        subtasks = db.execute(
+            insert(models.ServiceTaskSubtask)
+            .from_select(
+                ["id", "task_id", "subtask_id", "title", "description", "users", "enable_workflow", "sort_order"],
+                select(
+                    func.gen_random_uuid(),
+                    models.ServiceTask.id,
+                    models.ServiceSubtask.id,
+                    models.ServiceSubtask.title,
+                    models.ServiceSubtask.description,
+                    models.ServiceSubtask.users,
+                    models.ServiceSubtask.enable_workflow,
+                    models.ServiceSubtask.sort_order,
+                )
+                .join(models.ServiceSubtask, models.ServiceSubtask.service_id == models.ServiceTask.service_id)
+                .where(models.ServiceTask.generation_run_id == run_id, models.ServiceTask.period == period),
+            )
+            .on_conflict_do_nothing(constraint="uq_service_task_subtasks_task_subtask")
+        )
+        summary["periods"][period] = {
+            "frequency": frequency,
+            "tasks_created": tasks.rowcount,
+            "subtasks_created": subtasks.rowcount,
+        }
+
+    if not dry_run:
+        db.commit()
+    return summary
@@ -1,6 +1,7 @@
 import uuid
 from datetime import date, datetime
-from typing import Optional, List, Literal
+from decimal import Decimal
+from typing import Optional, List, Literal, Dict
 from enum import Enum
 
 from pydantic import BaseModel, Field, validator
@@ -13,6 +14,13 @@ class AutoTaskCreationFrequency(str, Enum):
     annually = "annually"
 
 
+# The database enum spells "annually" as "yearly"; filters accept either and
+# responses always use the API spelling.
+FREQUENCY_DB_VALUES = {"annually": "yearly"}
+FREQUENCY_API_VALUES = {stored: value for value, stored in FREQUENCY_DB_VALUES.items()}
+FrequencyFilter = Literal["monthly", "quarterly", "half_yearly", "yearly", "annually"]
+
+
 # --- Service Schemas ---
 class ServiceBase(BaseModel):
     name: str
@@ -32,7 +40,7 @@ class ServiceBase(BaseModel):
             raise ValueError("Auto task creation frequency is required for recurring services")
         if not values.get("is_recurring"):
             return None
-        return v
+        return FREQUENCY_API_VALUES.get(v, v)
 
 
 class ServiceCreate(BaseModel):
@@ -49,6 +57,78 @@ class ServiceRead(ServiceBase):
         from_attributes = True
 
 
+class ServiceSearchResult(BaseModel):
+    id: uuid.UUID
+    name: str
+    is_enabled: bool
+    is_recurring: bool
+    # Higher is better: exact > prefix > substring > fuzzy/checklist match,
+    # then name similarity.
+    score: float
+
+
+# --- Service Template Schemas (NDJSON export/import, one service per line) ---
+class ChecklistTemplate(BaseModel):
+    item_text: str
+    is_required: bool = False
+    sort_order: int = 0
+
+
+class SubtaskTemplate(BaseModel):
+    title: str
+    description: Optional[str] = None
+    due_date: Optional[int] = None
+    target_date: Optional[int] = None
+    users: Optional[List[str]] = None
+    enable_workflow: bool = False
+    sort_order: int = 0
+
+
+class ServiceTemplate(BaseModel):
+    name: str = Field(..., min_length=1)
+    is_enabled: bool = True
+    is_checklist_completion_required: bool = False
+    is_recurring: bool = False
+    # Stored values, as written by the export.
+    auto_task_creation_frequency: Optional[Literal["monthly", "quarterly", "half_yearly", "yearly"]] = None
+    target_date_creation_date: Optional[int] = None
+    assign_auto_tasks_to_users_of_respective_clients: bool = False
+    assign_auto_tasks_to_users: Optional[List[str]] = None
+    billing_sac_code: Optional[str] = None
+    billing_gst_percent: Decimal = Decimal("0.00")
+    billing_default_rate: Decimal = Decimal("0.00")
+    billing_default_billable: bool = True
+    create_document_collection_request_automatically: bool = False
+    document_request_default_message: Optional[str] = None
+    checklists: List[ChecklistTemplate] = []
+    subtasks: List[SubtaskTemplate] = []
+
+
+class ImportLineError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportResult(BaseModel):
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    # The first lines that failed validation.
+    errors: List[ImportLineError] = []
+
+
+class ServiceClone(BaseModel):
+    agency_ids: List[uuid.UUID]
+
+
+class ServiceCloneResult(BaseModel):
+    # Target agency id -> id of the new service.
+    created: Dict[uuid.UUID, uuid.UUID]
+    # Agencies that already have a service with this name.
+    skipped: List[uuid.UUID]
+
+
 # --- Checklist Schemas ---
 class ChecklistItemCreate(BaseModel):
     item_text: str
@@ -70,6 +150,23 @@ class ChecklistItemUpdate(BaseModel):
     sort_order: Optional[int] = None
 
 
+class ChecklistItemBatchCreate(ChecklistItemCreate):
+    id: Optional[uuid.UUID] = None
+    sort_order: Optional[int] = None
+
+
+class ChecklistItemBatchUpdate(ChecklistItemUpdate):
+    id: uuid.UUID
+
+
+class ChecklistBatch(BaseModel):
+    create: List[ChecklistItemBatchCreate] = []
+    update: List[ChecklistItemBatchUpdate] = []
+    delete: List[uuid.UUID] = []
+    # Final order of every remaining item id, including created ones.
+    order: Optional[List[uuid.UUID]] = None
+
+
 # --- Subtask Schemas ---
 class SubtaskCreate(BaseModel):
     title: str
@@ -99,6 +196,34 @@ class SubtaskUpdate(BaseModel):
     sort_order: Optional[int] = None
 
 
+class SubtaskBatchCreate(SubtaskCreate):
+    id: Optional[uuid.UUID] = None
+    sort_order: Optional[int] = None
+
+
+class SubtaskBatchUpdate(SubtaskUpdate):
+    id: uuid.UUID
+
+
+class SubtaskBatch(BaseModel):
+    create: List[SubtaskBatchCreate] = []
+    update: List[SubtaskBatchUpdate] = []
+    delete: List[uuid.UUID] = []
+    # Final order of every remaining subtask id, including created ones.
+    order: Optional[List[uuid.UUID]] = None
+
+
+# --- Assignment Schemas ---
+class AssignedService(BaseModel):
+    id: uuid.UUID
+    name: str
+    is_enabled: bool
+    is_recurring: bool
+
+
+class AssignedSubtask(Subtask):
+    service_name: str
+
 
 # --- File Schemas ---
 class FileRead(BaseModel):
@@ -114,6 +239,43 @@ class FileRead(BaseModel):
         from_attributes = True
 
 
+class FileUploadRequest(BaseModel):
+    file_name: str
+    mime_type: Optional[str] = None
+    size: int = Field(..., gt=0)
+
+
+class FileUploadTicket(BaseModel):
+    key: str
+    method: Literal["POST", "MULTIPART"]
+    expires_in: int
+    # Single presigned POST: send `fields` plus the file as form data to `url`.
+    url: Optional[str] = None
+    fields: Dict[str, str] = {}
+    # Multipart: PUT each part_size chunk to part_urls[n] and keep its ETag.
+    upload_id: Optional[str] = None
+    part_size: Optional[int] = None
+    part_urls: List[str] = []
+
+
+class FileUploadPart(BaseModel):
+    part_number: int
+    etag: str
+
+
+class FileFinalize(BaseModel):
+    key: str
+    file_name: str
+    mime_type: Optional[str] = None
+    upload_id: Optional[str] = None
+    parts: List[FileUploadPart] = []
+
+
+class FileDownload(BaseModel):
+    url: str
+    expires_in: int
+
+
 # --- Client Service Schemas ---
 class ClientService(BaseModel):
     id: uuid.UUID
@@ -122,3 +284,40 @@ class ClientService(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ClientIds(BaseModel):
+    client_ids: List[uuid.UUID]
+
+
+class ServiceIds(BaseModel):
+    service_ids: List[uuid.UUID]
+
+
+class ClientServiceAssignments(BaseModel):
+    client_ids: List[uuid.UUID]
+    service_ids: List[uuid.UUID]
+
+
+class AssignmentResult(BaseModel):
+    affected: int
+
+
+# --- Audit Log Schemas ---
+class AuditLogBase(BaseModel):
+    action: str
+    details: str
+
+
+class AuditLogCreate(AuditLogBase):
+    pass
+
+
+class AuditLog(AuditLogBase):
+    id: uuid.UUID
+    agency_id: Optional[uuid.UUID] = None
+    user_id: str
+    timestamp: datetime
+
+    class Config:
+        from_attributes = True
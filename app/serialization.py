@@ -0,0 +1,29 @@
+import uuid
+from decimal import Decimal
+
+import orjson
+from fastapi import Response
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    # orjson only encodes uuid.UUID itself; asyncpg returns a subclass.
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value):
+    # Produces the same JSON as the pydantic response models: UTC datetimes
+    # end in "Z", UUIDs are plain strings and Decimals are strings.
+    return orjson.dumps(value, default=_default, option=orjson.OPT_UTC_Z)
+
+
+def json_response(body, response=None):
+    # `body` is already encoded JSON. Headers set on the injected `response`
+    # (ETag, cursors) are carried over.
+    headers = None
+    if response is not None:
+        headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    return Response(content=body, media_type="application/json", headers=headers)
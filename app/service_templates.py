@@ -0,0 +1,297 @@
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import bindparam, delete, func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert
+from sqlalchemy.exc import DBAPIError
+from starlette.concurrency import run_in_threadpool
+
+from . import assignees, config, models, schemas, serialization
+from .cache import invalidate_services
+from .database import AsyncSessionLocal, SessionLocal
+from .replicas import async_read_session, read_session
+
+# Portable service templates: one service per NDJSON line with its checklist
+# and subtasks nested, without ids, agency or authorship.
+SERVICE_FIELDS = [name for name in schemas.ServiceTemplate.model_fields if name not in ("checklists", "subtasks")]
+CHECKLIST_FIELDS = list(schemas.ChecklistTemplate.model_fields)
+SUBTASK_FIELDS = list(schemas.SubtaskTemplate.model_fields)
+MAX_REPORTED_ERRORS = 100
+
+
+def _services_query(agency_id):
+    return (
+        select(models.Service.id, *(getattr(models.Service, name) for name in SERVICE_FIELDS))
+        .where(models.Service.agency_id == agency_id)
+        .order_by(models.Service.name)
+        .execution_options(stream_results=True, yield_per=config.TEMPLATE_EXPORT_BATCH_SIZE)
+    )
+
+
+def _children_query(model, fields, service_ids):
+    return (
+        select(model.service_id, *(getattr(model, name) for name in fields))
+        .where(model.service_id.in_(service_ids))
+        .order_by(model.service_id, model.sort_order)
+    )
+
+
+def _group(rows, service_ids):
+    children = {service_id: [] for service_id in service_ids}
+    for row in rows:
+        row = dict(row)
+        children[row.pop("service_id")].append(row)
+    return children
+
+
+def _encode(services, checklists, subtasks):
+    lines = []
+    for service in services:
+        service_id = service.pop("id")
+        service["checklists"] = checklists[service_id]
+        service["subtasks"] = subtasks[service_id]
+        lines.append(serialization.dumps(service))
+    return b"\n".join(lines) + b"\n"
+
+
+def _export(agency_id):
+    # The services come from a server-side cursor one batch at a time and
+    # each batch's children are loaded with one query per table, so memory
+    # stays bounded by the batch size whatever the catalog size. Runs in the
+    # threadpool as the response is sent, on its own session: the request's
+    # dependencies are closed by then.
+    with read_session(agency_id) as db:
+        result = db.execute(_services_query(agency_id)).mappings()
+        for partition in result.partitions():
+            services = [dict(row) for row in partition]
+            service_ids = [service["id"] for service in services]
+            checklists = _group(db.execute(_children_query(models.ServiceChecklist, CHECKLIST_FIELDS, service_ids)).mappings(), service_ids)
+            subtasks = _group(db.execute(_children_query(models.ServiceSubtask, SUBTASK_FIELDS, service_ids)).mappings(), service_ids)
+            yield _encode(services, checklists, subtasks)
+
+
+async def _export_async(agency_id):
+    async with async_read_session(agency_id) as db:
+        result = (await db.stream(_services_query(agency_id))).mappings()
+        async for partition in result.partitions():
+            services = [dict(row) for row in partition]
+            service_ids = [service["id"] for service in services]
+            checklists = _group((await db.execute(_children_query(models.ServiceChecklist, CHECKLIST_FIELDS, service_ids))).mappings(), service_ids)
+            subtasks = _group((await db.execute(_children_query(models.ServiceSubtask, SUBTASK_FIELDS, service_ids))).mappings(), service_ids)
+            yield _encode(services, checklists, subtasks)
+
+
+def export_lines(agency_id):
+    return _export_async(agency_id) if config.DB_ASYNC_ENABLED else _export(agency_id)
+
+
+def import_batch(db, agency_id, user_id, on_conflict, templates):
+    # One multi-row INSERT ... ON CONFLICT for the services, then executemany
+    # inserts for the children of the services written. A service counts as
+    # created when RETURNING hands back the id generated here; on conflict it
+    # is either skipped or has its settings overwritten and its checklist and
+    # subtasks replaced. A database error rolls the whole batch back.
+    try:
+        return _import_batch(db, agency_id, user_id, on_conflict, templates)
+    except DBAPIError:
+        db.rollback()
+        raise
+
+
+def _import_batch(db, agency_id, user_id, on_conflict, templates):
+    now = datetime.utcnow()
+    rows = [
+        {**template.model_dump(include=set(SERVICE_FIELDS)), "id": uuid.uuid4(), "agency_id": agency_id, "created_by": user_id, "created_at": now}
+        for template in templates
+    ]
+    statement = insert(models.Service).values(rows)
+    if on_conflict == "update":
+        statement = statement.on_conflict_do_update(
+            constraint="uq_agency_id_name",
+            set_={name: statement.excluded[name] for name in SERVICE_FIELDS if name != "name"},
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(constraint="uq_agency_id_name")
+    written = {row.name: row.id for row in db.execute(statement.returning(models.Service.id, models.Service.name))}
+
+    generated = {row["name"]: row["id"] for row in rows}
+    updated = [service_id for name, service_id in written.items() if generated[name] != service_id]
+    if updated:
+        db.execute(delete(models.ServiceChecklist).where(models.ServiceChecklist.service_id.in_(updated)))
+        db.execute(delete(models.ServiceSubtask).where(models.ServiceSubtask.service_id.in_(updated)))
+
+    checklists = [
+        {**item.model_dump(), "id": uuid.uuid4(), "service_id": written[template.name]}
+        for template in templates
+        if template.name in written
+        for item in template.checklists
+    ]
+    subtasks = [
+        {**item.model_dump(), "id": uuid.uuid4(), "service_id": written[template.name]}
+        for template in templates
+        if template.name in written
+        for item in template.subtasks
+    ]
+    if checklists:
+        db.execute(insert(models.ServiceChecklist), checklists)
+    if subtasks:
+        db.execute(insert(models.ServiceSubtask), subtasks)
+    if written:
+        service_ids = list(written.values())
+        assignees.sync_service_assignees(db, service_ids)
+        assignees.sync_subtask_assignees(db, assignees.subtasks_of_services(service_ids))
+    db.commit()
+    # Per batch: a later batch failing must not leave this one's changes
+    # hidden behind cached listings and ETags.
+    if written:
+        invalidate_services(agency_id, updated)
+    return len(written) - len(updated), len(updated), len(rows) - len(written)
+
+
+@asynccontextmanager
+async def _batch_runner():
+    # Runs import_batch(db, ...) off the event loop: in a greenlet over
+    # asyncpg in async mode, otherwise on the threadpool.
+    if config.DB_ASYNC_ENABLED:
+        async with AsyncSessionLocal() as db:
+            yield db.run_sync
+        return
+    db = SessionLocal()
+    try:
+        yield lambda function, *args: run_in_threadpool(function, db, *args)
+    finally:
+        db.close()
+
+
+def _fail(result, line_number, error):
+    result.failed += 1
+    if len(result.errors) < MAX_REPORTED_ERRORS:
+        result.errors.append(schemas.ImportLineError(line=line_number, error=error))
+
+
+def _db_error(exc):
+    # The driver's message without its SQL and parameters.
+    lines = str(exc.orig).strip().splitlines()
+    return lines[0] if lines else type(exc.orig).__name__
+
+
+async def _batches(chunks, result):
+    # Splits the body into lines as it arrives; only the current partial line
+    # and one batch of parsed templates are held in memory. A batch is cut
+    # early when a name repeats so that one INSERT never touches a row twice.
+    # Batches are {name: (line number, template)}.
+    buffer = b""
+    line_number = 0
+    batch = {}
+
+    def parse(line):
+        nonlocal line_number
+        line_number += 1
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            return schemas.ServiceTemplate.model_validate_json(line)
+        except ValidationError as exc:
+            error = exc.errors()[0]
+            location = ".".join(str(part) for part in error["loc"])
+            _fail(result, line_number, f"{location}: {error['msg']}" if location else error["msg"])
+            return None
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > config.TEMPLATE_IMPORT_MAX_LINE_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Line {line_number + len(lines) + 1} is longer than {config.TEMPLATE_IMPORT_MAX_LINE_BYTES} bytes",
+            )
+        for line in lines:
+            template = parse(line)
+            if template is None:
+                continue
+            if template.name in batch or len(batch) >= config.TEMPLATE_IMPORT_BATCH_SIZE:
+                yield batch
+                batch = {}
+            batch[template.name] = (line_number, template)
+    template = parse(buffer)
+    if template is not None:
+        if template.name in batch:
+            yield batch
+            batch = {}
+        batch[template.name] = (line_number, template)
+    if batch:
+        yield batch
+
+
+async def import_lines(chunks, agency_id, user_id, on_conflict):
+    # Each batch commits on its own. A batch the database rejects is rolled
+    # back and its lines reported as failed; the import carries on with the
+    # next one, and re-running it skips (or re-applies) what was imported.
+    result = schemas.ImportResult()
+    async with _batch_runner() as run:
+        async for batch in _batches(chunks, result):
+            templates = [template for _, template in batch.values()]
+            try:
+                created, updated, skipped = await run(import_batch, agency_id, user_id, on_conflict, templates)
+            except DBAPIError as exc:
+                for line_number, _ in batch.values():
+                    _fail(result, line_number, f"Batch rejected by the database: {_db_error(exc)}")
+                continue
+            result.created += created
+            result.updated += updated
+            result.skipped += skipped
+    return result
+
+
+def clone_service(db, agency_id, service_id, target_agency_ids, user_id):
+    # Copies the service into every target agency with one INSERT ... SELECT
+    # over the unnested agency ids, then its checklist and subtasks into all
+    # of the copies with one INSERT ... SELECT each. Agencies that already
+    # have a service with the same name are skipped.
+    exists = db.scalar(select(models.Service.id).where(models.Service.id == service_id, models.Service.agency_id == agency_id))
+    if exists is None:
+        raise HTTPException(status_code=404, detail="Service not found")
+    target_agency_ids = list(dict.fromkeys(target_agency_ids))
+    if not target_agency_ids:
+        return schemas.ServiceCloneResult(created={}, skipped=[])
+
+    copies = db.execute(
+        insert(models.Service)
+        .from_select(
+            ["id", "agency_id", *SERVICE_FIELDS, "created_by", "created_at"],
+            select(
+                func.gen_random_uuid(),
+                func.unnest(bindparam("agency_ids", target_agency_ids, type_=ARRAY(UUID(as_uuid=True)))),
+                *(getattr(models.Service, name) for name in SERVICE_FIELDS),
+                literal(user_id),
+                func.now(),
+            ).where(models.Service.id == service_id),
+        )
+        .on_conflict_do_nothing(constraint="uq_agency_id_name")
+        .returning(models.Service.id, models.Service.agency_id)
+    ).all()
+    copy_ids = [row.id for row in copies]
+
+    if copy_ids:
+        for model, fields in ((models.ServiceChecklist, CHECKLIST_FIELDS), (models.ServiceSubtask, SUBTASK_FIELDS)):
+            db.execute(
+                insert(model).from_select(
+                    ["id", "service_id", *fields],
+                    select(func.gen_random_uuid(), models.Service.id, *(getattr(model, name) for name in fields))
+                    .select_from(model)
+                    .join(models.Service, models.Service.id.in_(copy_ids))
+                    .where(model.service_id == service_id),
+                )
+            )
+        assignees.sync_service_assignees(db, copy_ids)
+        assignees.sync_subtask_assignees(db, assignees.subtasks_of_services(copy_ids))
+    db.commit()
+    created = {row.agency_id: row.id for row in copies}
+    return schemas.ServiceCloneResult(
+        created=created,
+        skipped=[target for target in target_agency_ids if target not in created],
+    )
@@ -0,0 +1,134 @@
+import functools
+import uuid
+
+import boto3
+from botocore.exceptions import ClientError
+
+from . import config
+from .metrics import S3_LATENCY
+
+
+@functools.lru_cache(maxsize=None)
+def get_s3_client():
+    # boto3 clients are thread-safe; share one per process instead of paying
+    # for client construction on every request.
+    return boto3.client(
+        "s3",
+        aws_access_key_id=config.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY,
+        region_name=config.AWS_REGION,
+        endpoint_url=config.S3_ENDPOINT_URL,
+    )
+
+
+def service_prefix(service_id):
+    return f"{service_id}/"
+
+
+def new_object_key(service_id, file_name):
+    safe_name = file_name.replace("/", "_").replace("\\", "_")
+    return f"{service_prefix(service_id)}{uuid.uuid4()}_{safe_name}"
+
+
+def file_path_for_key(key):
+    return f"s3://{config.S3_BUCKET_NAME}/{key}"
+
+
+def key_for_file_path(file_path):
+    return "/".join(file_path.split("/")[3:])
+
+
+@S3_LATENCY.labels("upload_fileobj").time()
+def upload_fileobj(fileobj, key, content_type=None):
+    extra_args = {"ContentType": content_type} if content_type else None
+    get_s3_client().upload_fileobj(fileobj, config.S3_BUCKET_NAME, key, ExtraArgs=extra_args)
+
+
+@S3_LATENCY.labels("presigned_post").time()
+def presigned_post(key, content_type=None):
+    fields, conditions = {}, [["content-length-range", 1, config.S3_MAX_UPLOAD_BYTES]]
+    if content_type:
+        fields["Content-Type"] = content_type
+        conditions.append({"Content-Type": content_type})
+    return get_s3_client().generate_presigned_post(
+        Bucket=config.S3_BUCKET_NAME,
+        Key=key,
+        Fields=fields,
+        Conditions=conditions,
+        ExpiresIn=config.S3_PRESIGN_EXPIRES_SECONDS,
+    )
+
+
+@S3_LATENCY.labels("create_multipart_upload").time()
+def create_multipart_upload(key, size, content_type=None):
+    s3 = get_s3_client()
+    params = {"Bucket": config.S3_BUCKET_NAME, "Key": key}
+    if content_type:
+        params["ContentType"] = content_type
+    upload_id = s3.create_multipart_upload(**params)["UploadId"]
+    part_count = -(-size // config.S3_MULTIPART_PART_SIZE)
+    part_urls = [
+        s3.generate_presigned_url(
+            "upload_part",
+            Params={"Bucket": config.S3_BUCKET_NAME, "Key": key, "UploadId": upload_id, "PartNumber": part_number},
+            ExpiresIn=config.S3_PRESIGN_EXPIRES_SECONDS,
+        )
+        for part_number in range(1, part_count + 1)
+    ]
+    return upload_id, part_urls
+
+
+@S3_LATENCY.labels("complete_multipart_upload").time()
+def complete_multipart_upload(key, upload_id, parts):
+    get_s3_client().complete_multipart_upload(
+        Bucket=config.S3_BUCKET_NAME,
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": [{"PartNumber": number, "ETag": etag} for number, etag in parts]},
+    )
+
+
+@S3_LATENCY.labels("head_object").time()
+def head_object(key):
+    try:
+        return get_s3_client().head_object(Bucket=config.S3_BUCKET_NAME, Key=key)
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+
+@S3_LATENCY.labels("presigned_get").time()
+def presigned_get(key, file_name):
+    return get_s3_client().generate_presigned_url(
+        "get_object",
+        Params={
+            "Bucket": config.S3_BUCKET_NAME,
+            "Key": key,
+            "ResponseContentDisposition": 'attachment; filename="{}"'.format(file_name.replace('"', "")),
+        },
+        ExpiresIn=config.S3_PRESIGN_EXPIRES_SECONDS,
+    )
+
+
+@S3_LATENCY.labels("delete_objects").time()
+def delete_objects(keys):
+    # Deletes up to 1000 keys in one request; returns {key: error message}
+    # for the keys S3 could not delete.
+    response = get_s3_client().delete_objects(
+        Bucket=config.S3_BUCKET_NAME,
+        Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+    )
+    return {error["Key"]: f"{error.get('Code')}: {error.get('Message')}" for error in response.get("Errors", [])}
+
+
+def list_objects(prefix="", delimiter=None):
+    # Yields object summaries (or common prefixes when a delimiter is given).
+    params = {"Bucket": config.S3_BUCKET_NAME, "Prefix": prefix}
+    if delimiter:
+        params["Delimiter"] = delimiter
+    for page in get_s3_client().get_paginator("list_objects_v2").paginate(**params):
+        if delimiter:
+            yield from (entry["Prefix"] for entry in page.get("CommonPrefixes", []))
+        else:
+            yield from page.get("Contents", [])
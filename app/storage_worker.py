@@ -0,0 +1,149 @@
+import logging
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select, update
+
+from . import config, models, storage
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000  # delete_objects limit
+BASE_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 3600
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _backoff(attempts):
+    delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** attempts)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def enqueue_deletions(file_paths):
+    # INSERT ... SELECT queuing the objects of the paths `file_paths` (a
+    # one-column select) yields. Routers attach it as a CTE to the statement
+    # that deletes the file rows, so rows and queue change together.
+    return insert(models.StorageDeletion.__table__).from_select(["file_path"], file_paths)
+
+
+def process_batch(session_factory=SessionLocal, batch_size=BATCH_SIZE):
+    # Claims up to batch_size due rows (SKIP LOCKED lets several workers run
+    # side by side), deletes their objects with one delete_objects call and
+    # either removes the rows or reschedules them with backoff.
+    with session_factory() as db:
+        rows = db.execute(
+            select(models.StorageDeletion.id, models.StorageDeletion.file_path, models.StorageDeletion.attempts)
+            .where(models.StorageDeletion.next_attempt_at <= _utcnow())
+            .order_by(models.StorageDeletion.next_attempt_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            return 0
+
+        keys = {row.id: storage.key_for_file_path(row.file_path) for row in rows}
+        try:
+            errors = storage.delete_objects(list(set(keys.values())))
+        except Exception as exc:
+            logger.warning("delete_objects failed for %d keys: %s", len(keys), exc)
+            errors = {key: str(exc) for key in keys.values()}
+
+        done = [row.id for row in rows if keys[row.id] not in errors]
+        if done:
+            db.execute(delete(models.StorageDeletion).where(models.StorageDeletion.id.in_(done)))
+        failed = [
+            {
+                "id": row.id,
+                "attempts": row.attempts + 1,
+                "next_attempt_at": _utcnow() + _backoff(row.attempts),
+                "last_error": errors[keys[row.id]][:1000],
+            }
+            for row in rows
+            if keys[row.id] in errors
+        ]
+        if failed:
+            db.execute(update(models.StorageDeletion), failed)
+        db.commit()
+        return len(rows)
+
+
+class StorageDeletionWorker:
+    def __init__(self, session_factory=SessionLocal, poll_interval=None):
+        self.session_factory = session_factory
+        self.poll_interval = config.STORAGE_DELETION_POLL_SECONDS if poll_interval is None else poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="storage-deletion-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processed = process_batch(self.session_factory)
+            except Exception:
+                logger.exception("Storage deletion batch failed")
+                processed = 0
+            # A full batch means there is probably more due work.
+            if processed < BATCH_SIZE:
+                self._stop.wait(self.poll_interval)
+
+
+def _service_ids(prefixes):
+    ids = {}
+    for prefix in prefixes:
+        try:
+            ids[uuid.UUID(prefix.rstrip("/"))] = prefix
+        except ValueError:
+            continue
+    return ids
+
+
+def reconcile(session_factory=SessionLocal, service_id=None, grace=timedelta(hours=24), dry_run=False):
+    # Finds objects under service prefixes that have no ServiceSupportingFile
+    # row and queues them for deletion. Objects younger than `grace` are left
+    # alone because their presigned upload may not be finalized yet.
+    if service_id is not None:
+        prefixes = {service_id: storage.service_prefix(service_id)}
+    else:
+        prefixes = _service_ids(storage.list_objects(delimiter="/"))
+    cutoff = _utcnow() - grace
+    orphans = []
+    with session_factory() as db:
+        for prefix_service_id, prefix in prefixes.items():
+            known = set(
+                db.scalars(
+                    select(models.ServiceSupportingFile.file_path).where(
+                        models.ServiceSupportingFile.service_id == prefix_service_id
+                    )
+                )
+            )
+            known.update(
+                db.scalars(
+                    select(models.StorageDeletion.file_path).where(
+                        models.StorageDeletion.file_path.startswith(storage.file_path_for_key(prefix))
+                    )
+                )
+            )
+            orphans.extend(
+                file_path
+                for file_path in (storage.file_path_for_key(entry["Key"]) for entry in storage.list_objects(prefix) if entry["LastModified"] < cutoff)
+                if file_path not in known
+            )
+        if orphans and not dry_run:
+            db.execute(insert(models.StorageDeletion), [{"file_path": file_path} for file_path in orphans])
+            db.commit()
+    return orphans
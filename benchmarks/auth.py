@@ -0,0 +1,61 @@
+"""Micro-benchmark of per-request auth overhead.
+
+"before" replays the previous dependency chain: one full jwt.decode plus a
+freshly built uppercase role list per request. "after" is the current
+verify_token (digest lookup in the verified-token cache) plus a frozenset
+role check.
+
+    python -m benchmarks.auth --iterations 100000
+"""
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from jose import jwt
+
+from app import dependencies
+
+from .common import mint_token
+
+ROLES = ["SUPER_ADMIN", "AGENCY_ADMIN", "CA_ACCOUNTANT", "CA_TEAM", "CLIENT_ADMIN", "CLIENT_USER"]
+
+
+def before(token):
+    payload = jwt.decode(token, dependencies.SECRET_KEY, algorithms=[dependencies.ALGORITHM])
+    user = {"email": payload["sub"], "role": payload["role_scope"], "id": payload["sub"]}
+    return user["role"].upper() in [role.upper() for role in ROLES]
+
+
+ALLOWED = frozenset(ROLES)
+
+
+def after(token):
+    user = dependencies.verify_token(token)
+    return user["role"].upper() in ALLOWED
+
+
+def time_per_call(fn, token, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(token)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    token = mint_token(role="CA_TEAM")
+    result = {
+        "before_us_per_request": round(time_per_call(before, token, args.iterations), 2),
+        "after_us_per_request": round(time_per_call(after, token, args.iterations), 2),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from jose import jwt
+
+ALGORITHM = "HS256"
+
+
+def mint_token(email="bench@example.com", role="SUPER_ADMIN", ttl=timedelta(hours=1)):
+    claims = {"sub": email, "role_scope": role, "exp": datetime.utcnow() + ttl}
+    return jwt.encode(claims, os.environ["SECRET_KEY"], algorithm=ALGORITHM)
+
+
+def auth_headers(agency_id, role="SUPER_ADMIN"):
+    return {"Authorization": f"Bearer {mint_token(role=role)}", "X-Agency-Id": str(agency_id)}
+
+
+def start_server(port, **env):
+    # One single-worker uvicorn serving app.main:app with extra env overrides.
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", "1", "--log-level", "warning"],
+        env=dict(os.environ, **env),
+    )
+
+
+async def wait_ready(client, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get("/openapi.json")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def run_load(client, next_request, concurrency, duration):
+    # next_request() returns (method, url, kwargs); each of the `concurrency`
+    # workers issues requests back to back until `duration` seconds elapse.
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            method, url, kwargs = next_request()
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
@@ -0,0 +1,75 @@
+"""Compare the sync (threadpool) and async (asyncpg) database modes.
+
+Starts one single-worker uvicorn per mode against the Postgres in
+DATABASE_URL and drives the read endpoints of every router with the same
+concurrency. SECRET_KEY must match the one the app verifies tokens with.
+
+    python -m benchmarks.db_modes --concurrency 200 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import uuid
+
+import httpx
+
+from .common import auth_headers, run_load, start_server, wait_ready
+
+
+async def ensure_services(client, headers, count):
+    for i in range(count):
+        await client.post("/services/", json={"name": f"bench-service-{i}"}, headers=headers)
+    response = await client.get("/services/", headers=headers)
+    response.raise_for_status()
+    return [service["id"] for service in response.json()]
+
+
+async def bench_mode(args, async_enabled):
+    server = start_server(args.port, DB_ASYNC_ENABLED="true" if async_enabled else "false")
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}",
+            timeout=30,
+            limits=httpx.Limits(max_connections=args.concurrency),
+        ) as client:
+            await wait_ready(client)
+            headers = auth_headers(args.agency_id)
+            service_ids = await ensure_services(client, headers, args.services)
+            paths = [
+                "/services/",
+                "/services/{id}",
+                "/options/checklists/{id}",
+                "/options/subtasks/{id}",
+                "/options/supporting-files/{id}",
+                "/clients/{id}/count",
+            ]
+
+            def next_request():
+                path = random.choice(paths).format(id=random.choice(service_ids))
+                return "GET", path, {"headers": headers}
+
+            return await run_load(client, next_request, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agency-id", type=uuid.UUID, default=uuid.uuid4())
+    parser.add_argument("--services", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--port", type=int, default=8102)
+    args = parser.parse_args()
+
+    results = {
+        "sync": await bench_mode(args, async_enabled=False),
+        "async": await bench_mode(args, async_enabled=True),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
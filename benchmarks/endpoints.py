@@ -0,0 +1,319 @@
+"""Benchmark every services, options and clients route on a seeded agency.
+
+Seeds one agency of the requested size into DATABASE_URL (a scratch local
+Postgres), starts a moto S3 server as the storage stand-in and a single-worker
+uvicorn, then drives weighted route mixes with locally minted tokens. The
+JSON report has throughput, p50/p95/p99 latency and DB queries per request
+(from the Server-Timing header) per route and per mix, so two runs can be
+diffed between versions.
+
+    python -m benchmarks.endpoints --services 5000 --clients 20 --mix read mixed write --output before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+from collections import defaultdict
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("S3_BUCKET_NAME", "benchmark-bucket")
+os.environ.setdefault("STORAGE_DELETION_WORKER_ENABLED", "false")
+
+import httpx
+from moto.server import ThreadedMotoServer
+
+from .common import auth_headers, start_server, summarize, wait_ready
+
+DB_QUERY = re.compile(r'db-query;dur=([\d.]+);desc="(\d+)"')
+
+# (kind, weight): kind decides which mixes a route runs in; the weight is
+# its share within that kind.
+ROUTES = {
+    "services.list_page": ("read", 10),
+    "services.list_filtered": ("read", 4),
+    "services.get": ("read", 20),
+    "services.create": ("write", 3),
+    "services.delete": ("write", 1),
+    "options.update_settings": ("write", 4),
+    "options.checklists.list": ("read", 10),
+    "options.checklists.create": ("write", 4),
+    "options.checklists.batch": ("write", 2),
+    "options.checklists.update": ("write", 4),
+    "options.checklists.delete": ("write", 2),
+    "options.subtasks.list": ("read", 10),
+    "options.subtasks.create": ("write", 4),
+    "options.subtasks.batch": ("write", 2),
+    "options.subtasks.update": ("write", 4),
+    "options.subtasks.delete": ("write", 2),
+    "options.files.list": ("read", 6),
+    "options.files.download_url": ("read", 4),
+    "options.files.upload": ("write", 1),
+    "options.files.upload_url": ("write", 2),
+    "options.files.finalize": ("write", 2),
+    "options.files.delete": ("write", 1),
+    "clients.counts": ("read", 4),
+    "clients.count": ("read", 6),
+    "clients.assignments": ("write", 2),
+    "clients.assignments_remove": ("write", 2),
+    "clients.service_assign": ("write", 2),
+    "clients.service_unassign": ("write", 2),
+    "clients.client_assign": ("write", 2),
+    "clients.client_unassign": ("write", 2),
+}
+
+MIXES = {"read": 0.0, "mixed": 0.1, "write": 1.0}
+
+
+def load_dataset(engine, agency_id, service_ids, disposable):
+    # Splits the seeded rows into read/update pools and delete-only pools so
+    # concurrent workers never delete a row another route still targets.
+    from sqlalchemy import select
+
+    from app import models
+
+    live, doomed = service_ids[: len(service_ids) - disposable], service_ids[len(service_ids) - disposable:]
+    with engine.connect() as conn:
+        def children(model):
+            ids = list(
+                conn.scalars(
+                    select(model.id)
+                    .join(models.Service)
+                    .where(models.Service.agency_id == agency_id, models.Service.id.not_in(doomed))
+                )
+            )
+            random.shuffle(ids)
+            return ids[: len(ids) // 2], ids[len(ids) // 2:]
+
+        checklists, checklists_doomed = children(models.ServiceChecklist)
+        subtasks, subtasks_doomed = children(models.ServiceSubtask)
+        files, files_doomed = children(models.ServiceSupportingFile)
+        clients = list(
+            conn.scalars(
+                select(models.ClientService.client_id)
+                .join(models.Service)
+                .where(models.Service.agency_id == agency_id)
+                .distinct()
+            )
+        )
+    return {
+        "services": live,
+        "services_doomed": doomed,
+        "checklists": checklists,
+        "checklists_doomed": checklists_doomed,
+        "subtasks": subtasks,
+        "subtasks_doomed": subtasks_doomed,
+        "files": files,
+        "files_doomed": files_doomed,
+        "clients": clients or [uuid.uuid4() for _ in range(10)],
+        "uploaded_keys": [],
+    }
+
+
+def upload_objects(service_ids, count):
+    # Objects that finalize_upload can verify, as if clients had already
+    # uploaded them with a presigned POST.
+    from app import config, storage
+
+    s3 = storage.get_s3_client()
+    keys = []
+    for i in range(count):
+        service_id = random.choice(service_ids)
+        key = storage.new_object_key(service_id, f"bench-{i}.txt")
+        s3.put_object(Bucket=config.S3_BUCKET_NAME, Key=key, Body=b"x" * 1024, ContentType="text/plain")
+        keys.append((service_id, key))
+    return keys
+
+
+def build_requests(data):
+    def service():
+        return random.choice(data["services"])
+
+    def some(pool, count):
+        return [str(value) for value in random.sample(data[pool], min(count, len(data[pool])))]
+
+    def take(pool):
+        return data[pool].pop() if data[pool] else None
+
+    def when(value, request):
+        return None if value is None else request(value)
+
+    def name():
+        return f"bench-{uuid.uuid4().hex[:12]}"
+
+    return {
+        "services.list_page": lambda: ("GET", "/services/", {"params": {"limit": "100"}}),
+        "services.list_filtered": lambda: ("GET", "/services/", {"params": {"limit": "100", "is_enabled": "true", "include_checklists": "false"}}),
+        "services.get": lambda: ("GET", f"/services/{service()}", {}),
+        "services.create": lambda: ("POST", "/services/", {"json": {"name": name()}}),
+        "services.delete": lambda: when(take("services_doomed"), lambda sid: ("DELETE", f"/services/{sid}", {})),
+        "options.update_settings": lambda: ("PATCH", f"/options/settings/{service()}", {"data": {"is_enabled": "true", "billing_sac_code": "998311"}}),
+        "options.checklists.list": lambda: ("GET", f"/options/checklists/{service()}", {}),
+        "options.checklists.create": lambda: ("POST", f"/options/checklists/{service()}", {"json": {"item_text": name()}}),
+        "options.checklists.batch": lambda: ("POST", f"/options/checklists/{service()}/batch", {"json": {"create": [{"item_text": name()} for _ in range(5)]}}),
+        "options.checklists.update": lambda: ("PATCH", f"/options/checklists/{random.choice(data['checklists'])}", {"json": {"item_text": name()}}),
+        "options.checklists.delete": lambda: when(take("checklists_doomed"), lambda cid: ("DELETE", f"/options/checklists/{cid}", {})),
+        "options.subtasks.list": lambda: ("GET", f"/options/subtasks/{service()}", {}),
+        "options.subtasks.create": lambda: ("POST", f"/options/subtasks/{service()}", {"data": {"title": name(), "due_date": "5"}}),
+        "options.subtasks.batch": lambda: ("POST", f"/options/subtasks/{service()}/batch", {"json": {"create": [{"title": name()} for _ in range(5)]}}),
+        "options.subtasks.update": lambda: ("PATCH", f"/options/subtasks/{random.choice(data['subtasks'])}", {"json": {"title": name()}}),
+        "options.subtasks.delete": lambda: when(take("subtasks_doomed"), lambda sid: ("DELETE", f"/options/subtasks/{sid}", {})),
+        "options.files.list": lambda: ("GET", f"/options/supporting-files/{service()}", {}),
+        "options.files.download_url": lambda: when(
+            random.choice(data["files"]) if data["files"] else None,
+            lambda fid: ("GET", f"/options/supporting-files/{fid}/download-url", {}),
+        ),
+        "options.files.upload": lambda: ("POST", f"/options/supporting-files/{service()}", {"files": {"file": ("bench.txt", b"x" * 1024, "text/plain")}}),
+        "options.files.upload_url": lambda: ("POST", f"/options/supporting-files/{service()}/upload-url", {"json": {"file_name": "bench.txt", "size": 1024}}),
+        "options.files.finalize": lambda: when(
+            take("uploaded_keys"),
+            lambda upload: ("POST", f"/options/supporting-files/{upload[0]}/finalize", {"json": {"key": upload[1], "file_name": "bench.txt"}}),
+        ),
+        "options.files.delete": lambda: when(take("files_doomed"), lambda fid: ("DELETE", f"/options/supporting-files/{fid}", {})),
+        "clients.counts": lambda: ("GET", "/clients/counts", {"params": [("service_id", sid) for sid in some("services", 50)]}),
+        "clients.count": lambda: ("GET", f"/clients/{service()}/count", {}),
+        "clients.assignments": lambda: ("POST", "/clients/assignments", {"json": {"client_ids": some("clients", 5), "service_ids": some("services", 5)}}),
+        "clients.assignments_remove": lambda: ("POST", "/clients/assignments/remove", {"json": {"client_ids": some("clients", 5), "service_ids": some("services", 5)}}),
+        "clients.service_assign": lambda: ("POST", f"/clients/services/{service()}/assign", {"json": {"client_ids": some("clients", 10)}}),
+        "clients.service_unassign": lambda: ("POST", f"/clients/services/{service()}/unassign", {"json": {"client_ids": some("clients", 10)}}),
+        "clients.client_assign": lambda: ("POST", f"/clients/{random.choice(data['clients'])}/services/assign", {"json": {"service_ids": some("services", 10)}}),
+        "clients.client_unassign": lambda: ("POST", f"/clients/{random.choice(data['clients'])}/services/unassign", {"json": {"service_ids": some("services", 10)}}),
+    }
+
+
+def pick_route(routes, write_ratio):
+    kind = "write" if random.random() < write_ratio else "read"
+    names = [name for name in routes if ROUTES[name][0] == kind] or routes
+    return random.choices(names, weights=[ROUTES[name][1] for name in names])[0]
+
+
+async def run_mix(client, headers, requests, routes, write_ratio, concurrency, duration):
+    latencies, errors, queries, db_time = defaultdict(list), defaultdict(int), defaultdict(list), defaultdict(list)
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            name = pick_route(routes, write_ratio)
+            request = requests[name]()
+            if request is None:
+                # Delete pool exhausted; let other workers run before retrying.
+                await asyncio.sleep(0)
+                continue
+            method, url, kwargs = request
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, headers=headers, **kwargs)
+            except Exception:
+                errors[name] += 1
+                continue
+            latencies[name].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors[name] += 1
+            match = DB_QUERY.search(response.headers.get("server-timing", ""))
+            queries[name].append(int(match.group(2)) if match else 0)
+            db_time[name].append(float(match.group(1)) if match else 0.0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    def report(names):
+        result = summarize([value for name in names for value in latencies[name]], sum(errors[name] for name in names), elapsed)
+        samples = [value for name in names for value in queries[name]]
+        result["queries_per_request"] = round(sum(samples) / len(samples), 2) if samples else 0.0
+        db_samples = [value for name in names for value in db_time[name]]
+        result["db_ms_per_request"] = round(sum(db_samples) / len(db_samples), 2) if db_samples else 0.0
+        return result
+
+    return {"total": report(list(latencies)), "routes": {name: report([name]) for name in sorted(latencies)}}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--services", type=int, default=2000)
+    parser.add_argument("--checklists", type=int, default=10)
+    parser.add_argument("--subtasks", type=int, default=5)
+    parser.add_argument("--files", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=20, help="Client assignments per service")
+    parser.add_argument("--mix", nargs="+", choices=sorted(MIXES), default=["read", "mixed", "write"])
+    parser.add_argument("--routes", nargs="+", choices=sorted(ROUTES), help="Only drive these routes")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per mix")
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--s3-port", type=int, default=8103)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for route and row selection")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    s3_server = ThreadedMotoServer(port=args.s3_port)
+    s3_server.start()
+    os.environ["S3_ENDPOINT_URL"] = f"http://127.0.0.1:{args.s3_port}"
+
+    from app import config, storage
+    from app.database import engine
+
+    from .seed import seed_agency
+
+    storage.get_s3_client().create_bucket(Bucket=config.S3_BUCKET_NAME)
+    agency_id, service_ids = seed_agency(
+        engine,
+        services=args.services,
+        checklists_per_service=args.checklists,
+        subtasks_per_service=args.subtasks,
+        files_per_service=args.files,
+        clients_per_service=args.clients,
+    )
+    routes = args.routes or list(ROUTES)
+    disposable = min(len(service_ids) // 10, 1000)
+    report = {
+        "dataset": {
+            "services": args.services,
+            "checklists_per_service": args.checklists,
+            "subtasks_per_service": args.subtasks,
+            "files_per_service": args.files,
+            "clients_per_service": args.clients,
+        },
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "mixes": {},
+    }
+
+    server = start_server(args.port)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}",
+            timeout=60,
+            limits=httpx.Limits(max_connections=args.concurrency),
+        ) as client:
+            await wait_ready(client)
+            headers = auth_headers(agency_id)
+            for mix in args.mix:
+                data = load_dataset(engine, agency_id, service_ids, disposable)
+                data["uploaded_keys"] = upload_objects(data["services"], 500) if "options.files.finalize" in routes and MIXES[mix] else []
+                report["mixes"][mix] = await run_mix(
+                    client, headers, build_requests(data), routes, MIXES[mix], args.concurrency, args.duration
+                )
+                # Deleted services are gone from the next mix's dataset.
+                service_ids = data["services"] + data["services_doomed"]
+    finally:
+        server.terminate()
+        server.wait()
+        s3_server.stop()
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""Benchmark GET /services/ for a large agency.
+
+Seeds 10k services x 20 checklist items into DATABASE_URL (a scratch local
+Postgres) and calls the app in-process with the catalog cache disabled, so
+every call measures the database and serialization path.
+
+    python -m benchmarks.list_services --services 10000 --checklists 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("CACHE_BACKEND", "none")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+import httpx
+
+from app.database import engine
+from app.main import app
+
+from .common import auth_headers, summarize
+from .seed import seed_agency
+
+SCENARIOS = {
+    "full": {},
+    "without_checklists": {"include_checklists": "false"},
+    "fields_id_name": {"fields": "id,name", "include_checklists": "false"},
+    "page_100": {"limit": "100"},
+    "filtered_page_100": {"limit": "100", "is_enabled": "true", "is_recurring": "true"},
+}
+
+
+async def measure(client, headers, params, repeat):
+    latencies, sizes = [], []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        began = time.perf_counter()
+        response = await client.get("/services/", params=params, headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - began)
+        sizes.append(len(response.content))
+    result = summarize(latencies, 0, time.perf_counter() - start)
+    result["bytes"] = max(sizes)
+    return result
+
+
+async def walk_pages(client, headers, limit):
+    params, pages = {"limit": str(limit)}, 0
+    start = time.perf_counter()
+    while True:
+        response = await client.get("/services/", params=params, headers=headers)
+        response.raise_for_status()
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+    return {"pages": pages, "total_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--services", type=int, default=10000)
+    parser.add_argument("--checklists", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    agency_id, _ = seed_agency(engine, args.services, args.checklists)
+    headers = auth_headers(agency_id)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        results = {name: await measure(client, headers, params, args.repeat) for name, params in SCENARIOS.items()}
+        results["walk_all_pages_500"] = await walk_pages(client, headers, 500)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app import assignees, models
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _bulk_insert(conn, model, rows, batch_size):
+    for chunk in _chunks(rows, batch_size):
+        conn.execute(insert(model), chunk)
+
+
+def seed_agency(
+    engine,
+    services=1000,
+    checklists_per_service=20,
+    agency_id=None,
+    batch_size=5000,
+    subtasks_per_service=0,
+    files_per_service=0,
+    clients_per_service=0,
+):
+    # Inserts one agency's catalog with bulk INSERTs and returns
+    # (agency_id, service_ids). Creates the tables if they are missing.
+    # Clients are drawn from a pool of clients_per_service * 10 ids shared by
+    # the agency's services.
+    models.Base.metadata.create_all(engine)
+    agency_id = agency_id or uuid.uuid4()
+    started = datetime.utcnow()
+    service_rows = [
+        {
+            "id": uuid.uuid4(),
+            "agency_id": agency_id,
+            "name": f"Service {i:06d}",
+            "is_enabled": i % 10 != 0,
+            "is_checklist_completion_required": i % 3 == 0,
+            "is_recurring": i % 2 == 0,
+            "auto_task_creation_frequency": ("monthly", "quarterly", "half_yearly", "yearly")[i % 4] if i % 2 == 0 else None,
+            "target_date_creation_date": 1 + i % 28,
+            "created_by": "seed@example.com",
+            "created_at": started + timedelta(milliseconds=i),
+        }
+        for i in range(services)
+    ]
+    checklist_rows = [
+        {
+            "id": uuid.uuid4(),
+            "service_id": service["id"],
+            "item_text": f"Checklist item {n} for {service['name']}",
+            "is_required": n % 2 == 0,
+            "sort_order": n,
+        }
+        for service in service_rows
+        for n in range(checklists_per_service)
+    ]
+    # Subtask users are user ids, as the API accepts them.
+    user_pool = [str(uuid.uuid4()) for _ in range(5)]
+    subtask_rows = [
+        {
+            "id": uuid.uuid4(),
+            "service_id": service["id"],
+            "title": f"Subtask {n} for {service['name']}",
+            "due_date": 1 + n % 28,
+            "users": [user_pool[n % len(user_pool)]],
+            "sort_order": n,
+        }
+        for service in service_rows
+        for n in range(subtasks_per_service)
+    ]
+    file_rows = [
+        {
+            "id": uuid.uuid4(),
+            "service_id": service["id"],
+            "file_name": f"file-{n}.pdf",
+            "file_path": f"s3://seed/{service['id']}/file-{n}.pdf",
+            "mime_type": "application/pdf",
+            "uploaded_by": "seed@example.com",
+            "uploaded_at": started,
+        }
+        for service in service_rows
+        for n in range(files_per_service)
+    ]
+    client_pool = [uuid.uuid4() for _ in range(clients_per_service * 10)]
+    client_rows = [
+        {"id": uuid.uuid4(), "client_id": client_id, "service_id": service["id"]}
+        for i, service in enumerate(service_rows)
+        for client_id in (client_pool[(i + n * 7) % len(client_pool)] for n in range(clients_per_service))
+    ]
+    with engine.begin() as conn:
+        _bulk_insert(conn, models.Service, service_rows, batch_size)
+        _bulk_insert(conn, models.ServiceChecklist, checklist_rows, batch_size)
+        _bulk_insert(conn, models.ServiceSubtask, subtask_rows, batch_size)
+        _bulk_insert(conn, models.ServiceSupportingFile, file_rows, batch_size)
+        _bulk_insert(conn, models.ClientService, client_rows, batch_size)
+        agency_services = select(models.Service.id).where(models.Service.agency_id == agency_id).correlate(None)
+        assignees.sync_service_assignees(conn, agency_services)
+        assignees.sync_subtask_assignees(conn, assignees.subtasks_of_services(agency_services))
+    return agency_id, [service["id"] for service in service_rows]
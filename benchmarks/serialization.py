@@ -0,0 +1,102 @@
+"""Compare list_services serialization paths on synthetic payloads.
+
+"validated" replays the previous path: jsonable_encoder on the rows, then
+FastAPI's response-model round trip (validate as List[ServiceRead], dump in
+JSON mode) and the stdlib encoder of JSONResponse. "orjson" is the current
+path: the plain row dicts encoded once by app.serialization. Both outputs are
+checked to decode to the same JSON before timing.
+
+    python -m benchmarks.serialization --services 5000 --checklists 20
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app import schemas, serialization
+
+FREQUENCIES = ("monthly", "quarterly", "half_yearly")
+
+
+def build_items(services, checklists):
+    started = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    items = []
+    for i in range(services):
+        service_id = uuid.uuid4()
+        recurring = i % 2 == 0
+        items.append(
+            {
+                "name": f"Service {i:06d}",
+                "description": None,
+                "is_enabled": i % 10 != 0,
+                "is_checklist_completion_required": i % 3 == 0,
+                "is_recurring": recurring,
+                "auto_task_creation_frequency": FREQUENCIES[i % 3] if recurring else None,
+                "target_date_creation_date": 1 + i % 28,
+                "assign_auto_tasks_to_users_of_respective_clients": False,
+                "assign_auto_tasks_to_users": [str(uuid.uuid4())] if i % 4 == 0 else None,
+                "create_document_collection_request_automatically": False,
+                "id": service_id,
+                "created_by": "seed@example.com",
+                "created_at": started + timedelta(milliseconds=i, microseconds=i % 1000),
+                "checklists": [
+                    {
+                        "item_text": f"Checklist item {n} for service {i}",
+                        "is_required": n % 2 == 0,
+                        "id": uuid.uuid4(),
+                        "service_id": service_id,
+                        "sort_order": n,
+                    }
+                    for n in range(checklists)
+                ],
+            }
+        )
+    return items
+
+
+ADAPTER = TypeAdapter(List[schemas.ServiceRead])
+
+
+def validated(items):
+    content = jsonable_encoder(items)
+    value = ADAPTER.dump_python(ADAPTER.validate_python(content), mode="json")
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def fast(items):
+    return serialization.dumps(items)
+
+
+def time_path(fn, items, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(items)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {"median_ms": round(samples[len(samples) // 2] * 1000, 2), "min_ms": round(samples[0] * 1000, 2), "bytes": len(body)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--services", type=int, default=5000)
+    parser.add_argument("--checklists", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    items = build_items(args.services, args.checklists)
+    if json.loads(validated(items)) != json.loads(fast(items)):
+        raise SystemExit("orjson output differs from the response-model output")
+
+    result = {"validated": time_path(validated, items, args.repeat), "orjson": time_path(fast, items, args.repeat)}
+    result["speedup"] = round(result["validated"]["median_ms"] / max(result["orjson"]["median_ms"], 1e-6), 1)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Latency of the write endpoints over a slow link to the database.
+
+Seeds one agency into DATABASE_URL (a scratch local Postgres), puts a TCP
+proxy in front of it that delays every chunk by --delay-ms in each
+direction, and points a single-worker uvicorn at the proxy. Each write route
+is then called back to back, one request at a time, so latency is dominated
+by database round trips. The server runs from the current directory, so to
+compare with an older revision run this file from a worktree of it:
+
+    git worktree add /tmp/before <rev> && cp benchmarks/write_latency.py /tmp/before/benchmarks/
+    (cd /tmp/before && python -m benchmarks.write_latency --delay-ms 5 --output before.json)
+    python -m benchmarks.write_latency --delay-ms 5 --output after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("STORAGE_DELETION_WORKER_ENABLED", "false")
+
+import httpx
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import make_url
+
+from app import models
+
+from .common import auth_headers, start_server, summarize, wait_ready
+from .seed import seed_agency
+
+
+class DelayProxy:
+    # Forwards TCP connections to (host, port), delivering every chunk
+    # `delay` seconds after it was read. Chunks keep their order, so each
+    # round trip costs 2 * delay however many are in flight.
+
+    def __init__(self, host, port, delay):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, client_reader, client_writer):
+        upstream_reader, upstream_writer = await asyncio.open_connection(self.host, self.port)
+        await asyncio.gather(
+            self._pipe(client_reader, upstream_writer),
+            self._pipe(upstream_reader, client_writer),
+            return_exceptions=True,
+        )
+
+    async def _pipe(self, reader, writer):
+        queue = asyncio.Queue()
+
+        async def deliver():
+            while True:
+                due, data = await queue.get()
+                if data is None:
+                    break
+                await asyncio.sleep(max(0.0, due - time.monotonic()))
+                writer.write(data)
+                await writer.drain()
+            writer.close()
+
+        delivery = asyncio.create_task(deliver())
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                queue.put_nowait((time.monotonic() + self.delay, data))
+        finally:
+            queue.put_nowait((0.0, None))
+            await delivery
+
+
+def seed(args):
+    engine = create_engine(os.environ["DATABASE_URL"])
+    agency_id, service_ids = seed_agency(engine, services=args.services, checklists_per_service=5, subtasks_per_service=5)
+    with engine.connect() as conn:
+        checklist_ids = conn.scalars(select(models.ServiceChecklist.id).where(models.ServiceChecklist.service_id.in_(service_ids))).all()
+        subtask_ids = conn.scalars(select(models.ServiceSubtask.id).where(models.ServiceSubtask.service_id.in_(service_ids))).all()
+    engine.dispose()
+    return agency_id, service_ids, checklist_ids, subtask_ids
+
+
+async def timed(client, method, url, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    return time.perf_counter() - start, response
+
+
+async def bench(client, headers, args, service_ids, checklist_ids, subtask_ids):
+    # route -> (latencies, [errors]). Creates are paired with deletes of the
+    # created rows so every iteration leaves the catalog as it found it.
+    results = {}
+
+    def record(route, elapsed, response):
+        latencies, errors = results.setdefault(route, ([], [0]))
+        latencies.append(elapsed)
+        if response.status_code >= 400:
+            errors[0] += 1
+
+    for i in range(args.requests):
+        service_id = service_ids[i % len(service_ids)]
+        elapsed, response = await timed(client, "POST", "/services/", json={"name": f"write-latency-{uuid.uuid4()}"}, headers=headers)
+        record("services.create", elapsed, response)
+        if response.status_code < 400:
+            record("services.delete", *await timed(client, "DELETE", f"/services/{response.json()['id']}", headers=headers))
+        record(
+            "options.update_settings",
+            *await timed(client, "PATCH", f"/options/settings/{service_id}", data={"billing_sac_code": str(i)}, headers=headers),
+        )
+        elapsed, response = await timed(client, "POST", f"/options/checklists/{service_id}", json={"item_text": f"item {i}"}, headers=headers)
+        record("options.checklists.create", elapsed, response)
+        if response.status_code < 400:
+            record("options.checklists.delete", *await timed(client, "DELETE", f"/options/checklists/{response.json()['id']}", headers=headers))
+        record(
+            "options.checklists.update",
+            *await timed(client, "PATCH", f"/options/checklists/{checklist_ids[i % len(checklist_ids)]}", json={"item_text": f"edited {i}"}, headers=headers),
+        )
+        elapsed, response = await timed(client, "POST", f"/options/subtasks/{service_id}", data={"title": f"subtask {i}"}, headers=headers)
+        record("options.subtasks.create", elapsed, response)
+        if response.status_code < 400:
+            record("options.subtasks.delete", *await timed(client, "DELETE", f"/options/subtasks/{response.json()['id']}", headers=headers))
+        record(
+            "options.subtasks.update",
+            *await timed(client, "PATCH", f"/options/subtasks/{subtask_ids[i % len(subtask_ids)]}", json={"title": f"edited {i}"}, headers=headers),
+        )
+
+    # Each route ran once per iteration; the elapsed time passed to summarize
+    # is the sum of its latencies, so rps is the sequential rate.
+    return {route: summarize(latencies, errors[0], sum(latencies)) for route, (latencies, errors) in sorted(results.items())}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--services", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200, help="iterations over the write routes")
+    parser.add_argument("--delay-ms", type=float, default=5.0, help="added to each direction of every database round trip")
+    parser.add_argument("--port", type=int, default=8106)
+    parser.add_argument("--async-db", action="store_true", help="run the app with DB_ASYNC_ENABLED")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    agency_id, service_ids, checklist_ids, subtask_ids = seed(args)
+    url = make_url(os.environ["DATABASE_URL"])
+    proxy = DelayProxy(url.host or "127.0.0.1", url.port or 5432, args.delay_ms / 1000)
+    proxy_port = await proxy.start()
+    server = start_server(
+        args.port,
+        DATABASE_URL=url.set(host="127.0.0.1", port=proxy_port).render_as_string(hide_password=False),
+        DB_ASYNC_ENABLED="true" if args.async_db else "false",
+        DATABASE_REPLICA_URLS="",
+        CACHE_BACKEND="none",
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60) as client:
+            await wait_ready(client)
+            routes = await bench(client, auth_headers(agency_id), args, service_ids, checklist_ids, subtask_ids)
+    finally:
+        server.terminate()
+        # Off the loop: the server's shutdown still talks to the database
+        # through the proxy, which this loop runs.
+        await asyncio.to_thread(server.wait)
+        await proxy.stop()
+
+    report = {"delay_ms": args.delay_ms, "async_db": args.async_db, "routes": routes}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
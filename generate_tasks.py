@@ -0,0 +1,21 @@
+import argparse
+import json
+from datetime import date
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database import SessionLocal
+from app.scheduler import generate_tasks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the current period's tasks for recurring services.")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="Run as of this date (YYYY-MM-DD)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the due client-service pairs")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        summary = generate_tasks(db, today=args.date, dry_run=args.dry_run)
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,73 @@
+# Production server: gunicorn managing uvicorn workers.
+#
+#     gunicorn -c gunicorn.conf.py app.main:app
+#
+# Every setting can be overridden from the environment.
+import os
+import shutil
+import tempfile
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _cpu_count():
+    # Respects the CPU set of the container rather than the host.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8002')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", str(_cpu_count())))
+# app.config reads this to split DB_CONNECTION_BUDGET across the workers.
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# Import the app once in the master so workers fork with the code already
+# loaded. No connections, threads or sockets exist at that point: engines
+# connect lazily and background threads start in each worker's startup hook.
+preload_app = True
+
+# On SIGTERM, stop accepting connections and give in-flight requests this
+# long to finish before workers are killed; the shutdown hooks flush the
+# audit writer in that window.
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+# Recycle workers after a number of requests to bound memory growth; the
+# jitter keeps them from restarting all at once.
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+accesslog = os.getenv("ACCESS_LOG", "-")
+
+# Per-worker metric samples are aggregated through files in this directory.
+# It is emptied here, before the app (and prometheus_client) is preloaded.
+if workers > 1 or os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    multiproc_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prometheus-"))
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    # Pools and clients created in the master must not be shared with the
+    # children; close=False leaves the parent's connections alone.
+    from app import database, storage
+    from app.replicas import replica_set
+
+    for engine in [database.engine, *replica_set.engines]:
+        engine.dispose(close=False)
+    for async_engine in [database.async_engine, *replica_set.async_engines]:
+        if async_engine is not None:
+            async_engine.sync_engine.dispose(close=False)
+    storage.get_s3_client.cache_clear()
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -5,6 +5,10 @@ from dotenv import load_dotenv
 load_dotenv()
 
 if __name__ == "__main__":
+    # SERVER_MODE=production runs the multi-worker gunicorn setup from
+    # gunicorn.conf.py instead of a single reloading uvicorn.
+    if os.getenv("SERVER_MODE", "development") == "production":
+        os.execvp("gunicorn", ["gunicorn", "-c", "gunicorn.conf.py", "app.main:app"])
     host = os.getenv("HOST", "127.0.0.1")
     port = int(os.getenv("PORT", "8002"))
     uvicorn.run("app.main:app", host=host, port=port, reload=True)
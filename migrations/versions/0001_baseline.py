@@ -0,0 +1,97 @@
+"""Baseline schema
+
+Creates the tables of app/models.py exactly as they stood before migrations
+were introduced; everything added since lives in later revisions. Databases
+that already have these tables should be marked with
+`alembic stamp 0001_baseline` and then brought up with `alembic upgrade head`.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "services",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("agency_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("is_enabled", sa.Boolean(), nullable=True),
+        sa.Column("is_checklist_completion_required", sa.Boolean(), nullable=True),
+        sa.Column("is_recurring", sa.Boolean(), nullable=True),
+        sa.Column(
+            "auto_task_creation_frequency",
+            sa.Enum("monthly", "quarterly", "half_yearly", "yearly", name="auto_task_creation_frequency"),
+            nullable=True,
+        ),
+        sa.Column("target_date_creation_date", sa.Integer(), nullable=True),
+        sa.Column("assign_auto_tasks_to_users_of_respective_clients", sa.Boolean(), nullable=True),
+        sa.Column("assign_auto_tasks_to_users", sa.JSON(), nullable=True),
+        sa.Column("billing_sac_code", sa.String(), nullable=True),
+        sa.Column("billing_gst_percent", sa.Numeric(5, 2), nullable=True),
+        sa.Column("billing_default_rate", sa.Numeric(12, 2), nullable=True),
+        sa.Column("billing_default_billable", sa.Boolean(), nullable=True),
+        sa.Column("create_document_collection_request_automatically", sa.Boolean(), nullable=True),
+        sa.Column("document_request_default_message", sa.String(), nullable=True),
+        sa.Column("created_by", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("agency_id", "name", name="uq_agency_id_name"),
+    )
+
+    op.create_table(
+        "service_checklists",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("service_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("services.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("item_text", sa.String(), nullable=False),
+        sa.Column("is_required", sa.Boolean(), nullable=True),
+        sa.Column("sort_order", sa.Integer(), nullable=True),
+    )
+
+    op.create_table(
+        "service_subtasks",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("service_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("services.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("due_date", sa.Integer(), nullable=True),
+        sa.Column("target_date", sa.Integer(), nullable=True),
+        sa.Column("users", sa.JSON(), nullable=True),
+        sa.Column("enable_workflow", sa.Boolean(), nullable=True),
+        sa.Column("sort_order", sa.Integer(), nullable=True),
+    )
+
+    op.create_table(
+        "client_services",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("client_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("service_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("services.id", ondelete="CASCADE"), nullable=False),
+    )
+
+    op.create_table(
+        "service_supporting_files",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("service_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("services.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("file_name", sa.String(), nullable=False),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("mime_type", sa.String(), nullable=True),
+        sa.Column("uploaded_by", sa.String(), nullable=False),
+        sa.Column("uploaded_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("service_supporting_files")
+    op.drop_table("client_services")
+    op.drop_table("service_subtasks")
+    op.drop_table("service_checklists")
+    op.drop_table("services")
+    sa.Enum(name="auto_task_creation_frequency").drop(op.get_bind(), checkfirst=True)
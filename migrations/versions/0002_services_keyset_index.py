@@ -0,0 +1,30 @@
+"""Index services on (agency_id, created_at, id) for keyset-paginated listings
+
+Built CONCURRENTLY so the table stays writable while the index builds.
+
+Revision ID: 0002_services_keyset_index
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002_services_keyset_index"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_services_agency_id_created_at_id",
+            "services",
+            ["agency_id", "created_at", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_services_agency_id_created_at_id", table_name="services", postgresql_concurrently=True, if_exists=True)
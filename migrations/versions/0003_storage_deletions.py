@@ -0,0 +1,30 @@
+"""Durable queue of S3 objects to delete, drained by app.storage_worker
+
+Revision ID: 0003_storage_deletions
+Revises: 0002_services_keyset_index
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_storage_deletions"
+down_revision = "0002_services_keyset_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "storage_deletions",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_storage_deletions_next_attempt_at", "storage_deletions", ["next_attempt_at"])
+
+
+def downgrade():
+    op.drop_table("storage_deletions")
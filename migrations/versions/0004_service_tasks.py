@@ -0,0 +1,67 @@
+"""Recurring task tables and the scheduler's due-service index
+
+The tables are new and created in the migration's transaction; the partial
+index on services is built CONCURRENTLY so the table stays writable.
+
+Revision ID: 0004_service_tasks
+Revises: 0003_storage_deletions
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0004_service_tasks"
+down_revision = "0003_storage_deletions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "service_tasks",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("service_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("services.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("client_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("period", sa.String(), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("assigned_users", sa.JSON(), nullable=True),
+        sa.Column("assign_to_users_of_client", sa.Boolean(), nullable=False, server_default=sa.text("false")),
+        sa.Column("status", sa.String(), nullable=False, server_default=sa.text("'open'")),
+        sa.Column("generation_run_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("service_id", "client_id", "period", name="uq_service_tasks_service_client_period"),
+    )
+    op.create_index("ix_service_tasks_generation_run_id", "service_tasks", ["generation_run_id"])
+
+    op.create_table(
+        "service_task_subtasks",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("task_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("service_tasks.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("subtask_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("service_subtasks.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("users", sa.JSON(), nullable=True),
+        sa.Column("enable_workflow", sa.Boolean(), nullable=True),
+        sa.Column("sort_order", sa.Integer(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False, server_default=sa.text("'open'")),
+        sa.UniqueConstraint("task_id", "subtask_id", name="uq_service_task_subtasks_task_subtask"),
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_services_recurring_frequency",
+            "services",
+            ["auto_task_creation_frequency", "target_date_creation_date"],
+            postgresql_where=sa.text("is_recurring IS true AND is_enabled IS true"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_services_recurring_frequency", table_name="services", postgresql_concurrently=True, if_exists=True)
+    op.drop_table("service_task_subtasks")
+    op.drop_table("service_tasks")
@@ -0,0 +1,44 @@
+"""Make (client_id, service_id) unique on client_services
+
+The bulk assign endpoint inserts with ON CONFLICT on this constraint.
+Duplicate pairs, which nothing prevented before, are removed first, keeping
+one row of each. The index is built CONCURRENTLY and then attached as the
+constraint, so the table is only locked briefly.
+
+Revision ID: 0005_client_services_unique
+Revises: 0004_service_tasks
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0005_client_services_unique"
+down_revision = "0004_service_tasks"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        """
+        DELETE FROM client_services a
+        USING client_services b
+        WHERE a.client_id = b.client_id AND a.service_id = b.service_id AND a.ctid > b.ctid
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "uq_client_services_client_service",
+            "client_services",
+            ["client_id", "service_id"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.execute(
+        "ALTER TABLE client_services ADD CONSTRAINT uq_client_services_client_service "
+        "UNIQUE USING INDEX uq_client_services_client_service"
+    )
+
+
+def downgrade():
+    op.drop_constraint("uq_client_services_client_service", "client_services", type_="unique")
@@ -0,0 +1,41 @@
+"""Audit log table written by app.audit
+
+Before this revision AuditLog lived in app/models/audit_log.py, which the
+models module shadowed, so the table normally does not exist yet. Where it
+was created by hand in that older shape (UUID user_id, naive timestamp, no
+agency_id) it is converted instead.
+
+Revision ID: 0006_audit_logs
+Revises: 0005_client_services_unique
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0006_audit_logs"
+down_revision = "0005_client_services_unique"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("audit_logs"):
+        op.add_column("audit_logs", sa.Column("agency_id", postgresql.UUID(as_uuid=True), nullable=True))
+        op.alter_column("audit_logs", "user_id", type_=sa.String(), postgresql_using="user_id::text")
+        op.alter_column("audit_logs", "timestamp", type_=sa.DateTime(timezone=True), postgresql_using="\"timestamp\" AT TIME ZONE 'UTC'")
+    else:
+        op.create_table(
+            "audit_logs",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("agency_id", postgresql.UUID(as_uuid=True), nullable=True),
+            sa.Column("user_id", sa.String(), nullable=False),
+            sa.Column("action", sa.String(), nullable=False),
+            sa.Column("details", sa.String(), nullable=False),
+            sa.Column("timestamp", sa.DateTime(timezone=True), nullable=True),
+        )
+    op.create_index("ix_audit_logs_agency_id_timestamp_id", "audit_logs", ["agency_id", "timestamp", "id"])
+
+
+def downgrade():
+    op.drop_table("audit_logs")
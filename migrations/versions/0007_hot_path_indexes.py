@@ -0,0 +1,34 @@
+"""Index the foreign keys the options, clients and cascade paths filter on
+
+Built CONCURRENTLY so live tables stay writable while the indexes build.
+
+Revision ID: 0007_hot_path_indexes
+Revises: 0006_audit_logs
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0007_hot_path_indexes"
+down_revision = "0006_audit_logs"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_service_checklists_service_id_sort_order", "service_checklists", ["service_id", "sort_order"]),
+    ("ix_service_subtasks_service_id_sort_order", "service_subtasks", ["service_id", "sort_order"]),
+    ("ix_service_supporting_files_service_id", "service_supporting_files", ["service_id"]),
+    ("ix_client_services_service_id_client_id", "client_services", ["service_id", "client_id"]),
+    ("ix_service_task_subtasks_subtask_id", "service_task_subtasks", ["subtask_id"]),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
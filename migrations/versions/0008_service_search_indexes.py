@@ -0,0 +1,44 @@
+"""Trigram indexes for service search by name and checklist item text
+
+pg_trgm indexes the names for ILIKE substring and word-similarity matches;
+btree_gin lets the same GIN index carry agency_id so the search stays within
+one agency. Creating the extensions needs a role allowed to do so.
+
+Revision ID: 0008_service_search_indexes
+Revises: 0007_hot_path_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0008_service_search_indexes"
+down_revision = "0007_hot_path_indexes"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_services_agency_id_name_trgm", "services", ["agency_id", "name"], {"name": "gin_trgm_ops"}),
+    ("ix_service_checklists_item_text_trgm", "service_checklists", ["item_text"], {"item_text": "gin_trgm_ops"}),
+]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    with op.get_context().autocommit_block():
+        for name, table, columns, ops in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_using="gin",
+                postgresql_ops=ops,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    # The extensions are left installed; other objects may depend on them.
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
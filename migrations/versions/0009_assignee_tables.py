@@ -0,0 +1,102 @@
+"""Indexed assignee tables for services and subtasks, backfilled from JSON
+
+The JSON user lists stay the API's source of truth; the tables hold one row
+per (row, user) so per-user lookups are index range scans. The backfill runs
+in keyset batches of BATCH_SIZE rows, each committed on its own, so large
+tables are never locked or rewritten in one long transaction. It can be
+re-run: existing assignee rows are left alone.
+
+Revision ID: 0009_assignee_tables
+Revises: 0008_service_search_indexes
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0009_assignee_tables"
+down_revision = "0008_service_search_indexes"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+BACKFILLS = [
+    (
+        "services",
+        """
+        INSERT INTO service_assignees (service_id, agency_id, user_id)
+        SELECT s.id, s.agency_id, u.user_id
+        FROM services s
+        CROSS JOIN LATERAL json_array_elements_text(s.assign_auto_tasks_to_users) AS u(user_id)
+        WHERE s.id = ANY(CAST(:ids AS uuid[]))
+          AND json_typeof(s.assign_auto_tasks_to_users) = 'array'
+          AND u.user_id IS NOT NULL
+        ON CONFLICT DO NOTHING
+        """,
+    ),
+    (
+        "service_subtasks",
+        """
+        INSERT INTO service_subtask_assignees (subtask_id, service_id, agency_id, user_id)
+        SELECT st.id, st.service_id, s.agency_id, u.user_id
+        FROM service_subtasks st
+        JOIN services s ON s.id = st.service_id
+        CROSS JOIN LATERAL json_array_elements_text(st.users) AS u(user_id)
+        WHERE st.id = ANY(CAST(:ids AS uuid[]))
+          AND json_typeof(st.users) = 'array'
+          AND u.user_id IS NOT NULL
+        ON CONFLICT DO NOTHING
+        """,
+    ),
+]
+
+
+def _backfill(conn, table, statement):
+    last_id = None
+    while True:
+        ids = conn.execute(
+            sa.text(
+                f"SELECT id FROM {table} WHERE (CAST(:last_id AS uuid) IS NULL OR id > CAST(:last_id AS uuid)) ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).scalars().all()
+        if not ids:
+            return
+        conn.execute(sa.text(statement), {"ids": [str(row_id) for row_id in ids]})
+        last_id = str(ids[-1])
+
+
+def upgrade():
+    op.create_table(
+        "service_assignees",
+        sa.Column("service_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("services.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("user_id", sa.String(), primary_key=True),
+        sa.Column("agency_id", postgresql.UUID(as_uuid=True), nullable=False),
+    )
+    op.create_index("ix_service_assignees_agency_id_user_id", "service_assignees", ["agency_id", "user_id", "service_id"])
+    op.create_table(
+        "service_subtask_assignees",
+        sa.Column("subtask_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("service_subtasks.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("user_id", sa.String(), primary_key=True),
+        sa.Column("service_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("agency_id", postgresql.UUID(as_uuid=True), nullable=False),
+    )
+    op.create_index(
+        "ix_service_subtask_assignees_agency_id_user_id",
+        "service_subtask_assignees",
+        ["agency_id", "user_id", "service_id", "subtask_id"],
+    )
+
+    # The new tables are empty and unused until this revision is deployed,
+    # so the backfill commits batch by batch outside the migration's
+    # transaction.
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        for table, statement in BACKFILLS:
+            _backfill(conn, table, statement)
+
+
+def downgrade():
+    op.drop_table("service_subtask_assignees")
+    op.drop_table("service_assignees")
@@ -0,0 +1,46 @@
+"""Make file_path unique on service_supporting_files
+
+Finalizing a direct upload inserts with ON CONFLICT on this constraint, so a
+retried finalize no longer adds a second row for the same object (deleting
+either row would queue the shared object for deletion). Existing duplicates
+are removed first, keeping one row of each. The index is built
+CONCURRENTLY and then attached as the constraint, so the table is only
+locked briefly.
+
+Revision ID: 0010_unique_file_paths
+Revises: 0009_assignee_tables
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0010_unique_file_paths"
+down_revision = "0009_assignee_tables"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        """
+        DELETE FROM service_supporting_files a
+        USING service_supporting_files b
+        WHERE a.file_path = b.file_path AND a.ctid > b.ctid
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "uq_service_supporting_files_file_path",
+            "service_supporting_files",
+            ["file_path"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.execute(
+        "ALTER TABLE service_supporting_files ADD CONSTRAINT uq_service_supporting_files_file_path "
+        "UNIQUE USING INDEX uq_service_supporting_files_file_path"
+    )
+
+
+def downgrade():
+    op.drop_constraint("uq_service_supporting_files_file_path", "service_supporting_files", type_="unique")
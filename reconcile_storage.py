@@ -0,0 +1,22 @@
+import argparse
+import uuid
+from datetime import timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.storage_worker import reconcile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Queue S3 objects that have no supporting file row for deletion.")
+    parser.add_argument("--service-id", type=uuid.UUID, help="Only scan this service's prefix")
+    parser.add_argument("--grace-hours", type=float, default=24, help="Ignore objects newer than this")
+    parser.add_argument("--dry-run", action="store_true", help="List orphans without queueing them")
+    args = parser.parse_args()
+
+    orphans = reconcile(service_id=args.service_id, grace=timedelta(hours=args.grace_hours), dry_run=args.dry_run)
+    for file_path in orphans:
+        print(file_path)
+    print(f"{len(orphans)} orphaned object(s) {'found' if args.dry_run else 'queued for deletion'}")
@@ -0,0 +1,105 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+# The suite runs the app in process against a scratch Postgres named by
+# TEST_DATABASE_URL (its tables are dropped and recreated); without one the
+# tests are skipped. The environment is fixed before app.config is imported.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL or "postgresql://localhost/services_test"
+os.environ["SECRET_KEY"] = "test-secret"
+os.environ["STORAGE_DELETION_WORKER_ENABLED"] = "false"
+os.environ["CACHE_BACKEND"] = "local"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ.setdefault("DB_ASYNC_ENABLED", "false")
+os.environ["WEB_CONCURRENCY"] = "1"
+os.environ["QUERY_BUDGET_MODE"] = "strict"
+
+
+@pytest.fixture(scope="session")
+def engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from app.database import engine
+    from app.models import Base
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="session")
+def app_client(engine):
+    # One client (and event loop) for the whole run: async mode pools asyncpg
+    # connections, which are bound to the loop that opened them.
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def client(app_client):
+    from app.cache import pin_cache, revision_cache, service_cache
+
+    service_cache.clear()
+    revision_cache.clear()
+    pin_cache.clear()
+    return app_client
+
+
+@pytest.fixture
+def query_budgets(monkeypatch):
+    # Collects the RequestDBStats of every request the test makes and fails
+    # the test if one ran more statements than its endpoint's @query_budget,
+    # or ran any on an endpoint without one, whatever QUERY_BUDGET_MODE is.
+    # Tests can also assert on the collected stats directly.
+    from app import query_budget
+
+    requests = []
+    check_request = query_budget.check_request
+
+    def record(stats):
+        requests.append(stats)
+        check_request(stats)
+
+    monkeypatch.setattr(query_budget, "check_request", record)
+    yield requests
+
+    failures = []
+    for stats in requests:
+        budget = query_budget.budget_for(stats.scope)
+        request = f"{stats.scope['method']} {stats.scope['path']}"
+        if budget is None and stats.queries:
+            failures.append(f"{request} ran {stats.queries} queries without a budget")
+        elif budget is not None and stats.queries > budget:
+            failures.append(f"{request} ran {stats.queries} queries, budget is {budget}")
+    assert not failures, "\n".join(failures)
+
+
+@pytest.fixture
+def agency_id():
+    return uuid.uuid4()
+
+
+@pytest.fixture
+def headers(agency_id):
+    from jose import jwt
+
+    claims = {"sub": "tester@example.com", "role_scope": "SUPER_ADMIN", "exp": datetime.utcnow() + timedelta(hours=1)}
+    token = jwt.encode(claims, os.environ["SECRET_KEY"], algorithm="HS256")
+    return {"Authorization": f"Bearer {token}", "X-Agency-Id": str(agency_id)}
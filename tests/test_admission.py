@@ -0,0 +1,140 @@
+import asyncio
+
+from app import config
+from app.admission import AdmissionControl
+from app.database import RequestDBStats, request_db_stats
+
+AGENCY = "3f0c6a52-8a3e-4c41-9a55-1f4d8d0f6b10"
+OTHER_AGENCY = "9b7e2d1c-4f6a-4b8e-8c3d-2a1b0c9d8e7f"
+
+
+def _admission(monkeypatch, app, **settings):
+    defaults = {
+        "ADMISSION_MAX_IN_FLIGHT": 0,
+        "ADMISSION_AGENCY_MAX_IN_FLIGHT": 0,
+        "ADMISSION_AGENCY_RATE": 0,
+        "ADMISSION_AGENCY_BURST": 0,
+        "ADMISSION_SHED_POOL_WAIT_MS": 0,
+        "ADMISSION_POOL_WAIT_HALF_LIFE_SECONDS": 60,
+        "ADMISSION_RETRY_AFTER_SECONDS": 1,
+        "ADMISSION_EXEMPT_PATHS": ["/metrics"],
+    }
+    for name, value in {**defaults, **settings}.items():
+        monkeypatch.setattr(config, name, value)
+    return AdmissionControl(app)
+
+
+async def _ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _request(middleware, agency_id=AGENCY, path="/services/"):
+    headers = [(b"x-agency-id", agency_id.encode())] if agency_id else []
+    scope = {"type": "http", "method": "GET", "path": path, "headers": headers, "query_string": b""}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    start = messages[0]
+    return start["status"], {name.decode().lower(): value.decode() for name, value in start["headers"]}
+
+
+def _run(*requests):
+    async def run():
+        return [await request for request in requests]
+
+    return asyncio.run(run())
+
+
+def test_requests_within_the_limits_pass_through(monkeypatch):
+    middleware = _admission(
+        monkeypatch, _ok, ADMISSION_MAX_IN_FLIGHT=10, ADMISSION_AGENCY_MAX_IN_FLIGHT=2, ADMISSION_AGENCY_RATE=100, ADMISSION_SHED_POOL_WAIT_MS=50
+    )
+    results = _run(*(_request(middleware) for _ in range(5)), _request(middleware, agency_id=None))
+    assert [status for status, _ in results] == [200] * 6
+    assert middleware.in_flight == 0 and middleware.agency_in_flight == {}
+
+
+def test_token_bucket_answers_429_with_retry_after(monkeypatch):
+    middleware = _admission(monkeypatch, _ok, ADMISSION_AGENCY_RATE=0.5, ADMISSION_AGENCY_BURST=2)
+    results = _run(*(_request(middleware) for _ in range(3)), _request(middleware, agency_id=OTHER_AGENCY))
+    assert [status for status, _ in results] == [200, 200, 429, 200]
+    # One token refills in 1 / 0.5 seconds.
+    assert results[2][1]["retry-after"] == "2"
+
+
+def test_agency_in_flight_limit(monkeypatch):
+    release = asyncio.Event()
+
+    async def slow(scope, receive, send):
+        await release.wait()
+        await _ok(scope, receive, send)
+
+    middleware = _admission(monkeypatch, slow, ADMISSION_AGENCY_MAX_IN_FLIGHT=1, ADMISSION_RETRY_AFTER_SECONDS=3)
+
+    async def run():
+        first = asyncio.create_task(_request(middleware))
+        await asyncio.sleep(0)
+        limited = await _request(middleware)
+        other = asyncio.create_task(_request(middleware, agency_id=OTHER_AGENCY))
+        await asyncio.sleep(0)
+        release.set()
+        return limited, await first, await other, await _request(middleware)
+
+    limited, first, other, after = asyncio.run(run())
+    assert limited[0] == 429 and limited[1]["retry-after"] == "3"
+    assert first[0] == other[0] == after[0] == 200
+
+
+def test_global_in_flight_cap_answers_503(monkeypatch):
+    release = asyncio.Event()
+
+    async def slow(scope, receive, send):
+        await release.wait()
+        await _ok(scope, receive, send)
+
+    middleware = _admission(monkeypatch, slow, ADMISSION_MAX_IN_FLIGHT=1)
+
+    async def run():
+        first = asyncio.create_task(_request(middleware))
+        await asyncio.sleep(0)
+        rejected = await _request(middleware, agency_id=OTHER_AGENCY)
+        exempt = asyncio.create_task(_request(middleware, path="/metrics"))
+        await asyncio.sleep(0)
+        release.set()
+        return rejected, await first, await exempt
+
+    rejected, first, exempt = asyncio.run(run())
+    assert rejected[0] == 503 and rejected[1]["retry-after"] == "1"
+    assert first[0] == exempt[0] == 200
+
+
+def test_sheds_load_while_pool_checkouts_wait(monkeypatch):
+    async def waited(scope, receive, send):
+        # What app.main's stats middleware collects for a request whose one
+        # connection checkout waited 200 ms.
+        stats = RequestDBStats(scope)
+        stats.checkouts, stats.checkout_wait = 1, 0.2
+        request_db_stats.set(stats)
+        await _ok(scope, receive, send)
+
+    middleware = _admission(monkeypatch, waited, ADMISSION_SHED_POOL_WAIT_MS=50)
+    statuses = [status for status, _ in _run(*(_request(middleware) for _ in range(10)))]
+    assert statuses[0] == 200
+    assert statuses[-1] == 503
+    # Without new samples the average decays and requests are admitted again.
+    middleware.pool_wait.half_life = 0.01
+    middleware.pool_wait._updated -= 1
+    assert _run(_request(middleware))[0][0] == 200
+
+
+def test_agency_ids_are_case_insensitive(monkeypatch):
+    middleware = _admission(monkeypatch, _ok, ADMISSION_AGENCY_RATE=0.5, ADMISSION_AGENCY_BURST=1)
+    statuses = [status for status, _ in _run(_request(middleware), _request(middleware, agency_id=AGENCY.upper()))]
+    assert statuses == [200, 429]
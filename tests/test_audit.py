@@ -0,0 +1,13 @@
+import time
+
+from app.audit import AuditWriter
+
+
+def test_record_drops_instead_of_blocking_when_the_queue_is_full():
+    writer = AuditWriter(max_queue=1)
+    user = {"id": "tester@example.com"}
+    start = time.perf_counter()
+    for _ in range(100):
+        writer.record("service.create", user)
+    assert time.perf_counter() - start < 0.05
+    assert writer.dropped == 99
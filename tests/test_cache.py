@@ -0,0 +1,123 @@
+import uuid
+
+import pytest
+
+from app import cache
+
+
+def _get(client, url, headers):
+    response = client.get(url, headers=headers)
+    return {"status": response.status_code, "body": response.json(), "etag": response.headers.get("etag")}
+
+
+def _reads(client, ctx):
+    # Every cached read of the catalog, including the clone target's listing.
+    return {
+        "list": _get(client, "/services/", ctx["headers"]),
+        "detail": _get(client, f"/services/{ctx['service_id']}", ctx["headers"]),
+        "checklist": _get(client, f"/options/checklists/{ctx['service_id']}", ctx["headers"]),
+        "target_list": _get(client, "/services/", ctx["target_headers"]),
+    }
+
+
+MUTATIONS = {
+    "services.create": lambda client, ctx: client.post("/services/", json={"name": "bookkeeping"}, headers=ctx["headers"]),
+    "services.delete": lambda client, ctx: client.delete(f"/services/{ctx['service_id']}", headers=ctx["headers"]),
+    "services.import": lambda client, ctx: client.post(
+        "/services/import",
+        params={"on_conflict": "update"},
+        content=b'{"name": "payroll", "is_enabled": false, "checklists": [{"item_text": "imported"}]}\n',
+        headers=ctx["headers"],
+    ),
+    "services.clone": lambda client, ctx: client.post(
+        f"/services/{ctx['service_id']}/clone", json={"agency_ids": [str(ctx["target_agency_id"])]}, headers=ctx["headers"]
+    ),
+    "options.update_settings": lambda client, ctx: client.patch(
+        f"/options/settings/{ctx['service_id']}", data={"is_enabled": "false"}, headers=ctx["headers"]
+    ),
+    "options.checklists.create": lambda client, ctx: client.post(
+        f"/options/checklists/{ctx['service_id']}", json={"item_text": "new item"}, headers=ctx["headers"]
+    ),
+    "options.checklists.batch": lambda client, ctx: client.post(
+        f"/options/checklists/{ctx['service_id']}/batch",
+        json={"create": [{"item_text": "batched"}], "delete": [str(ctx["item_id"])]},
+        headers=ctx["headers"],
+    ),
+    "options.checklists.update": lambda client, ctx: client.patch(
+        f"/options/checklists/{ctx['item_id']}", json={"item_text": "edited"}, headers=ctx["headers"]
+    ),
+    "options.checklists.delete": lambda client, ctx: client.delete(f"/options/checklists/{ctx['item_id']}", headers=ctx["headers"]),
+}
+
+
+@pytest.mark.parametrize("mutation", sorted(MUTATIONS))
+def test_no_stale_reads_after_mutation(client, headers, mutation):
+    target_agency_id = uuid.uuid4()
+    ctx = {"headers": headers, "target_agency_id": target_agency_id, "target_headers": {**headers, "X-Agency-Id": str(target_agency_id)}}
+    ctx["service_id"] = client.post("/services/", json={"name": "payroll"}, headers=headers).json()["id"]
+    ctx["item_id"] = client.post(f"/options/checklists/{ctx['service_id']}", json={"item_text": "collect payslips"}, headers=headers).json()["id"]
+
+    before = _reads(client, ctx)
+    assert MUTATIONS[mutation](client, ctx).status_code < 400
+    after = _reads(client, ctx)
+
+    # A client revalidating with the old ETag must not be told nothing changed.
+    for name, read in before.items():
+        if read["etag"] is None:
+            continue
+        url = {"list": "/services/", "checklist": f"/options/checklists/{ctx['service_id']}", "target_list": "/services/"}[name]
+        request_headers = ctx["target_headers"] if name == "target_list" else headers
+        response = client.get(url, headers={**request_headers, "If-None-Match": read["etag"]})
+        if response.status_code == 304:
+            assert after[name]["body"] == read["body"], name
+
+    # What the cache served must be what the database holds.
+    cache.service_cache.clear()
+    cache.revision_cache.clear()
+    fresh = _reads(client, ctx)
+    for name in fresh:
+        assert (after[name]["status"], after[name]["body"]) == (fresh[name]["status"], fresh[name]["body"]), name
+    assert any(after[name]["body"] != before[name]["body"] for name in before)
+
+
+def _local_cache():
+    return cache.LocalCache(100, 60)
+
+
+def _redis_cache():
+    fakeredis = pytest.importorskip("fakeredis")
+    return cache.RedisCache(None, 60, client=fakeredis.FakeRedis())
+
+
+@pytest.mark.parametrize("build", [_local_cache, _redis_cache], ids=["local", "redis"])
+def test_load_overlapping_an_invalidation_is_not_stored(build):
+    backend = build()
+
+    def load_then_invalidate():
+        # The write commits and invalidates while this read is loading.
+        backend.delete("key")
+        return "stale"
+
+    assert backend.get_or_load("key", load_then_invalidate) == "stale"
+    assert backend.get("key") is cache.MISSING
+    assert backend.get_or_load("key", lambda: "fresh") == "fresh"
+    assert backend.get_or_load("key", lambda: "unused") == "fresh"
+
+
+def test_redis_cache_calls_stay_off_the_event_loop():
+    import asyncio
+    import threading
+
+    from sqlalchemy.util.concurrency import greenlet_spawn
+
+    backend = _redis_cache()
+    threads = []
+    flushdb = backend.client.flushdb
+    backend.client.flushdb = lambda: threads.append(threading.get_ident()) or flushdb()
+
+    async def in_greenlet():
+        await greenlet_spawn(backend.clear)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(in_greenlet())
+    assert threads and threads[0] != loop_thread
@@ -0,0 +1,62 @@
+import uuid
+
+from app import cache, config
+
+
+def _service(client, headers, name):
+    response = client.post("/services/", json={"name": name}, headers=headers)
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _count(client, headers, service_id):
+    return client.get(f"/clients/{service_id}/count", headers=headers).json()
+
+
+def test_bulk_assignments_only_touch_the_agencys_services(client, headers):
+    other_headers = {**headers, "X-Agency-Id": str(uuid.uuid4())}
+    ours = _service(client, headers, "payroll")
+    theirs = _service(client, other_headers, "payroll")
+    clients = [str(uuid.uuid4()), str(uuid.uuid4())]
+
+    body = {"client_ids": clients, "service_ids": [ours, theirs]}
+    assert client.post("/clients/assignments", json=body, headers=headers).json() == {"affected": 2}
+    assert client.post("/clients/assignments", json=body, headers=headers).json() == {"affected": 0}
+    assert client.post("/clients/assignments", json=body, headers=other_headers).json() == {"affected": 2}
+    assert _count(client, headers, ours) == _count(client, headers, theirs) == 2
+
+    assert client.post(f"/clients/{clients[0]}/services/unassign", json={"service_ids": [ours, theirs]}, headers=headers).json() == {"affected": 1}
+    assert client.post("/clients/assignments/remove", json=body, headers=headers).json() == {"affected": 1}
+    assert _count(client, headers, ours) == 0
+    assert _count(client, headers, theirs) == 2
+
+    for action in ("assign", "unassign"):
+        response = client.post(f"/clients/services/{theirs}/{action}", json={"client_ids": clients}, headers=headers)
+        assert response.status_code == 404
+    assert _count(client, headers, theirs) == 2
+    assert client.get("/clients/counts", params={"service_id": [ours, theirs]}, headers=headers).json() == {ours: 0}
+
+
+def test_assignments_pin_the_agency_before_committing(client, agency_id, headers, monkeypatch):
+    from sqlalchemy.orm import Session
+
+    from app.routers import clients as clients_router
+
+    monkeypatch.setattr(config, "DATABASE_REPLICA_URLS", ["postgresql://replica.invalid/services"])
+    service_id = _service(client, headers, "audit")
+    cache.pin_cache.clear()
+
+    events = []
+    pin_to_primary, commit = clients_router.pin_to_primary, Session.commit
+    monkeypatch.setattr(clients_router, "pin_to_primary", lambda agency: events.append(("pin", agency)) or pin_to_primary(agency))
+    monkeypatch.setattr(Session, "commit", lambda session: events.append(("commit", None)) or commit(session))
+
+    for path, body in (
+        ("/clients/assignments", {"client_ids": [str(uuid.uuid4())], "service_ids": [service_id]}),
+        (f"/clients/services/{service_id}/unassign", {"client_ids": [str(uuid.uuid4())]}),
+    ):
+        events.clear()
+        assert client.post(path, json=body, headers=headers).status_code == 200
+        assert events == [("pin", agency_id), ("commit", None)]
+        assert cache.is_pinned(agency_id)
+        cache.pin_cache.clear()
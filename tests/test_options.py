@@ -0,0 +1,65 @@
+def test_created_checklist_items_and_subtasks_are_appended(client, headers):
+    service = client.post("/services/", json={"name": "gst filing"}, headers=headers).json()
+
+    for text in ("collect invoices", "reconcile", "file return"):
+        assert client.post(f"/options/checklists/{service['id']}", json={"item_text": text}, headers=headers).status_code == 201
+    items = client.get(f"/options/checklists/{service['id']}", headers=headers).json()
+    assert [(item["item_text"], item["sort_order"]) for item in items] == [("collect invoices", 0), ("reconcile", 1), ("file return", 2)]
+
+    for title in ("prepare", "review"):
+        assert client.post(f"/options/subtasks/{service['id']}", data={"title": title}, headers=headers).status_code == 201
+    subtasks = client.get(f"/options/subtasks/{service['id']}", headers=headers).json()
+    assert sorted((subtask["title"], subtask["sort_order"]) for subtask in subtasks) == [("prepare", 0), ("review", 1)]
+
+
+def test_batch_create_with_an_id_taken_by_another_service_conflicts(client, headers):
+    first = client.post("/services/", json={"name": "tds return"}, headers=headers).json()
+    second = client.post("/services/", json={"name": "pf return"}, headers=headers).json()
+    created = client.post(f"/options/checklists/{first['id']}/batch", json={"create": [{"item_text": "collect challans"}]}, headers=headers)
+    assert created.status_code == 200
+    item_id = created.json()[0]["id"]
+
+    response = client.post(
+        f"/options/checklists/{second['id']}/batch",
+        json={"create": [{"id": item_id, "item_text": "copied"}]},
+        headers=headers,
+    )
+    assert response.status_code == 409
+    assert client.get(f"/options/checklists/{second['id']}", headers=headers).json() == []
+    assert [item["item_text"] for item in client.get(f"/options/checklists/{first['id']}", headers=headers).json()] == ["collect challans"]
+
+
+def test_finalizing_an_upload_twice_keeps_one_row(client, headers, monkeypatch):
+    from app import storage
+
+    monkeypatch.setattr(storage, "head_object", lambda key: {"ContentType": "application/pdf"})
+    service = client.post("/services/", json={"name": "itr filing"}, headers=headers).json()
+    body = {"key": storage.new_object_key(service["id"], "form16.pdf"), "file_name": "form16.pdf"}
+
+    first = client.post(f"/options/supporting-files/{service['id']}/finalize", json=body, headers=headers)
+    retried = client.post(f"/options/supporting-files/{service['id']}/finalize", json=body, headers=headers)
+    assert first.status_code == retried.status_code == 201
+    assert retried.json() == first.json()
+    assert [item["id"] for item in client.get(f"/options/supporting-files/{service['id']}", headers=headers).json()] == [first.json()["id"]]
+
+
+def test_settings_update_only_syncs_assignees_when_users_change(client, headers, query_budgets):
+    user_id = "00000000-0000-0000-0000-000000000001"
+    service = client.post("/services/", json={"name": "vat return"}, headers=headers).json()
+    settings = f"/options/settings/{service['id']}"
+    assigned = f"/assignments/{user_id}/services"
+
+    assert client.patch(settings, data={"assign_auto_tasks_to_users": user_id}, headers=headers).status_code == 200
+    assert query_budgets[-1].queries == 2
+    assert [item["id"] for item in client.get(assigned, headers=headers).json()] == [service["id"]]
+
+    response = client.patch(settings, data={"assign_auto_tasks_to_users": user_id, "billing_sac_code": "998311"}, headers=headers)
+    assert response.status_code == 200
+    assert query_budgets[-1].queries == 1
+    assert response.json()["assign_auto_tasks_to_users"] == [user_id]
+    assert [item["id"] for item in client.get(assigned, headers=headers).json()] == [service["id"]]
+
+    # The form always carries the users; leaving them out clears them.
+    assert client.patch(settings, data={"billing_sac_code": "998312"}, headers=headers).status_code == 200
+    assert query_budgets[-1].queries == 2
+    assert client.get(assigned, headers=headers).json() == []
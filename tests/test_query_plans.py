@@ -0,0 +1,172 @@
+import json
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import event, inspect
+
+from app import config, storage, storage_worker
+from app.database import SessionLocal
+from app.scheduler import generate_tasks
+
+# Every statement an endpoint or worker sends is captured as it runs and
+# EXPLAINed with enable_seqscan off. With sequential scans penalised the
+# planner only picks one when no index can serve the query, so any "Seq Scan"
+# node means a missing or unusable index, whatever the table sizes.
+USER_ID = str(uuid.UUID(int=1))
+
+
+@pytest.fixture
+def statements(engine):
+    if config.DB_ASYNC_ENABLED:
+        pytest.skip("plans are checked on the sync engine; both modes run the same statements")
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    yield captured
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+@pytest.fixture
+def catalog(client, headers, monkeypatch):
+    monkeypatch.setattr(storage, "head_object", lambda key: {"ContentType": "text/plain"})
+    monkeypatch.setattr(storage, "delete_objects", lambda keys: {})
+    monkeypatch.setattr(storage, "presigned_get", lambda key, file_name: f"https://storage.example.com/{key}")
+    service_ids = []
+    for number in range(3):
+        service = client.post("/services/", json={"name": f"Service {number:04d}"}, headers=headers).json()
+        service_ids.append(service["id"])
+        client.patch(
+            f"/options/settings/{service['id']}",
+            data={"is_recurring": "true", "auto_task_creation_frequency": "monthly", "assign_auto_tasks_to_users": USER_ID},
+            headers=headers,
+        )
+        client.post(f"/options/checklists/{service['id']}/batch", json={"create": [{"item_text": f"item {n}"} for n in range(3)]}, headers=headers)
+        client.post(f"/options/subtasks/{service['id']}/batch", json={"create": [{"title": f"subtask {n}", "users": [USER_ID]} for n in range(2)]}, headers=headers)
+        key = storage.new_object_key(service["id"], "notes.txt")
+        client.post(f"/options/supporting-files/{service['id']}/finalize", json={"key": key, "file_name": "notes.txt"}, headers=headers)
+    client_ids = [str(uuid.uuid4()) for _ in range(2)]
+    client.post("/clients/assignments", json={"client_ids": client_ids, "service_ids": service_ids}, headers=headers)
+    return {
+        "services": service_ids,
+        "clients": client_ids,
+        "checklists": [item["id"] for item in client.get(f"/options/checklists/{service_ids[0]}", headers=headers).json()],
+        "subtasks": [item["id"] for item in client.get(f"/options/subtasks/{service_ids[0]}", headers=headers).json()],
+        "files": [item["id"] for item in client.get(f"/options/supporting-files/{service_ids[0]}", headers=headers).json()],
+    }
+
+
+def _next_page(client, url, headers, **params):
+    cursor = client.get(url, params={**params, "limit": 1}, headers=headers).headers["X-Next-Cursor"]
+    return client.get(url, params={**params, "limit": 1, "cursor": cursor}, headers=headers)
+
+
+CASES = {
+    "services.list": lambda c, h, d: c.get("/services/", params={"limit": 100}, headers=h),
+    "services.list.next_page": lambda c, h, d: _next_page(c, "/services/", h),
+    "services.list.filtered": lambda c, h, d: c.get("/services/", params={"is_recurring": "true", "frequency": "monthly"}, headers=h),
+    "services.get": lambda c, h, d: c.get(f"/services/{d['services'][1]}", headers=h),
+    "services.search": lambda c, h, d: c.get("/services/search", params={"q": "ervice 0001", "include_checklists": "true"}, headers=h),
+    "services.search.next_page": lambda c, h, d: _next_page(c, "/services/search", h, q="Service"),
+    "services.export": lambda c, h, d: c.get("/services/export", headers=h),
+    "services.clone": lambda c, h, d: c.post(f"/services/{d['services'][1]}/clone", json={"agency_ids": [str(uuid.uuid4())]}, headers=h),
+    "services.delete": lambda c, h, d: c.delete(f"/services/{d['services'][2]}", headers=h),
+    "options.update_settings": lambda c, h, d: c.patch(f"/options/settings/{d['services'][1]}", data={"billing_sac_code": "998311"}, headers=h),
+    "options.checklists.list": lambda c, h, d: c.get(f"/options/checklists/{d['services'][1]}", headers=h),
+    "options.checklists.create": lambda c, h, d: c.post(f"/options/checklists/{d['services'][1]}", json={"item_text": "new"}, headers=h),
+    "options.checklists.batch": lambda c, h, d: c.post(
+        f"/options/checklists/{d['services'][0]}/batch",
+        json={"create": [{"item_text": "new"}], "update": [{"id": d["checklists"][0], "item_text": "edited"}], "delete": [d["checklists"][1]]},
+        headers=h,
+    ),
+    "options.checklists.update": lambda c, h, d: c.patch(f"/options/checklists/{d['checklists'][0]}", json={"item_text": "edited"}, headers=h),
+    "options.checklists.delete": lambda c, h, d: c.delete(f"/options/checklists/{d['checklists'][0]}", headers=h),
+    "options.subtasks.list": lambda c, h, d: c.get(f"/options/subtasks/{d['services'][1]}", headers=h),
+    "options.subtasks.create": lambda c, h, d: c.post(f"/options/subtasks/{d['services'][1]}", data={"title": "new", "users": USER_ID}, headers=h),
+    "options.subtasks.batch": lambda c, h, d: c.post(
+        f"/options/subtasks/{d['services'][0]}/batch",
+        json={"create": [{"title": "new"}], "update": [{"id": d["subtasks"][0], "users": []}], "delete": [d["subtasks"][1]]},
+        headers=h,
+    ),
+    "options.subtasks.update": lambda c, h, d: c.patch(f"/options/subtasks/{d['subtasks'][0]}", json={"users": []}, headers=h),
+    "options.subtasks.delete": lambda c, h, d: c.delete(f"/options/subtasks/{d['subtasks'][0]}", headers=h),
+    "options.files.list": lambda c, h, d: c.get(f"/options/supporting-files/{d['services'][1]}", headers=h),
+    "options.files.download_url": lambda c, h, d: c.get(f"/options/supporting-files/{d['files'][0]}/download-url", headers=h),
+    "options.files.delete": lambda c, h, d: c.delete(f"/options/supporting-files/{d['files'][0]}", headers=h),
+    "clients.counts": lambda c, h, d: c.get("/clients/counts", params={"service_id": d["services"]}, headers=h),
+    "clients.count": lambda c, h, d: c.get(f"/clients/{d['services'][0]}/count", headers=h),
+    "clients.assignments": lambda c, h, d: c.post("/clients/assignments", json={"client_ids": [str(uuid.uuid4())], "service_ids": d["services"]}, headers=h),
+    "clients.assignments_remove": lambda c, h, d: c.post("/clients/assignments/remove", json={"client_ids": d["clients"], "service_ids": d["services"]}, headers=h),
+    "clients.service_assign": lambda c, h, d: c.post(f"/clients/services/{d['services'][0]}/assign", json={"client_ids": [str(uuid.uuid4())]}, headers=h),
+    "clients.service_unassign": lambda c, h, d: c.post(f"/clients/services/{d['services'][0]}/unassign", json={"client_ids": d["clients"]}, headers=h),
+    "clients.client_assign": lambda c, h, d: c.post(f"/clients/{uuid.uuid4()}/services/assign", json={"service_ids": d["services"]}, headers=h),
+    "clients.client_unassign": lambda c, h, d: c.post(f"/clients/{d['clients'][0]}/services/unassign", json={"service_ids": d["services"]}, headers=h),
+    "assignments.subtasks": lambda c, h, d: _next_page(c, f"/assignments/{USER_ID}/subtasks", h),
+    "assignments.services": lambda c, h, d: _next_page(c, f"/assignments/{USER_ID}/services", h),
+    "audit.list": lambda c, h, d: c.get("/audit-logs/", params={"action": "service.create"}, headers=h),
+    "scheduler.generate_tasks": lambda c, h, d: _with_session(generate_tasks, today=date.today().replace(day=28)),
+    "storage_worker.process_batch": lambda c, h, d: (c.delete(f"/options/supporting-files/{d['files'][0]}", headers=h), storage_worker.process_batch()),
+}
+
+
+def _with_session(function, **kwargs):
+    with SessionLocal() as db:
+        return function(db, **kwargs)
+
+
+def sequential_scans(plan):
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(sequential_scans(child))
+    return found
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_endpoint_queries_use_indexes(name, client, headers, catalog, statements, engine):
+    del statements[:]
+    result = CASES[name](client, headers, catalog)
+    for response in result if isinstance(result, tuple) else (result,):
+        if hasattr(response, "status_code"):
+            assert response.status_code < 400, response.text
+    assert statements, f"{name} ran no statements"
+
+    failures = []
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET enable_seqscan = off")
+        for statement, parameters in statements:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            (explained,) = cursor.fetchone()
+            if isinstance(explained, str):
+                explained = json.loads(explained)
+            tables = sequential_scans(explained[0]["Plan"])
+            if tables:
+                failures.append(f"Seq Scan on {', '.join(tables)}: {' '.join(statement.split())}")
+        connection.rollback()
+    finally:
+        connection.close()
+    assert not failures, "\n".join(failures)
+
+
+def test_foreign_keys_are_indexed(engine):
+    # ON DELETE CASCADE / SET NULL looks rows up by the referencing columns,
+    # once per deleted parent row; those lookups never pass through the
+    # capture above.
+    inspector = inspect(engine)
+    missing = []
+    for table in inspector.get_table_names():
+        prefixes = [index["column_names"] for index in inspector.get_indexes(table)]
+        prefixes += [constraint["column_names"] for constraint in inspector.get_unique_constraints(table)]
+        prefixes.append(inspector.get_pk_constraint(table)["constrained_columns"])
+        for foreign_key in inspector.get_foreign_keys(table):
+            columns = foreign_key["constrained_columns"]
+            if not any(prefix[: len(columns)] == columns for prefix in prefixes):
+                missing.append(f"{table}({', '.join(columns)})")
+    assert not missing, f"foreign keys without an index: {', '.join(missing)}"
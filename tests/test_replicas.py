@@ -0,0 +1,12 @@
+from app import cache, config
+
+
+def test_writes_pin_the_agency_where_catalog_entries_cannot_evict_it(client, agency_id, headers, monkeypatch):
+    monkeypatch.setattr(config, "DATABASE_REPLICA_URLS", ["postgresql://replica.invalid/services"])
+    assert not cache.is_pinned(agency_id)
+    assert client.post("/services/", json={"name": "payroll"}, headers=headers).status_code == 201
+    assert cache.is_pinned(agency_id)
+
+    for index in range(cache.service_cache.max_entries + 1):
+        cache.service_cache.set(f"filler:{index}", index)
+    assert cache.is_pinned(agency_id)
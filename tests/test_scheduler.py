@@ -0,0 +1,70 @@
+import uuid
+from datetime import date
+
+from sqlalchemy import func, select
+
+from app import models
+from app.scheduler import generate_tasks
+
+
+def _recurring_service(db, agency_id, name, frequency, target_day, clients, subtasks=()):
+    service = models.Service(
+        agency_id=agency_id,
+        name=name,
+        created_by="tester@example.com",
+        is_recurring=True,
+        auto_task_creation_frequency=frequency,
+        target_date_creation_date=target_day,
+        subtasks=[models.ServiceSubtask(title=title, sort_order=index) for index, title in enumerate(subtasks)],
+    )
+    db.add(service)
+    db.flush()
+    db.add_all(models.ClientService(client_id=client_id, service_id=service.id) for client_id in clients)
+    db.commit()
+    return service.id
+
+
+def _counts(db, service_ids):
+    tasks = db.scalar(select(func.count()).select_from(models.ServiceTask).where(models.ServiceTask.service_id.in_(service_ids)))
+    subtasks = db.scalar(
+        select(func.count())
+        .select_from(models.ServiceTaskSubtask)
+        .join(models.ServiceTask)
+        .where(models.ServiceTask.service_id.in_(service_ids))
+    )
+    return tasks, subtasks
+
+
+def test_generating_twice_for_a_period_creates_no_duplicates(db, agency_id):
+    clients = [uuid.uuid4(), uuid.uuid4()]
+    service_ids = [
+        _recurring_service(db, agency_id, "monthly gst", "monthly", 5, clients, subtasks=["collect", "file"]),
+        _recurring_service(db, agency_id, "annual audit", "yearly", None, clients[:1]),
+    ]
+
+    generate_tasks(db, today=date(2026, 5, 10))
+    assert _counts(db, service_ids) == (3, 4)
+    generate_tasks(db, today=date(2026, 5, 20))
+    assert _counts(db, service_ids) == (3, 4)
+
+    # The next month is a new period for the monthly service only.
+    generate_tasks(db, today=date(2026, 6, 10))
+    assert _counts(db, service_ids) == (5, 8)
+    periods = db.scalars(select(models.ServiceTask.period).where(models.ServiceTask.service_id == service_ids[0]).distinct())
+    assert sorted(periods) == ["2026-05", "2026-06"]
+
+
+def test_target_day_past_the_end_of_the_period_is_due_on_its_last_day(db, agency_id):
+    service_id = _recurring_service(db, agency_id, "month end close", "monthly", 31, [uuid.uuid4()])
+
+    generate_tasks(db, today=date(2026, 4, 29))
+    assert _counts(db, [service_id]) == (0, 0)
+    generate_tasks(db, today=date(2026, 4, 30))
+    assert _counts(db, [service_id]) == (1, 0)
+    assert db.scalar(select(models.ServiceTask.period_start).where(models.ServiceTask.service_id == service_id)) == date(2026, 4, 1)
+
+    # In a 31-day month the task waits for the 31st.
+    generate_tasks(db, today=date(2026, 5, 30))
+    assert _counts(db, [service_id]) == (1, 0)
+    generate_tasks(db, today=date(2026, 5, 31))
+    assert _counts(db, [service_id]) == (2, 0)
@@ -0,0 +1,124 @@
+from app import models
+
+
+def test_list_services_frequency_filter_maps_annually_to_yearly(client, db, agency_id, headers):
+    for name, frequency in [("yearly return", "yearly"), ("monthly return", "monthly")]:
+        db.add(
+            models.Service(
+                agency_id=agency_id, name=name, created_by="tester@example.com", is_recurring=True, auto_task_creation_frequency=frequency
+            )
+        )
+    db.commit()
+
+    for value in ("annually", "yearly"):
+        response = client.get("/services/", params={"frequency": value}, headers=headers)
+        assert response.status_code == 200
+        assert [service["name"] for service in response.json()] == ["yearly return"]
+
+    assert client.get("/services/", params={"frequency": "weekly"}, headers=headers).status_code == 422
+
+
+def test_yearly_services_read_as_annually_everywhere(client, headers):
+    from typing import List
+
+    from pydantic import TypeAdapter
+
+    from app import schemas
+
+    service = client.post("/services/", json={"name": "annual return"}, headers=headers).json()
+    response = client.patch(
+        f"/options/settings/{service['id']}", data={"is_recurring": "true", "auto_task_creation_frequency": "annually"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["auto_task_creation_frequency"] == "annually"
+
+    listed = client.get("/services/", headers=headers).json()
+    TypeAdapter(List[schemas.ServiceRead]).validate_python(listed)
+    detail = client.get(f"/services/{service['id']}", headers=headers).json()
+    assert listed[0]["auto_task_creation_frequency"] == detail["auto_task_creation_frequency"] == "annually"
+    subset = client.get("/services/", params={"fields": "name,auto_task_creation_frequency"}, headers=headers).json()
+    assert subset == [{"name": "annual return", "auto_task_creation_frequency": "annually", "checklists": []}]
+
+
+def test_cross_origin_clients_can_read_pagination_headers(client, headers):
+    response = client.get("/services/", params={"limit": 1}, headers={**headers, "Origin": "https://app.datainvestigo.com"})
+    assert response.status_code == 200
+    exposed = {name.strip().lower() for name in response.headers["access-control-expose-headers"].split(",")}
+    assert {"x-next-cursor", "etag"} <= exposed
+
+
+def test_import_reports_a_failed_batch_and_keeps_the_others(client, agency_id, headers, monkeypatch):
+    from app import config
+
+    monkeypatch.setattr(config, "TEMPLATE_IMPORT_BATCH_SIZE", 1)
+    service = client.post("/services/", json={"name": "payroll"}, headers=headers).json()
+    assert client.get("/services/", headers=headers).json()[0]["is_enabled"] is True
+    assert client.get(f"/services/{service['id']}", headers=headers).json()["checklists"] == []
+
+    # The second batch overflows an integer column and fails in the database.
+    body = (
+        b'{"name": "payroll", "is_enabled": false, "checklists": [{"item_text": "collect payslips"}]}\n'
+        b'{"name": "audit", "target_date_creation_date": 99999999999}\n'
+        b'{"name": "gst return"}\n'
+    )
+    response = client.post("/services/import", params={"on_conflict": "update"}, content=body, headers=headers)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["updated"], result["skipped"], result["failed"]) == (1, 1, 0, 1)
+    assert [error["line"] for error in result["errors"]] == [2]
+    assert result["errors"][0]["error"].startswith("Batch rejected by the database")
+
+    # The batches committed before and after the failure are imported and
+    # visible through the cached reads.
+    listed = {item["name"]: item for item in client.get("/services/", headers=headers).json()}
+    assert set(listed) == {"payroll", "gst return"}
+    assert listed["payroll"]["is_enabled"] is False
+    detail = client.get(f"/services/{service['id']}", headers=headers).json()
+    assert [item["item_text"] for item in detail["checklists"]] == ["collect payslips"]
+
+
+def test_catalog_reads_stay_within_their_query_budgets(client, headers, query_budgets):
+    for number in range(3):
+        service = client.post("/services/", json={"name": f"service {number}"}, headers=headers).json()
+        items = [{"item_text": f"item {index}"} for index in range(3)]
+        assert client.post(f"/options/checklists/{service['id']}/batch", json={"create": items}, headers=headers).status_code == 200
+
+    # The checklists of a whole page load in one query, not one per service.
+    listed = client.get("/services/", params={"include_checklists": "true"}, headers=headers).json()
+    assert [len(item["checklists"]) for item in listed] == [3, 3, 3]
+    assert query_budgets[-1].queries == 2
+
+    assert client.get(f"/services/{service['id']}", headers=headers).status_code == 200
+    assert client.get(f"/services/{service['id']}", headers=headers).status_code == 200
+    assert [stats.queries for stats in query_budgets[-2:]] == [1, 0]
+
+
+def test_search_ranks_exact_then_prefix_then_substring_then_fuzzy(client, headers):
+    for name in ("tax audit", "audit fees", "audit", "internal audit", "auditing", "payroll", "auddit review"):
+        assert client.post("/services/", json={"name": name}, headers=headers).status_code == 201
+
+    # Ties within a match kind are broken by name.
+    plain = client.get("/services/search", params={"q": "audit", "fuzzy": "false"}, headers=headers).json()
+    assert [item["name"] for item in plain] == ["audit", "audit fees", "auditing", "internal audit", "tax audit"]
+    assert [item["score"] for item in plain] == [3, 2, 2, 1, 1]
+
+    # Fuzzy-only matches rank below every substring match.
+    fuzzy = client.get("/services/search", params={"q": "audit"}, headers=headers).json()
+    assert [item["name"] for item in fuzzy][:5] == [item["name"] for item in plain]
+    assert [item["name"] for item in fuzzy][5:] == ["auddit review"]
+    assert fuzzy[5]["score"] < 1
+
+
+def test_search_pages_follow_the_rank_cursor(client, headers):
+    for name in ("audit", "audit fees", "auditing", "internal audit", "tax audit", "audit log"):
+        assert client.post("/services/", json={"name": name}, headers=headers).status_code == 201
+
+    names, params = [], {"q": "audit", "fuzzy": "false", "limit": 2}
+    while True:
+        response = client.get("/services/search", params=params, headers=headers)
+        assert response.status_code == 200
+        names.extend(item["name"] for item in response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert names == ["audit", "audit fees", "audit log", "auditing", "internal audit", "tax audit"]
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, select
+
+from app import models, storage, storage_worker
+from app.database import SessionLocal
+
+
+class StubS3:
+    # Just enough of the boto3 client for app.storage: objects live in a
+    # dict and keys listed in `failing` are reported back as errors.
+
+    def __init__(self):
+        self.objects = {}
+        self.failing = set()
+        self.deleted = []
+
+    def delete_objects(self, Bucket, Delete):
+        errors = []
+        for item in Delete["Objects"]:
+            if item["Key"] in self.failing:
+                errors.append({"Key": item["Key"], "Code": "AccessDenied", "Message": "Access Denied"})
+            else:
+                self.objects.pop(item["Key"], None)
+                self.deleted.append(item["Key"])
+        return {"Errors": errors}
+
+    def head_object(self, Bucket, Key):
+        return {"ContentType": "text/plain", "LastModified": self.objects[Key]}
+
+    def get_paginator(self, name):
+        stub = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix, Delimiter=None):
+                keys = sorted(key for key in stub.objects if key.startswith(Prefix))
+                if Delimiter:
+                    yield {"CommonPrefixes": [{"Prefix": prefix} for prefix in sorted({key.split(Delimiter)[0] + Delimiter for key in keys})]}
+                else:
+                    yield {"Contents": [{"Key": key, "LastModified": stub.objects[key]} for key in keys]}
+
+        return Paginator()
+
+
+@pytest.fixture
+def s3(monkeypatch, engine):
+    stub = StubS3()
+    monkeypatch.setattr(storage, "get_s3_client", lambda: stub)
+    # Rows other tests left in the queue would be drained along with ours.
+    with SessionLocal() as db:
+        db.execute(delete(models.StorageDeletion))
+        db.commit()
+    return stub
+
+
+def _upload(client, headers, s3, service_id, name):
+    key = storage.new_object_key(service_id, name)
+    s3.objects[key] = datetime.now(timezone.utc) - timedelta(days=2)
+    response = client.post(f"/options/supporting-files/{service_id}/finalize", json={"key": key, "file_name": name}, headers=headers)
+    assert response.status_code == 201
+    return key
+
+
+def _queue(db):
+    db.expire_all()
+    return {storage.key_for_file_path(row.file_path): row for row in db.scalars(select(models.StorageDeletion))}
+
+
+def test_deleting_a_service_queues_and_deletes_its_objects(client, headers, db, s3):
+    service = client.post("/services/", json={"name": "payroll"}, headers=headers).json()
+    keys = {_upload(client, headers, s3, service["id"], name) for name in ("a.txt", "b.txt")}
+
+    assert client.delete(f"/services/{service['id']}", headers=headers).status_code == 204
+    assert set(_queue(db)) == keys
+    assert s3.deleted == []
+
+    assert storage_worker.process_batch() == 2
+    assert sorted(s3.deleted) == sorted(keys)
+    assert _queue(db) == {}
+
+
+def test_failed_deletion_is_kept_and_retried_later(client, headers, db, s3):
+    service = client.post("/services/", json={"name": "audit"}, headers=headers).json()
+    kept = _upload(client, headers, s3, service["id"], "kept.txt")
+    removed = _upload(client, headers, s3, service["id"], "removed.txt")
+    s3.failing.add(kept)
+
+    assert client.delete(f"/services/{service['id']}", headers=headers).status_code == 204
+    before = datetime.now(timezone.utc)
+    assert storage_worker.process_batch() == 2
+
+    queue = _queue(db)
+    assert set(queue) == {kept}
+    assert queue[kept].attempts == 1
+    assert queue[kept].last_error == "AccessDenied: Access Denied"
+    assert queue[kept].next_attempt_at >= before + timedelta(seconds=storage_worker.BASE_BACKOFF_SECONDS / 2)
+    assert s3.deleted == [removed]
+
+    # Not due yet, so the next pass leaves it alone.
+    assert storage_worker.process_batch() == 0
+    assert _queue(db)[kept].attempts == 1
+
+
+def test_rows_locked_by_another_worker_are_skipped(db, s3):
+    db.add_all(models.StorageDeletion(file_path=storage.file_path_for_key(f"{name}.txt")) for name in ("first", "second"))
+    db.commit()
+
+    with SessionLocal() as other:
+        locked = other.scalars(select(models.StorageDeletion).order_by(models.StorageDeletion.id).limit(1).with_for_update()).one()
+        assert storage_worker.process_batch() == 1
+        assert s3.deleted == ["second.txt"]
+        assert locked.file_path.endswith("first.txt")
+        other.rollback()
+
+    assert storage_worker.process_batch() == 1
+    assert s3.deleted == ["second.txt", "first.txt"]
+
+
+def test_reconcile_queues_only_old_orphans(client, headers, db, s3):
+    service = client.post("/services/", json={"name": "gst"}, headers=headers).json()
+    known = _upload(client, headers, s3, service["id"], "known.txt")
+    orphan = storage.new_object_key(service["id"], "orphan.txt")
+    recent = storage.new_object_key(service["id"], "recent.txt")
+    s3.objects[orphan] = datetime.now(timezone.utc) - timedelta(days=2)
+    s3.objects[recent] = datetime.now(timezone.utc)
+
+    orphans = storage_worker.reconcile()
+    assert orphans == [storage.file_path_for_key(orphan)]
+    assert set(_queue(db)) == {orphan}
+    assert known in s3.objects
+
+    # Already queued objects are not queued twice.
+    assert storage_worker.reconcile() == []